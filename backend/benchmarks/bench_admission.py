@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Overload benchmark for admission control (services.admission).
+
+An open-loop load generator: requests arrive at --rate per second (Poisson)
+for --duration seconds whatever the response times, a mix of contact
+submissions, admin listings and status reads. `server:app` runs in-process
+on the mongomock stand-in, with every storage call going through a
+simulated connection pool of --pool-size slots that takes --op-time seconds
+per call, so the offered load is well above what the "database" can serve.
+
+The same arrivals are replayed with admission control off and on. Reported
+per request kind: served / shed (503) counts and latency percentiles of the
+served requests. Fails unless, with admission control on, contact
+submissions keep a lower p99 than without it and nearly all get through,
+and every 503 carries Retry-After.
+
+Extra packages: httpx, mongomock-motor (as for load_test.py).
+
+Usage (from backend/):
+    python benchmarks/bench_admission.py [--rate 300] [--duration 8] [--pool-size 4] [--op-time 0.025]
+        [--mix contact=0.2,admin=0.4,status=0.4] [--target-latency 0.25]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+POOLED_METHODS = ("insert", "insert_many", "find_page", "count")
+
+
+class SimulatedPool:
+    """A saturated connection pool: `size` calls at a time, each taking `op_time` seconds"""
+
+    def __init__(self, size: int, op_time: float):
+        self.op_time = op_time
+        self.semaphore = asyncio.Semaphore(size)
+
+    def wrap(self, fn):
+        async def call(*args, **kwargs):
+            async with self.semaphore:
+                await asyncio.sleep(self.op_time)
+                return await fn(*args, **kwargs)
+        return call
+
+
+def request_for(kind: str, i: int):
+    """(method, path, kwargs) for one request"""
+    from load_test import contact_body, ip_for
+    if kind == "contact":
+        return "POST", "/api/contact", {"json": contact_body(i), "headers": {"X-Forwarded-For": ip_for(i)}}
+    if kind == "admin":
+        # Varying limits, so most listings miss the response cache
+        return "GET", "/api/admin/contacts", {"params": {"limit": 10 + i % 50, "summary": True}}
+    return "GET", "/api/status", {"params": {"limit": 20 + i % 50}}
+
+
+async def generate(client, arrivals, started: float) -> list:
+    """Fire each (at, kind, i) arrival on time; returns (kind, status, latency, retry_after)"""
+    results = []
+
+    async def send(kind: str, i: int):
+        method, path, kwargs = request_for(kind, i)
+        start = time.perf_counter()
+        response = await client.request(method, path, **kwargs)
+        results.append((kind, response.status_code, time.perf_counter() - start, response.headers.get("retry-after")))
+
+    tasks = []
+    for at, kind, i in arrivals:
+        delay = started + at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send(kind, i)))
+    await asyncio.gather(*tasks)
+    return results
+
+
+def summarize(results: list) -> dict:
+    by_kind = defaultdict(lambda: {"served": [], "statuses": Counter()})
+    for kind, status, latency, _ in results:
+        by_kind[kind]["statuses"][status] += 1
+        if status < 500:
+            by_kind[kind]["served"].append(latency)
+    summary = {}
+    for kind, entry in by_kind.items():
+        served = sorted(entry["served"])
+        total = sum(entry["statuses"].values())
+        summary[kind] = {
+            "total": total,
+            "served": len(served),
+            "shed": entry["statuses"][503],
+            "p50": statistics.median(served) * 1000 if served else 0.0,
+            "p99": served[min(len(served) - 1, int(len(served) * 0.99))] * 1000 if served else 0.0,
+        }
+    return summary
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=300, help="Arrivals per second")
+    parser.add_argument("--duration", type=float, default=8)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--op-time", type=float, default=0.025, help="Seconds per storage call")
+    parser.add_argument("--mix", default="contact=0.2,admin=0.4,status=0.4")
+    parser.add_argument("--target-latency", type=float, default=0.25)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    mix = {kind: float(weight) for kind, weight in (part.split("=") for part in args.mix.split(","))}
+
+    try:
+        import httpx
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError as e:
+        sys.exit(f"bench_admission.py needs httpx and mongomock-motor ({str(e)})")
+
+    os.chdir(BACKEND_DIR)
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ.update({
+        "ADMISSION_TARGET_LATENCY": str(args.target_latency),
+        # Distinct IPs and generated messages: nothing is rate limited or dropped as spam
+        "SPAM_FILTER_ENABLED": "false",
+    })
+    import database
+    database.client = AsyncMongoMockClient()
+    database.db = database.client["portfolio_admission_bench"]
+    import server
+    from load_test import ForwardedForApp
+    from services.admission import AdaptiveLimit, admission_controller
+    from services.storage import storage
+
+    rng = random.Random(args.seed)
+    arrivals, at, i = [], 0.0, 0
+    while at < args.duration:
+        arrivals.append((at, rng.choices(list(mix), list(mix.values()))[0], i))
+        at += rng.expovariate(args.rate)
+        i += 1
+
+    summaries = {}
+    transport = httpx.ASGITransport(app=ForwardedForApp(server.app))
+    async with server.lifespan(server.app):
+        pool = SimulatedPool(args.pool_size, args.op_time)
+        for repository in (storage.contacts, storage.status_checks):
+            for name in POOLED_METHODS:
+                if hasattr(repository, name):
+                    setattr(repository, name, pool.wrap(getattr(repository, name)))
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            for enabled in (False, True):
+                admission_controller.enabled = enabled
+                admission_controller.limit = AdaptiveLimit(target_latency=args.target_latency)
+                # Later arrivals get new indexes: new IPs and messages for the second run
+                offset = len(arrivals) if enabled else 0
+                results = await generate(
+                    client, [(at, kind, i + offset) for at, kind, i in arrivals], time.perf_counter()
+                )
+                summaries[enabled] = summarize(results)
+                missing_retry_after = sum(1 for _, status, _, retry in results if status == 503 and not retry)
+                final_limit = admission_controller.limit.current
+
+    capacity = args.pool_size / args.op_time
+    print(f"{len(arrivals)} requests at {args.rate:.0f}/s for {args.duration:.0f}s, "
+          f"storage capacity about {capacity:.0f} calls/s")
+    for enabled, summary in summaries.items():
+        print(f"\nadmission control {'on' if enabled else 'off'}"
+              + (f" (adaptive limit ended at {final_limit})" if enabled else ""))
+        for kind, entry in sorted(summary.items()):
+            print(f"  {kind:<8} served {entry['served']:>5}/{entry['total']:<5} shed {entry['shed']:>5}  "
+                  f"p50 {entry['p50']:>8.1f}ms  p99 {entry['p99']:>8.1f}ms")
+
+    failed = False
+    off, on = summaries[False].get("contact"), summaries[True].get("contact")
+    if on and off:
+        if on["p99"] >= off["p99"]:
+            print("FAIL: contact submissions are not faster with admission control")
+            failed = True
+        if on["served"] < 0.95 * on["total"]:
+            print("FAIL: more than 5% of contact submissions were shed")
+            failed = True
+    if missing_retry_after:
+        print(f"FAIL: {missing_retry_after} shed responses without Retry-After")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Contact analytics benchmark: grows the contacts collection step by step and
+at each size times
+  - a full traffic aggregation over every contact (what each request would
+    cost without the cached counts)
+  - the first report, which builds the cached counts
+  - reports after a few new contacts arrived (incremental refresh), which
+    should stay flat however large the collection gets
+and checks that the incrementally refreshed report matches one built from
+scratch.
+
+Backends: `sqlite` (a temporary database file), `mongomock` (in-memory
+stand-in without indexes, every query scans the collection, so only the
+parity check is meaningful; use small sizes) and `mongo` (a real mongod,
+needs --mongo-url).
+
+Usage (from backend/):
+    python benchmarks/bench_contact_analytics.py [--backend sqlite|mongomock|mongo] [--mongo-url URL]
+        [--sizes 10000,50000,200000] [--new N] [--rounds N] [--days N]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from services.analytics import ContactAnalytics
+from services.storage import MongoContactRepository
+from services.storage_sqlite import SqliteContactRepository, SqliteEngine
+
+DOMAINS = ["gmail.com", "outlook.com", "example.com", "company.io", "uni.edu", "proton.me"]
+USER_AGENTS = ["Mozilla/5.0 (Windows NT 10.0)", "Mozilla/5.0 (Macintosh)", "curl/8.4.0", None]
+
+
+def make_contact(i: int, created_at: datetime) -> dict:
+    rng = random.Random(i)
+    return {
+        "id": f"contact-{i:09d}",
+        "name": f"Person {i}",
+        "email": f"person{i}@{rng.choice(DOMAINS)}",
+        "message": f"Hello, this is message number {i} about a project. " * 4,
+        "created_at": created_at,
+        "read": i % 3 == 0,
+        "ip_address": f"10.0.{i >> 8 & 255}.{i & 255}",
+        "user_agent": rng.choice(USER_AGENTS),
+    }
+
+
+async def open_repository(args):
+    """(repository, cleanup)"""
+    if args.backend == "sqlite":
+        directory = tempfile.TemporaryDirectory()
+        engine = SqliteEngine(os.path.join(directory.name, "bench.sqlite3"))
+        await engine.start()
+
+        async def cleanup():
+            await engine.close()
+            directory.cleanup()
+        return SqliteContactRepository(engine), cleanup
+
+    import database
+    if args.backend == "mongomock":
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            sys.exit("The mongomock backend needs mongomock-motor: pip install mongomock-motor")
+        database.client = AsyncMongoMockClient()
+    elif args.backend == "mongo":
+        if not args.mongo_url:
+            sys.exit("The mongo backend needs --mongo-url")
+        os.environ["MONGO_URL"] = args.mongo_url
+        database.client = None
+        database.connect()
+    else:
+        sys.exit(f"Unknown backend {args.backend!r}")
+    database.db = database.client["portfolio_analytics_bench"]
+    await database.client.drop_database("portfolio_analytics_bench")
+    if args.backend == "mongo":
+        await database.ensure_indexes()
+
+    async def cleanup():
+        await database.client.drop_database("portfolio_analytics_bench")
+        await database.close_database()
+    return MongoContactRepository(lambda: database.db.contacts), cleanup
+
+
+async def timed(fn) -> tuple:
+    start = time.perf_counter()
+    result = await fn()
+    return (time.perf_counter() - start) * 1000, result
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default="sqlite")
+    parser.add_argument("--mongo-url", default=None)
+    parser.add_argument("--sizes", default="10000,50000,200000")
+    parser.add_argument("--new", type=int, default=10, help="New contacts between two reports")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--days", type=int, default=7, help="Report window")
+    parser.add_argument("--history-days", type=int, default=180, help="Age of the oldest seeded contact")
+    args = parser.parse_args()
+    sizes = sorted(int(size) for size in args.sizes.split(","))
+
+    repository, cleanup = await open_repository(args)
+    analytics = ContactAnalytics(repository, settle=0)
+    rows, failed, seeded = [], False, 0
+    try:
+        for size in sizes:
+            # Seeded contacts are spread evenly over the history, all before now
+            oldest = datetime.utcnow() - timedelta(days=args.history_days)
+            spacing = timedelta(days=args.history_days) / max(sizes)
+            for offset in range(seeded, size, 5000):
+                batch = range(offset, min(offset + 5000, size))
+                await repository.insert_many([make_contact(i, oldest + spacing * i) for i in batch])
+            seeded = size
+
+            full_ms, _ = await timed(lambda: repository.traffic())
+            analytics.invalidate()
+            cold_ms, _ = await timed(lambda: analytics.report(args.days))
+
+            samples = []
+            for _ in range(args.rounds):
+                now = datetime.utcnow()
+                await repository.insert_many([make_contact(seeded + i, now) for i in range(args.new)])
+                seeded += args.new
+                elapsed, report = await timed(lambda: analytics.report(args.days))
+                samples.append(elapsed)
+            warm_ms = statistics.median(samples)
+
+            fresh = await ContactAnalytics(repository, settle=0).report(args.days)
+            if {**fresh, "since": None} != {**report, "since": None}:
+                print(f"MISMATCH at {size:,} contacts: incremental report differs from a fresh build")
+                failed = True
+            rows.append((seeded, full_ms, cold_ms, warm_ms))
+    finally:
+        await cleanup()
+
+    print(f"{args.backend}, {args.days} day window, {args.new} new contacts per round, {args.rounds} rounds")
+    print(f"{'contacts':>10} {'full aggregation':>18} {'first report':>14} {'incremental':>13}")
+    for size, full_ms, cold_ms, warm_ms in rows:
+        print(f"{size:>10,} {full_ms:>16.2f}ms {cold_ms:>12.2f}ms {warm_ms:>11.2f}ms")
+
+    smallest, largest = rows[0][3], rows[-1][3]
+    if args.backend != "mongomock" and len(rows) > 1 and largest > max(3 * smallest, smallest + 5):
+        print("FAIL: incremental report time grows with the collection size")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Contact export memory check.
+Streams N contact documents through the NDJSON and CSV export encoders and
+samples the process RSS as it goes - it must stay flat however many rows
+are exported.
+
+By default documents come from an in-process cursor that generates them on
+the fly (so the source itself holds no data). With --mongo-url the collection
+is seeded in a local mongod and exported through a real Motor cursor.
+
+Usage (from backend/):
+    python benchmarks/bench_contact_export.py [--rows N] [--batch-size N] [--mongo-url URL]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models.contact import CONTACT_FIELDS, contact_row_adapter
+from services.export import csv_chunks, ndjson_chunks
+
+
+def rss_mib() -> float:
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def make_document(i: int, base: datetime) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "name": f"Sender {i}",
+        "email": f"sender{i}@example.com",
+        "message": "Hello! I'd like to talk about a project collaboration. " * 4,
+        "created_at": base - timedelta(seconds=i),
+        "read": i % 3 == 0,
+        "ip_address": "203.0.113.7",
+        "user_agent": "Mozilla/5.0 (X11; Linux x86_64)",
+    }
+
+
+class GeneratedCursor:
+    """Async cursor yielding generated documents, never holding more than one"""
+
+    def __init__(self, rows: int):
+        self.rows = rows
+        self.base = datetime.utcnow()
+
+    def __aiter__(self):
+        return self._generate()
+
+    async def _generate(self):
+        for i in range(self.rows):
+            yield make_document(i, self.base)
+
+
+async def seed_mongo(collection, rows: int, batch: int = 10_000):
+    await collection.drop()
+    base = datetime.utcnow()
+    for start in range(0, rows, batch):
+        await collection.insert_many(
+            [make_document(i, base) for i in range(start, min(rows, start + batch))]
+        )
+
+
+async def export(label: str, chunks, rows: int):
+    samples = []
+    exported_bytes = 0
+    lines = 0
+    start = time.perf_counter()
+    next_sample = rows // 10 or 1
+    async for chunk in chunks:
+        exported_bytes += len(chunk)
+        lines += chunk.count(b"\n")
+        if lines >= next_sample:
+            samples.append((lines, rss_mib()))
+            next_sample += rows // 10 or 1
+    elapsed = time.perf_counter() - start
+
+    print(f"\n{label}: {lines:,} lines, {exported_bytes / 1024 / 1024:,.1f} MiB in {elapsed:.1f}s "
+          f"({lines / elapsed:,.0f} rows/s)")
+    for seen, rss in samples:
+        print(f"  after {seen:>10,} lines: RSS {rss:7.1f} MiB")
+
+    growth = samples[-1][1] - samples[0][1] if len(samples) >= 2 else 0.0
+    print(f"  RSS growth first->last sample: {growth:+.1f} MiB")
+    return growth
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--mongo-url", default=None)
+    parser.add_argument("--max-growth-mib", type=float, default=20.0)
+    args = parser.parse_args()
+
+    if args.mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(args.mongo_url)
+        collection = client["portfolio_export_bench"].contacts
+        print(f"Seeding {args.rows:,} documents...")
+        await seed_mongo(collection, args.rows)
+
+        def cursor():
+            return collection.find({}, {"_id": 0}).batch_size(args.batch_size)
+    else:
+        def cursor():
+            return GeneratedCursor(args.rows)
+
+    growths = [
+        await export("ndjson", ndjson_chunks(cursor(), contact_row_adapter, args.batch_size), args.rows),
+        await export("csv", csv_chunks(cursor(), CONTACT_FIELDS, args.batch_size), args.rows),
+    ]
+
+    if args.mongo_url:
+        await collection.drop()
+        client.close()
+
+    if max(growths) > args.max_growth_mib:
+        print(f"\nFAIL: RSS grew by more than {args.max_growth_mib} MiB during export")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Admin listing serialization benchmark.
+Compares rows/second of the previous path (ContactMessage(**doc) per row, then
+FastAPI validating the list again through response_model and JSON encoding it)
+with the raw-document path (one TypeAdapter.dump_json over projected rows).
+
+Usage (from backend/):  python benchmarks/bench_contact_listing.py [--rows N] [--repeat N]
+"""
+
+import argparse
+import json
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bson import ObjectId
+from pydantic import TypeAdapter
+
+from models.contact import (
+    ContactMessage, CONTACT_FIELDS, CONTACT_SUMMARY_FIELDS, contact_rows_adapter
+)
+
+
+def make_documents(rows: int) -> List[dict]:
+    now = datetime.utcnow()
+    return [
+        {
+            "_id": ObjectId(),
+            "id": str(uuid.uuid4()),
+            "name": f"Sender {i}",
+            "email": f"sender{i}@example.com",
+            "message": "Hello! I'd like to talk about a project collaboration. " * 5,
+            "created_at": now - timedelta(seconds=i),
+            "read": i % 3 == 0,
+            "ip_address": "203.0.113.7",
+            "user_agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 Chrome/124.0",
+        }
+        for i in range(rows)
+    ]
+
+
+def project(documents: List[dict], fields: List[str]) -> List[dict]:
+    # What the server-side projection hands back
+    return [{field: doc[field] for field in fields} for doc in documents]
+
+
+response_adapter = TypeAdapter(List[ContactMessage])
+
+
+def previous_path(documents: List[dict]) -> bytes:
+    models = [ContactMessage(**doc) for doc in documents]
+    validated = response_adapter.validate_python(models, from_attributes=True)
+    return json.dumps(response_adapter.dump_python(validated, mode="json")).encode()
+
+
+def raw_path(documents: List[dict]) -> bytes:
+    return contact_rows_adapter.dump_json(documents)
+
+
+def measure(name: str, func, documents: List[dict], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(documents)
+        best = min(best, time.perf_counter() - start)
+    rate = len(documents) / best
+    print(f"  {name:<28} {rate:>12,.0f} rows/s")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    documents = make_documents(args.rows)
+    print(f"{args.rows:,} rows, best of {args.repeat}")
+    before = measure("previous (full docs)", previous_path, documents, args.repeat)
+    full = measure("raw dump (full)", raw_path, project(documents, CONTACT_FIELDS), args.repeat)
+    summary = measure("raw dump (summary)", raw_path, project(documents, CONTACT_SUMMARY_FIELDS), args.repeat)
+    print(f"  speedup: {full / before:.1f}x full, {summary / before:.1f}x summary")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+In-process contact search benchmark.
+Grows the inverted index step by step and times queries at each size: a rare
+term (a sender's email domain with a fixed number of messages) must stay flat
+as the collection grows, a common word scales with its number of matches.
+Also reports the cost of the incremental add done on every submission.
+
+Usage (from backend/):  python benchmarks/bench_contact_search.py [--sizes 10000,100000,300000] [--queries N]
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.search import ContactSearchIndex
+
+RARE_DOMAIN_MESSAGES = 20
+
+
+def make_contact(i: int, rng: random.Random, vocabulary, start: datetime) -> dict:
+    return {
+        "id": f"contact-{i}",
+        "name": f"{rng.choice(vocabulary).title()} {rng.choice(vocabulary).title()}",
+        "email": f"user{i}@domain{i % 5000}.com",
+        "message": " ".join(rng.choice(vocabulary) for _ in range(rng.randint(10, 60))),
+        "created_at": start + timedelta(seconds=i),
+    }
+
+
+def time_query(index: ContactSearchIndex, query: str, queries: int, limit: int = 20):
+    samples = []
+    for _ in range(queries):
+        start = time.perf_counter()
+        hits = index.search(query, limit)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return statistics.median(samples) * 1000, samples[int(len(samples) * 0.99) - 1] * 1000, len(hits)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="10000,100000,300000")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    rng = random.Random(7)
+    vocabulary = [f"word{i}" for i in range(20_000)] + ["project"] * 200
+    start = datetime(2024, 1, 1)
+    index = ContactSearchIndex(repository=None)
+
+    # The rare domain gets a fixed number of messages, spread over the first size
+    rare_ids = set(rng.sample(range(sizes[0]), RARE_DOMAIN_MESSAGES))
+
+    added = 0
+    add_time = 0.0
+    print(f"{'contacts':>10} {'add us':>8}   {'rare p50/p99 ms':>16} {'hits':>5}   {'common p50/p99 ms':>18} {'hits':>5}")
+    for size in sizes:
+        while added < size:
+            contact = make_contact(added, rng, vocabulary, start)
+            if added in rare_ids:
+                contact["email"] = f"someone{added}@rare-example.org"
+            t = time.perf_counter()
+            index.add(contact)
+            add_time += time.perf_counter() - t
+            added += 1
+
+        rare_p50, rare_p99, rare_hits = time_query(index, "rare-example.org", args.queries)
+        common_p50, common_p99, common_hits = time_query(index, "project", max(args.queries // 20, 5))
+        print(f"{size:>10,} {add_time * 1e6 / added:>8.1f}   {rare_p50:>7.3f}/{rare_p99:<8.3f} {rare_hits:>5}"
+              f"   {common_p50:>8.2f}/{common_p99:<9.2f} {common_hits:>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Contact submission validation micro-benchmark.
+Times what POST /api/contact does per request before the stored document is
+written: validate the body as ContactMessageCreate, build the ContactMessage
+and dump it. The previous design (v1-style @validator shims and a second full
+validation of ContactMessage) is kept here as the baseline. Error messages for
+a set of invalid bodies must be identical in both designs.
+
+Usage (from backend/):  python benchmarks/bench_contact_validation.py [--iterations N]
+"""
+
+import argparse
+import sys
+import time
+import uuid
+import warnings
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pydantic import BaseModel, EmailStr, Field, ValidationError
+
+from models.contact import ContactMessage, ContactMessageCreate
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore")
+    from pydantic import validator
+
+    class LegacyContactMessage(BaseModel):
+        id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+        name: str = Field(..., min_length=2, max_length=100)
+        email: EmailStr
+        message: str = Field(..., min_length=10, max_length=1000)
+        created_at: datetime = Field(default_factory=datetime.utcnow)
+        read: bool = False
+        ip_address: Optional[str] = None
+        user_agent: Optional[str] = None
+
+        @validator('name')
+        def validate_name(cls, v):
+            if not v.strip():
+                raise ValueError('Name cannot be empty')
+            return v.strip()
+
+        @validator('message')
+        def validate_message(cls, v):
+            if not v.strip():
+                raise ValueError('Message cannot be empty')
+            return v.strip()
+
+    class LegacyContactMessageCreate(BaseModel):
+        name: str = Field(..., min_length=2, max_length=100)
+        email: EmailStr
+        message: str = Field(..., min_length=10, max_length=1000)
+
+        @validator('name')
+        def validate_name(cls, v):
+            if not v.strip():
+                raise ValueError('Name cannot be empty')
+            return v.strip()
+
+        @validator('message')
+        def validate_message(cls, v):
+            if not v.strip():
+                raise ValueError('Message cannot be empty')
+            return v.strip()
+
+
+BODY = {
+    "name": "  Ada Lovelace ",
+    "email": "ada@example.com",
+    "message": "I would like to talk about an analytical engine project.  ",
+}
+
+INVALID_BODIES = [
+    {"name": "A", "email": "ada@example.com", "message": "Long enough message"},
+    {"name": "   ", "email": "ada@example.com", "message": "Long enough message"},
+    {"name": "Ada", "email": "not-an-email", "message": "Long enough message"},
+    {"name": "Ada", "email": "ada@example.com", "message": "short"},
+    {"name": "Ada", "email": "ada@example.com", "message": " " * 20},
+    {"name": "Ada" * 50, "email": "ada@example.com", "message": "x" * 1001},
+    {"email": "ada@example.com"},
+]
+
+
+def legacy_path(body: dict) -> dict:
+    contact_data = LegacyContactMessageCreate.model_validate(body)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        contact_message = LegacyContactMessage(
+            **contact_data.dict(), ip_address="203.0.113.7", user_agent="bench"
+        )
+        return contact_message.dict()
+
+
+def current_path(body: dict) -> dict:
+    contact_data = ContactMessageCreate.model_validate(body)
+    contact_message = ContactMessage.model_construct(
+        **contact_data.model_dump(exclude={"website"}), ip_address="203.0.113.7", user_agent="bench"
+    )
+    return contact_message.model_dump()
+
+
+def errors(model, body: dict):
+    try:
+        model.model_validate(body)
+    except ValidationError as e:
+        return [(error["loc"], error["type"], error["msg"]) for error in e.errors()]
+    return []
+
+
+def timed(path, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        path(BODY)
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=50_000)
+    args = parser.parse_args()
+
+    failed = False
+    for body in INVALID_BODIES:
+        expected = errors(LegacyContactMessageCreate, body)
+        actual = errors(ContactMessageCreate, body)
+        if expected != actual:
+            failed = True
+            print(f"Error mismatch for {body}:\n  legacy:  {expected}\n  current: {actual}")
+    print(f"error messages: {'MISMATCH' if failed else f'identical for {len(INVALID_BODIES)} invalid bodies'}")
+
+    legacy_doc, current_doc = legacy_path(BODY), current_path(BODY)
+    for key in ("id", "created_at"):
+        legacy_doc.pop(key), current_doc.pop(key)
+    if legacy_doc != current_doc:
+        failed = True
+        print(f"Stored document differs:\n  legacy:  {legacy_doc}\n  current: {current_doc}")
+
+    # Warm up, then take the best of a few rounds
+    timed(legacy_path, 1000), timed(current_path, 1000)
+    legacy = min(timed(legacy_path, args.iterations) for _ in range(3))
+    current = min(timed(current_path, args.iterations) for _ in range(3))
+    print(f"legacy (v1 validators, validated twice): {legacy * 1e6:7.2f} us/request")
+    print(f"current (single pass, model_construct):  {current * 1e6:7.2f} us/request")
+    print(f"speedup: {legacy / current:.2f}x")
+
+    if current >= legacy:
+        print("FAIL: the current path is not faster")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
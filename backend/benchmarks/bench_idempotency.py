@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Retry storm check for Idempotency-Key support on POST /api/contact and
+POST /api/status. Each of N logical requests is sent once, then retried
+--retries times: some retries race the original (concurrent duplicates),
+the rest arrive after it finished. Runs `server:app` in-process on the
+mongomock stand-in (with IDEMPOTENCY_BACKEND=mongo when --backend mongo).
+
+Reports first-send vs replay latency and fails unless exactly N documents
+were written per route and every retry got the original response back.
+
+Extra packages: httpx, mongomock-motor (as for load_test.py).
+
+Usage (from backend/):
+    python benchmarks/bench_idempotency.py [--requests N] [--retries N] [--backend memory|mongo]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+def request_for(route: str, i: int):
+    from load_test import contact_body, ip_for
+    if route == "contact":
+        return "/api/contact", contact_body(i), {"X-Forwarded-For": ip_for(i)}
+    return "/api/status", {"client_name": f"agent-{i % 50}"}, {}
+
+
+async def storm(client, route: str, requests: int, retries: int) -> tuple:
+    """(first send latencies, replay latencies, mismatched responses)"""
+    first, replays, mismatched = [], [], 0
+
+    async def timed_post(path, body, headers):
+        start = time.perf_counter()
+        response = await client.post(path, json=body, headers=headers)
+        if response.status_code != 200:
+            sys.exit(f"POST {path} returned {response.status_code}: {response.text}")
+        return response, time.perf_counter() - start
+
+    async def one(i: int):
+        nonlocal mismatched
+        path, body, headers = request_for(route, i)
+        headers = {**headers, "Idempotency-Key": str(uuid.uuid4())}
+        # The original and half the retries at once, the other half afterwards
+        racing = retries // 2
+        results = await asyncio.gather(*(timed_post(path, body, headers) for _ in range(racing + 1)))
+        for _ in range(retries - racing):
+            results.append(await timed_post(path, body, headers))
+        for response, elapsed in results:
+            (replays if response.headers.get("idempotent-replayed") else first).append(elapsed)
+        mismatched += sum(1 for response, _ in results if response.json() != results[0][0].json())
+
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return first, replays, mismatched
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--retries", type=int, default=4)
+    parser.add_argument("--backend", choices=["memory", "mongo"], default="memory")
+    args = parser.parse_args()
+
+    try:
+        import httpx
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError as e:
+        sys.exit(f"bench_idempotency.py needs httpx and mongomock-motor ({str(e)})")
+
+    os.chdir(BACKEND_DIR)
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ.update({"IDEMPOTENCY_BACKEND": args.backend, "SPAM_FILTER_ENABLED": "false"})
+    import database
+    database.client = AsyncMongoMockClient()
+    database.db = database.client["portfolio_idempotency_bench"]
+    import server
+    from load_test import ForwardedForApp
+
+    failed = False
+    transport = httpx.ASGITransport(app=ForwardedForApp(server.app))
+    async with server.lifespan(server.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=30) as client:
+            for route, collection in (("contact", "contacts"), ("status", "status_checks")):
+                first, replays, mismatched = await storm(client, route, args.requests, args.retries)
+                stored = await database.db[collection].count_documents({})
+                print(f"{route:<8} {len(first)} written ({stored} documents), {len(replays)} replayed   "
+                      f"first p50 {statistics.median(first) * 1000:.2f}ms   "
+                      f"replay p50 {statistics.median(replays) * 1000:.2f}ms")
+                if stored != args.requests or len(first) != args.requests:
+                    print(f"FAIL: {route} retries wrote duplicate documents")
+                    failed = True
+                if mismatched:
+                    print(f"FAIL: {mismatched} {route} retries got a different response")
+                    failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Import-time budget check.
+Imports `server` in fresh interpreters under `python -X importtime`, keeps the
+fastest run (the others mostly measure machine noise) and fails when it is over
+the budget. The heaviest modules are listed so a regression is easy to trace.
+
+Usage (from backend/):  python benchmarks/bench_import_time.py [--budget-ms N] [--runs N] [--top N]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def import_times(module: str):
+    """Cumulative microseconds of `module` and of each of its direct imports"""
+    env = dict(os.environ)
+    env.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        sys.exit(f"Importing {module} failed:\n{result.stderr}")
+
+    # Children are printed before their parent, so collect level-1 entries
+    # until the level-0 line they belong to shows up
+    children = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        if level == 0:
+            if name.strip() == module:
+                return int(cumulative_us), children
+            children = {}
+        elif level == 1:
+            children[name.strip()] = int(cumulative_us)
+    sys.exit(f"No import time reported for {module}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--module", default="server")
+    parser.add_argument("--budget-ms", type=float, default=900.0)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    runs = [import_times(args.module) for _ in range(args.runs)]
+    total_us, direct = min(runs, key=lambda run: run[0])
+    total_ms = total_us / 1000
+
+    print(f"import {args.module}: {total_ms:.1f}ms (best of {args.runs}, "
+          f"worst {max(run[0] for run in runs) / 1000:.1f}ms)")
+    print(f"\nheaviest direct imports of {args.module}:")
+    for name, us in sorted(direct.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {us / 1000:8.1f}ms  {name}")
+
+    if total_ms > args.budget_ms:
+        print(f"\nFAIL: {total_ms:.1f}ms is over the {args.budget_ms:g}ms budget")
+        sys.exit(1)
+    print(f"\nOK: within the {args.budget_ms:g}ms budget")
+
+
+if __name__ == "__main__":
+    main()
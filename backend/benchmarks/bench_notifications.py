@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+End-to-end check of background notification dispatch, with local stand-ins.
+
+Starts a minimal SMTP server or webhook receiver on localhost that can be
+made slow (--delay) and flaky (--fail-rate), runs `server:app` in-process on
+the mongomock stand-in with NOTIFY_* pointing at it, submits contacts and
+reports:
+  - POST /api/contact latency, which must not include the delivery delay
+  - how many emails / webhook calls carried the notifications (digests)
+  - delivery failures retried and the time until every contact was notified
+
+The stand-ins can also be run on their own for manual testing
+(--serve-only), e.g. NOTIFY_TRANSPORT=smtp NOTIFY_SMTP_PORT=8025.
+
+Extra packages: httpx, mongomock-motor (as for load_test.py).
+
+Usage (from backend/):
+    python benchmarks/bench_notifications.py [--transport smtp|webhook] [--contacts N]
+        [--digest-size N] [--delay SECONDS] [--fail-rate 0.2] [--serve-only]
+"""
+
+import argparse
+import asyncio
+import email
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+class StandIn:
+    """Records what a local SMTP server or webhook receiver was sent"""
+
+    def __init__(self, delay: float, fail_rate: float):
+        self.delay = delay
+        self.fail_rate = fail_rate
+        self.deliveries = []  # one entry per email / webhook call: [contact ids]
+        self.failures = 0
+
+    async def _should_fail(self) -> bool:
+        await asyncio.sleep(self.delay)
+        if random.random() < self.fail_rate:
+            self.failures += 1
+            return True
+        return False
+
+    async def handle_smtp(self, reader, writer):
+        async def reply(line: str):
+            writer.write((line + "\r\n").encode())
+            await writer.drain()
+
+        await reply("220 localhost stand-in ESMTP")
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command = line.decode(errors="replace").strip().upper()
+            if command.startswith(("HELO", "EHLO")):
+                await reply("250 localhost")
+            elif command.startswith(("MAIL", "RCPT", "RSET", "NOOP")):
+                await reply("250 OK")
+            elif command == "DATA":
+                await reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    data_line = await reader.readline()
+                    if data_line in (b".\r\n", b".\n", b""):
+                        break
+                    lines.append(data_line[1:] if data_line.startswith(b"..") else data_line)
+                if await self._should_fail():
+                    await reply("451 Temporary failure, try again later")
+                    continue
+                message = email.message_from_bytes(b"".join(lines))
+                body = message.get_payload(decode=True).decode()
+                self.deliveries.append(body.count("\nReceived: ") + body.startswith("Received: "))
+                await reply("250 OK queued")
+            elif command == "QUIT":
+                await reply("221 Bye")
+                break
+            else:
+                await reply("502 Command not implemented")
+        writer.close()
+
+    async def handle_webhook(self, reader, writer):
+        request_line = await reader.readline()
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode().partition(":")
+            headers[name.strip().lower()] = value.strip()
+        body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+        if not request_line.startswith(b"POST") or await self._should_fail():
+            status = b"503 Service Unavailable"
+        else:
+            self.deliveries.append(len(json.loads(body)["messages"]))
+            status = b"200 OK"
+        writer.write(b"HTTP/1.1 " + status + b"\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+        await writer.drain()
+        writer.close()
+
+
+async def start_stand_in(transport: str, stand_in: StandIn, port: int):
+    handler = stand_in.handle_smtp if transport == "smtp" else stand_in.handle_webhook
+    server = await asyncio.start_server(handler, "127.0.0.1", port)
+    return server, server.sockets[0].getsockname()[1]
+
+
+async def run(args):
+    stand_in = StandIn(args.delay, args.fail_rate)
+    stand_in_server, port = await start_stand_in(args.transport, stand_in, args.port)
+
+    if args.serve_only:
+        print(f"{args.transport} stand-in listening on 127.0.0.1:{port} (Ctrl+C to stop)")
+        async with stand_in_server:
+            while True:
+                await asyncio.sleep(5)
+                print(f"  {sum(stand_in.deliveries)} notifications in {len(stand_in.deliveries)} deliveries, "
+                      f"{stand_in.failures} failed")
+
+    try:
+        import httpx
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError as e:
+        sys.exit(f"bench_notifications.py needs httpx and mongomock-motor ({str(e)})")
+
+    os.chdir(BACKEND_DIR)
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ.update({
+        "NOTIFY_TRANSPORT": args.transport,
+        "NOTIFY_SMTP_HOST": "127.0.0.1",
+        "NOTIFY_SMTP_PORT": str(port),
+        "NOTIFY_WEBHOOK_URL": f"http://127.0.0.1:{port}/hook",
+        "NOTIFY_DIGEST_SIZE": str(args.digest_size),
+        "NOTIFY_WORKERS": str(args.workers),
+        "NOTIFY_RETRY_DELAY": "0.1",
+        "NOTIFY_MAX_RETRY_DELAY": "1",
+        "NOTIFY_MAX_ATTEMPTS": "50",
+        "NOTIFY_POLL_INTERVAL": "0.1",
+        # Every generated contact must be stored, not dropped as a near-duplicate
+        "SPAM_FILTER_ENABLED": "false",
+    })
+
+    import database
+    database.client = AsyncMongoMockClient()
+    database.db = database.client["portfolio_notify_bench"]
+    import server
+    from load_test import ForwardedForApp, contact_body, ip_for
+
+    latencies = []
+    transport = httpx.ASGITransport(app=ForwardedForApp(server.app))
+    async with server.lifespan(server.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            started = time.perf_counter()
+            for i in range(args.contacts):
+                start = time.perf_counter()
+                response = await client.post(
+                    "/api/contact", json=contact_body(i), headers={"X-Forwarded-For": ip_for(i)}
+                )
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    sys.exit(f"POST /api/contact returned {response.status_code}: {response.text}")
+
+            deadline = time.monotonic() + args.timeout
+            while sum(stand_in.deliveries) < args.contacts and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+            elapsed = time.perf_counter() - started
+
+    stand_in_server.close()
+    delivered = sum(stand_in.deliveries)
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{args.transport}: {args.contacts} contacts, digest size {args.digest_size}, "
+          f"delivery delay {args.delay * 1000:.0f}ms, fail rate {args.fail_rate:.0%}")
+    print(f"  POST /api/contact: p50 {statistics.median(latencies) * 1000:.2f}ms, p99 {p99 * 1000:.2f}ms")
+    print(f"  notified {delivered}/{args.contacts} in {len(stand_in.deliveries)} deliveries "
+          f"after {elapsed:.2f}s, {stand_in.failures} failed attempts retried")
+
+    failed = False
+    if delivered < args.contacts:
+        print("FAIL: not every contact was notified before the timeout")
+        failed = True
+    if args.delay and p99 >= args.delay:
+        print("FAIL: request latency includes the delivery delay")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transport", choices=["smtp", "webhook"], default="smtp")
+    parser.add_argument("--contacts", type=int, default=50)
+    parser.add_argument("--digest-size", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--delay", type=float, default=0.2, help="Seconds the stand-in takes per delivery")
+    parser.add_argument("--fail-rate", type=float, default=0.2)
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--serve-only", action="store_true")
+    args = parser.parse_args()
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Rate limiter micro-benchmark.
+Feeds 1M distinct IPs through each limiter store and reports throughput and
+traced memory every 100k keys - memory must plateau at `max_entries`.
+
+Usage (from backend/):  python benchmarks/bench_rate_limit.py [--keys N] [--max-entries N]
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.rate_limit import STORE_TYPES
+
+
+def run(store_name: str, keys: int, max_entries: int):
+    tracemalloc.start()
+    store = STORE_TYPES[store_name](limit=5, window=3600, max_entries=max_entries)
+    now = time.time()
+    samples = []
+
+    start = time.perf_counter()
+    for i in range(keys):
+        store.hit(f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}-{i >> 24}", now)
+        if (i + 1) % 100_000 == 0:
+            current, _ = tracemalloc.get_traced_memory()
+            samples.append((i + 1, current))
+    elapsed = time.perf_counter() - start
+
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"\n{store_name}: {keys:,} distinct IPs, max_entries={max_entries:,}")
+    print(f"  throughput: {keys / elapsed:,.0f} checks/s ({elapsed * 1e9 / keys:,.0f} ns/check)")
+    for seen, current in samples:
+        print(f"  after {seen:>9,} keys: {current / 1024 / 1024:8.2f} MiB, {len(store):,} entries")
+    print(f"  peak: {peak / 1024 / 1024:.2f} MiB")
+
+    # Once the cap is reached memory must not keep growing with the key count
+    plateau = [current for seen, current in samples if seen > max_entries]
+    if len(plateau) >= 2 and plateau[-1] > plateau[0] * 1.1:
+        print("  FAIL: memory keeps growing after reaching max_entries")
+        return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--keys", type=int, default=1_000_000)
+    parser.add_argument("--max-entries", type=int, default=100_000)
+    args = parser.parse_args()
+
+    ok = all(run(name, args.keys, args.max_entries) for name in STORE_TYPES)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
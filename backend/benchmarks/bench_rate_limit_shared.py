@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Multi-worker correctness and latency check for the shared-memory rate limit table.
+Spawns N worker processes that all hammer the same keys, then verifies that the
+total number of allowed hits per key equals the limit (not limit x workers) and
+reports per-check latency percentiles.
+
+Usage (from backend/):  python benchmarks/bench_rate_limit_shared.py [--workers N] [--keys N]
+"""
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.rate_limit_shared import SharedMemoryCounterTable
+
+LIMIT = 5
+WINDOW = 3600
+
+
+def worker(name: str, keys: int, attempts: int, now: float, results):
+    table = SharedMemoryCounterTable(name=name)
+    allowed = [0] * keys
+    latencies = []
+    for _ in range(attempts):
+        for k in range(keys):
+            start = time.perf_counter_ns()
+            if table.hit_sync(f"contact:10.0.{k >> 8}.{k & 255}", LIMIT, WINDOW, now)[0]:
+                allowed[k] += 1
+            latencies.append(time.perf_counter_ns() - start)
+    table.close()
+    results.put((allowed, latencies))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--keys", type=int, default=2000)
+    parser.add_argument("--attempts", type=int, default=LIMIT * 2)
+    args = parser.parse_args()
+
+    name = f"portfolio_rate_limit_bench_{os.getpid()}"
+    table = SharedMemoryCounterTable(name=name)
+    # Pin the clock to the start of a window so the previous window weighs nothing
+    now = (time.time() // WINDOW) * WINDOW + 1
+
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=worker, args=(name, args.keys, args.attempts, now, results))
+        for _ in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    outputs = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    table.close()
+    table.unlink()
+
+    totals = [sum(allowed[k] for allowed, _ in outputs) for k in range(args.keys)]
+    latencies = sorted(ns for _, worker_latencies in outputs for ns in worker_latencies)
+    wrong = [k for k, total in enumerate(totals) if total != LIMIT]
+
+    print(f"{args.workers} workers x {args.keys:,} keys x {args.attempts} attempts, limit {LIMIT}")
+    print(f"  keys with allowed != limit: {len(wrong)}")
+    print(f"  per-check latency: p50 {latencies[len(latencies) // 2] / 1000:.1f} us, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] / 1000:.1f} us, "
+          f"mean {statistics.fmean(latencies) / 1000:.1f} us")
+
+    sys.exit(1 if wrong else 0)
+
+
+if __name__ == "__main__":
+    main()
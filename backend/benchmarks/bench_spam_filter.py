@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Spam filter micro-benchmark.
+Feeds distinct random messages through the filter until it is full, then
+reports check throughput, how many one-word variants of stored messages
+are caught as near-duplicates, how many unrelated messages are wrongly
+flagged, and traced memory, which must plateau at `max_entries`.
+
+Usage (from backend/):  python benchmarks/bench_spam_filter.py [--messages N] [--max-entries N] [--max-distance N]
+"""
+
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.spam_filter import NEAR_DUPLICATE, DUPLICATE, SpamFilter
+
+
+def random_message(rng: random.Random, vocabulary, words: int = 40) -> str:
+    return " ".join(rng.choice(vocabulary) for _ in range(words))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=60_000)
+    parser.add_argument("--max-entries", type=int, default=20_000)
+    parser.add_argument("--max-distance", type=int, default=7)
+    parser.add_argument("--variants", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    vocabulary = [f"w{i}" for i in range(5000)]
+    spam_filter = SpamFilter(max_entries=args.max_entries, max_distance=args.max_distance, email_limit=None)
+    now = time.time()
+
+    messages = [random_message(rng, vocabulary) for _ in range(args.messages)]
+
+    def feed(spam_filter, on_progress=None) -> int:
+        flagged = 0
+        for i, message in enumerate(messages):
+            verdict = spam_filter.check("bench@example.com", message, now=now)
+            if verdict.accepted:
+                spam_filter.record(verdict.fingerprint, f"bench-{i}", now=now)
+            elif verdict.reason in (NEAR_DUPLICATE, DUPLICATE):
+                flagged += 1
+            if on_progress is not None and (i + 1) % (args.messages // 5) == 0:
+                on_progress(i + 1)
+        return flagged
+
+    start = time.perf_counter()
+    false_positives = feed(spam_filter)
+    elapsed = time.perf_counter() - start
+
+    # Memory on a second, traced pass (tracing slows the checks down a lot)
+    samples = []
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    traced_filter = SpamFilter(max_entries=args.max_entries, max_distance=args.max_distance, email_limit=None)
+    feed(traced_filter, lambda seen: samples.append((seen, tracemalloc.get_traced_memory()[0] - baseline)))
+    tracemalloc.stop()
+
+    # One word swapped in messages the filter still holds
+    caught = 0
+    recent = messages[-min(args.variants, args.max_entries):]
+    for message in recent:
+        words = message.split()
+        words[rng.randrange(len(words))] = rng.choice(vocabulary)
+        if spam_filter.check("bench@example.com", " ".join(words), now=now).reason in (NEAR_DUPLICATE, DUPLICATE):
+            caught += 1
+
+    print(f"{args.messages:,} distinct 40-word messages, max_entries={args.max_entries:,}, max_distance={args.max_distance}")
+    print(f"  throughput: {args.messages / elapsed:,.0f} checks/s ({elapsed * 1e6 / args.messages:,.1f} us/check)")
+    print(f"  one-word variants caught: {caught / len(recent):.1%} of {len(recent):,}")
+    print(f"  unrelated messages flagged: {false_positives:,} ({false_positives / args.messages:.3%})")
+    for seen, current in samples:
+        print(f"  after {seen:>9,} messages: {current / 1024 / 1024:6.1f} MiB")
+
+    if len(spam_filter) > args.max_entries:
+        print(f"FAIL: {len(spam_filter):,} fingerprints held, over max_entries")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
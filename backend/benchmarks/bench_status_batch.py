@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Status check ingest benchmark: N single POST /api/status calls against the
+same N heartbeats sent through POST /api/status/batch, as a JSON array and as
+NDJSON, at a few batch sizes. Runs `server:app` in-process (httpx ASGI
+transport) on the mongomock stand-in, or on a local mongod with --mongo-url,
+where the saved per-call database round trips show up in full.
+
+Extra packages: httpx, and mongomock-motor for the in-memory stand-in.
+
+Usage (from backend/):
+    python benchmarks/bench_status_batch.py [--items N] [--batch-sizes 100,500]
+        [--concurrency N] [--mongo-url mongodb://localhost:27017]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+try:
+    import httpx
+except ImportError:
+    sys.exit("bench_status_batch.py needs httpx: pip install httpx")
+
+
+def heartbeats(count: int, offset: int = 0):
+    return [{"client_name": f"agent-{(offset + i) % 500}"} for i in range(count)]
+
+
+async def reset():
+    # Every run starts from an empty collection, so they pay the same index upkeep
+    import database
+    await database.get_database().status_checks.delete_many({})
+
+
+async def single_posts(client, items: int, concurrency: int) -> float:
+    await reset()
+    bodies = heartbeats(items)
+    position = 0
+
+    async def worker():
+        nonlocal position
+        while position < len(bodies):
+            body = bodies[position]
+            position += 1
+            response = await client.post("/api/status", json=body)
+            if response.status_code != 200:
+                sys.exit(f"POST /api/status returned {response.status_code}: {response.text}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - start
+
+
+async def batch_posts(client, items: int, batch_size: int, ndjson: bool) -> float:
+    await reset()
+    start = time.perf_counter()
+    for offset in range(0, items, batch_size):
+        batch = heartbeats(min(batch_size, items - offset), offset)
+        if ndjson:
+            response = await client.post(
+                "/api/status/batch",
+                content="\n".join(json.dumps(item) for item in batch),
+                headers={"Content-Type": "application/x-ndjson"},
+            )
+        else:
+            response = await client.post("/api/status/batch", json=batch)
+        result = response.json()
+        if response.status_code != 200 or result["errors"] or result["inserted"] != len(batch):
+            sys.exit(f"POST /api/status/batch returned {response.status_code}: {response.text}")
+    return time.perf_counter() - start
+
+
+async def check_partial_batch(client) -> bool:
+    batch = [{"client_name": "ok-1"}, {"client": "typo"}, {"client_name": 42}, {"client_name": "ok-2"}]
+    result = (await client.post("/api/status/batch", json=batch)).json()
+    return result["inserted"] == 2 and [error["index"] for error in result["errors"]] == [1, 2]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--batch-sizes", default="100,500")
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent single POSTs")
+    parser.add_argument("--mongo-url", default=None, help="Use a local mongod instead of mongomock")
+    args = parser.parse_args()
+    batch_sizes = [int(size) for size in args.batch_sizes.split(",")]
+
+    os.chdir(BACKEND_DIR)
+    os.environ["MONGO_URL"] = args.mongo_url or "mongodb://localhost:27017"
+    os.environ.setdefault("DB_NAME", "portfolio_status_batch_bench")
+    import database
+    if not args.mongo_url:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            sys.exit("In-memory mode needs mongomock-motor: pip install mongomock-motor (or pass --mongo-url)")
+        database.client = AsyncMongoMockClient()
+        database.db = database.client[os.environ["DB_NAME"]]
+
+    import server
+    transport = httpx.ASGITransport(app=server.app)
+    failed = False
+    async with server.lifespan(server.app):
+        if args.mongo_url:
+            await database.get_database().client.drop_database(os.environ["DB_NAME"])
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            if not await check_partial_batch(client):
+                print("FAIL: per-item errors of a partially invalid batch are wrong")
+                failed = True
+
+            single = await single_posts(client, args.items, args.concurrency)
+            print(f"{'single POST /api/status':<32} {args.items / single:>10,.0f} items/s")
+            for batch_size in batch_sizes:
+                for ndjson in (False, True):
+                    elapsed = await batch_posts(client, args.items, batch_size, ndjson)
+                    label = f"batch of {batch_size} ({'ndjson' if ndjson else 'json'})"
+                    print(f"{label:<32} {args.items / elapsed:>10,.0f} items/s   {single / elapsed:>6.1f}x")
+                    if elapsed >= single:
+                        print(f"FAIL: {label} is not faster than single POSTs")
+                        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
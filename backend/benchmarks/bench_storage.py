@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Storage backend benchmark: runs the same workload through the contact and
+status check repositories of each backend and checks that every backend
+returns the same rows.
+
+Workload: concurrent single contact inserts (what POST /api/contact does),
+status check batch inserts, the first admin page with and without the unread
+filter, a cursor walk over every page, counts, concurrent mark-as-read and a
+full export.
+
+Backends: `sqlite` (a temporary database file), `mongomock` (in-memory
+stand-in, only meaningful for the parity check) and `mongo` (a real mongod,
+needs --mongo-url).
+
+Usage (from backend/):
+    python benchmarks/bench_storage.py [--backends sqlite,mongomock,mongo] [--mongo-url URL]
+        [--contacts N] [--status-checks N] [--concurrency N] [--commit-batch N]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from services.storage import CONTACTS_SORT, MongoContactRepository, MongoStatusCheckRepository
+from services.storage_sqlite import SqliteContactRepository, SqliteEngine, SqliteStatusCheckRepository
+
+PROJECTION = {"_id": 0, "id": 1, "name": 1, "email": 1, "message": 1, "created_at": 1, "read": 1}
+SUMMARY = {"_id": 0, "id": 1, "email": 1, "created_at": 1, "read": 1}
+START = datetime(2024, 1, 1)
+
+
+def make_contact(i: int) -> dict:
+    return {
+        "id": str(uuid.UUID(int=random.Random(i).getrandbits(128))),
+        "name": f"Person {i}",
+        "email": f"person{i}@example.com",
+        "message": f"Hello, this is message number {i} about a project.",
+        "created_at": START + timedelta(milliseconds=i * 7),
+        "read": i % 3 == 0,
+        "ip_address": f"10.0.{i >> 8 & 255}.{i & 255}",
+        "user_agent": "bench",
+    }
+
+
+def make_status_check(i: int) -> dict:
+    return {"id": f"status-{i:08d}", "client_name": f"agent-{i % 50}", "timestamp": START + timedelta(seconds=i)}
+
+
+def digest(values) -> str:
+    return hashlib.sha1("\n".join(str(value) for value in values).encode()).hexdigest()[:12]
+
+
+async def timed_repeat(fn, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+async def run_concurrently(calls, concurrency: int) -> float:
+    calls = iter(calls)
+
+    async def worker():
+        for call in calls:
+            await call()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - start
+
+
+async def run_workload(contacts, status_checks, args) -> tuple:
+    results, parity = {}, {}
+
+    documents = [make_contact(i) for i in range(args.contacts)]
+    elapsed = await run_concurrently((lambda d=d: contacts.insert(dict(d)) for d in documents), args.concurrency)
+    results["contact insert, concurrent (ops/s)"] = args.contacts / elapsed
+
+    checks = [make_status_check(i) for i in range(args.status_checks)]
+    start = time.perf_counter()
+    for offset in range(0, len(checks), 500):
+        await status_checks.insert_many([dict(check) for check in checks[offset:offset + 500]])
+    results["status insert_many x500 (rows/s)"] = args.status_checks / (time.perf_counter() - start)
+
+    first_page = await contacts.find_page(SUMMARY, 50)
+    unread_page = await contacts.find_page(SUMMARY, 50, unread_only=True)
+    parity["first page"] = digest(row["id"] for row in first_page)
+    parity["unread page"] = digest(row["id"] for row in unread_page)
+    results["first page of 50 (ms)"] = await timed_repeat(lambda: contacts.find_page(SUMMARY, 50), args.repeats)
+    results["unread page of 50 (ms)"] = await timed_repeat(
+        lambda: contacts.find_page(SUMMARY, 50, unread_only=True), args.repeats
+    )
+
+    walked, after = [], None
+    start = time.perf_counter()
+    while True:
+        page = await contacts.find_page(SUMMARY, 100, after=after)
+        walked += [row["id"] for row in page]
+        if len(page) < 100:
+            break
+        after = {field: page[-1][field] for field, _ in CONTACTS_SORT}
+    results["cursor walk, 100/page (ms)"] = (time.perf_counter() - start) * 1000
+    parity["cursor walk"] = f"{len(walked)} rows {digest(walked)}"
+
+    status_page = await status_checks.find_page({"_id": 0, "id": 1, "timestamp": 1}, 100, client_name="agent-7")
+    parity["status page"] = digest(row["id"] for row in status_page)
+    results["status page by client (ms)"] = await timed_repeat(
+        lambda: status_checks.find_page({"_id": 0, "id": 1, "timestamp": 1}, 100, client_name="agent-7"),
+        args.repeats,
+    )
+
+    results["count unread (ms)"] = await timed_repeat(lambda: contacts.count(unread_only=True), args.repeats)
+
+    rng = random.Random(1)
+    targets = [rng.choice(documents)["id"] for _ in range(args.contacts // 4)]
+    elapsed = await run_concurrently((lambda t=t: contacts.set_read(t) for t in targets), args.concurrency)
+    results["mark read, concurrent (ops/s)"] = len(targets) / elapsed
+    parity["counts after mark read"] = (await contacts.count(), await contacts.count(unread_only=True))
+
+    matched = await contacts.set_read_many(False, before=START + timedelta(milliseconds=7 * args.contacts // 2))
+    parity["bulk mark unread"] = matched
+
+    start = time.perf_counter()
+    exported = [row["id"] async for row in contacts.iterate(PROJECTION, 500)]
+    results["export (rows/s)"] = len(exported) / (time.perf_counter() - start)
+    parity["export"] = f"{len(exported)} rows {digest(exported)}"
+    return results, parity
+
+
+async def open_backend(name: str, args):
+    """(contacts, status_checks, cleanup) for a backend"""
+    if name == "sqlite":
+        directory = tempfile.TemporaryDirectory()
+        engine = SqliteEngine(os.path.join(directory.name, "bench.sqlite3"), commit_batch=args.commit_batch)
+        await engine.start()
+
+        async def cleanup():
+            await engine.close()
+            directory.cleanup()
+        return SqliteContactRepository(engine), SqliteStatusCheckRepository(engine), cleanup
+
+    import database
+    if name == "mongomock":
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            sys.exit("The mongomock backend needs mongomock-motor: pip install mongomock-motor")
+        database.client = AsyncMongoMockClient()
+    elif name == "mongo":
+        if not args.mongo_url:
+            sys.exit("The mongo backend needs --mongo-url")
+        os.environ["MONGO_URL"] = args.mongo_url
+        database.client = None
+        database.connect()
+    else:
+        sys.exit(f"Unknown backend {name!r}")
+    database.db = database.client["portfolio_storage_bench"]
+    await database.client.drop_database("portfolio_storage_bench")
+    if name == "mongo":
+        await database.ensure_indexes()
+
+    async def cleanup():
+        await database.client.drop_database("portfolio_storage_bench")
+        await database.close_database()
+    return (
+        MongoContactRepository(lambda: database.db.contacts),
+        MongoStatusCheckRepository(lambda: database.db.status_checks),
+        cleanup,
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default="sqlite,mongomock")
+    parser.add_argument("--mongo-url", default=None)
+    parser.add_argument("--contacts", type=int, default=2000)
+    parser.add_argument("--status-checks", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--commit-batch", type=int, default=256, help="SQLite writes per group commit")
+    args = parser.parse_args()
+    backends = [name.strip() for name in args.backends.split(",") if name.strip()]
+
+    results, parity = {}, {}
+    for name in backends:
+        contacts, status_checks, cleanup = await open_backend(name, args)
+        try:
+            results[name], parity[name] = await run_workload(contacts, status_checks, args)
+        finally:
+            await cleanup()
+
+    print(f"{'':34}" + "".join(f"{name:>14}" for name in backends))
+    for operation in results[backends[0]]:
+        print(f"{operation:34}" + "".join(f"{results[name][operation]:>14,.2f}" for name in backends))
+
+    failed = False
+    for check, expected in parity[backends[0]].items():
+        for name in backends[1:]:
+            if parity[name][check] != expected:
+                print(f"MISMATCH {check}: {backends[0]}={expected} {name}={parity[name][check]}")
+                failed = True
+    if len(backends) > 1 and not failed:
+        print(f"\nidentical results from {', '.join(backends)} for {len(parity[backends[0]])} queries")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
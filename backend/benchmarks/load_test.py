@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Offline load-testing harness for the portfolio API.
+
+Drives configurable concurrency against the main endpoints and reports
+throughput and latency percentiles per scenario. By default `server:app` runs
+in-process (httpx ASGI transport, lifespan included) on top of an in-memory
+mongomock stand-in, so no network or database is needed. Use --mongo-url to
+run against a local mongod instead, or --url to hit an already running
+uvicorn (start it with --proxy-headers --forwarded-allow-ips='*' so the
+per-request client IPs below are honoured).
+
+Results are written as JSON (--output) and can be compared against an
+earlier run with --compare to spot regressions between commits.
+
+Extra packages: httpx, and mongomock-motor for the in-memory stand-in.
+
+Usage (from backend/):
+    python benchmarks/load_test.py [--scenarios contact,admin_list,...] [--requests N]
+        [--concurrency N] [--output results.json] [--compare baseline.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+try:
+    import httpx
+except ImportError:
+    sys.exit("load_test.py needs httpx: pip install httpx")
+
+
+class ForwardedForApp:
+    """Sets the ASGI client address from X-Forwarded-For, like uvicorn --proxy-headers"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            for name, value in scope["headers"]:
+                if name == b"x-forwarded-for":
+                    scope = dict(scope, client=(value.decode().split(",")[0].strip(), 0))
+                    break
+        await self.app(scope, receive, send)
+
+
+WORDS = ("project", "backend", "portfolio", "design", "hiring", "question", "python", "react",
+         "contract", "timeline", "budget", "meeting", "team", "startup", "feedback", "api")
+
+
+def contact_body(i: int) -> dict:
+    # Distinct wording per request, so the spam filter doesn't drop them as near-duplicates
+    rng = random.Random(i)
+    return {
+        "name": f"Load Test {i}",
+        "email": f"load{i}@example.com",
+        "message": " ".join(rng.choice(WORDS) for _ in range(16)) + f" {i}",
+    }
+
+
+def ip_for(i: int) -> str:
+    return f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}"
+
+
+# name -> request factory (i -> (method, path, kwargs))
+SCENARIOS = {
+    # Distinct IP per request, stays under the per-IP limit
+    "contact": lambda i: ("POST", "/api/contact", {
+        "json": contact_body(i), "headers": {"X-Forwarded-For": ip_for(i)},
+    }),
+    # One client hammering the form, almost everything is rate limited
+    "contact_hot_ip": lambda i: ("POST", "/api/contact", {
+        "json": contact_body(i + 2_000_000), "headers": {"X-Forwarded-For": "192.0.2.1"},
+    }),
+    # Rate limiter under a spread-out flood: every request from a new IP
+    "contact_many_ips": lambda i: ("POST", "/api/contact", {
+        "json": contact_body(i + 1_000_000), "headers": {"X-Forwarded-For": ip_for(i + 1_000_000)},
+    }),
+    "admin_list": lambda i: ("GET", "/api/admin/contacts", {"params": {"limit": 50}}),
+    "status_post": lambda i: ("POST", "/api/status", {"json": {"client_name": f"agent-{i % 200}"}}),
+    "status_get": lambda i: ("GET", "/api/status", {"params": {"limit": 100}}),
+}
+
+
+def percentile(sorted_values, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(q * len(sorted_values)))
+    return sorted_values[index]
+
+
+async def run_scenario(client: "httpx.AsyncClient", name: str, requests: int, concurrency: int) -> dict:
+    factory = SCENARIOS[name]
+    latencies = []
+    statuses: Counter = Counter()
+    next_index = iter(range(requests))
+
+    async def worker():
+        for i in next_index:
+            method, path, kwargs = factory(i)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                statuses[response.status_code] += 1
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 4),
+        "throughput_rps": round(requests / elapsed, 1),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1000, 3),
+            "p90": round(percentile(latencies, 0.90) * 1000, 3),
+            "p99": round(percentile(latencies, 0.99) * 1000, 3),
+            "max": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        },
+        "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_result(name: str, result: dict, baseline: dict = None):
+    latency = result["latency_ms"]
+    line = (f"{name:<18} {result['throughput_rps']:>9,.0f} req/s  "
+            f"p50 {latency['p50']:>7.2f}ms  p90 {latency['p90']:>7.2f}ms  "
+            f"p99 {latency['p99']:>7.2f}ms  max {latency['max']:>8.2f}ms  {result['statuses']}")
+    print(line)
+    if baseline:
+        rps_change = (result["throughput_rps"] / baseline["throughput_rps"] - 1) * 100
+        p99_change = (latency["p99"] / baseline["latency_ms"]["p99"] - 1) * 100 if baseline["latency_ms"]["p99"] else 0.0
+        print(f"{'':<18} vs baseline: throughput {rps_change:+.1f}%, p99 {p99_change:+.1f}%")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--url", default=None, help="Target a running server instead of in-process")
+    parser.add_argument("--mongo-url", default=None, help="Use a local mongod instead of mongomock")
+    parser.add_argument("--output", default=None, help="Write results as JSON")
+    parser.add_argument("--compare", default=None, help="Baseline JSON from an earlier run")
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        sys.exit(f"Unknown scenarios: {', '.join(unknown)} (available: {', '.join(SCENARIOS)})")
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file).get("scenarios", {})
+
+    results = {}
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=30) as client:
+            for name in scenarios:
+                results[name] = await run_scenario(client, name, args.requests, args.concurrency)
+                print_result(name, results[name], baseline.get(name))
+    else:
+        os.chdir(BACKEND_DIR)
+        os.environ.setdefault("MONGO_URL", args.mongo_url or "mongodb://localhost:27017")
+        os.environ.setdefault("DB_NAME", "portfolio_load_test")
+        import database
+        if args.mongo_url:
+            os.environ["MONGO_URL"] = args.mongo_url
+        else:
+            try:
+                from mongomock_motor import AsyncMongoMockClient
+            except ImportError:
+                sys.exit("In-memory mode needs mongomock-motor: pip install mongomock-motor (or pass --mongo-url)")
+            # connect() keeps an existing client, so the stand-in is used everywhere
+            database.client = AsyncMongoMockClient()
+            database.db = database.client[os.environ["DB_NAME"]]
+
+        import server
+        transport = httpx.ASGITransport(app=ForwardedForApp(server.app))
+        async with server.lifespan(server.app):
+            if args.mongo_url:
+                await database.get_database().client.drop_database(os.environ["DB_NAME"])
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=30) as client:
+                for name in scenarios:
+                    results[name] = await run_scenario(client, name, args.requests, args.concurrency)
+                    print_result(name, results[name], baseline.get(name))
+
+    if args.output:
+        report = {
+            "revision": git_revision(),
+            "created_at": datetime.utcnow().isoformat(),
+            "target": args.url or ("mongod" if args.mongo_url else "in-process/mongomock"),
+            "scenarios": results,
+        }
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,18 +1,287 @@
-from motor.motor_asyncio import AsyncIOMotorClient
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+import logging
 import os
-from dotenv import load_dotenv
+import threading
+import time
 
-load_dotenv()
+if TYPE_CHECKING:
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from pymongo.monitoring import ConnectionPoolListener
+
+# pymongo's sort directions, so the index specs below don't import it at startup
+ASCENDING, DESCENDING, TEXT = 1, -1, "text"
+
+logger = logging.getLogger(__name__)
+
+
+class PoolStatsListener:
+    """
+    Connection pool event listener feeding /api/admin/db/pool (registered
+    with pymongo through pool_listener).
+    Motor runs pymongo in a thread pool, so a checkout's start and end events
+    fire on the same thread and the wait time is measured with a thread-local.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.pools_created = 0
+            self.pools_cleared = 0
+            self.connections_created = 0
+            self.connections_closed = 0
+            self.checked_out = 0
+            self.max_checked_out = 0
+            self.checkouts = 0
+            self.checkout_failures = {}
+            self.wait_time_total = 0.0
+            self.wait_time_max = 0.0
+
+    def _wait_time(self) -> float:
+        started = getattr(self._local, "started", None)
+        self._local.started = None
+        return time.perf_counter() - started if started is not None else 0.0
+
+    def pool_created(self, event):
+        with self._lock:
+            self.pools_created += 1
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pools_cleared += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_created += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_closed += 1
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        waited = self._wait_time()
+        with self._lock:
+            self.checkout_failures[event.reason] = self.checkout_failures.get(event.reason, 0) + 1
+            self.wait_time_total += waited
+            self.wait_time_max = max(self.wait_time_max, waited)
+
+    def connection_checked_out(self, event):
+        waited = self._wait_time()
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+            self.wait_time_total += waited
+            self.wait_time_max = max(self.wait_time_max, waited)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            attempts = self.checkouts + sum(self.checkout_failures.values())
+            return {
+                "pools_created": self.pools_created,
+                "pools_cleared": self.pools_cleared,
+                "connections_created": self.connections_created,
+                "connections_closed": self.connections_closed,
+                "connections_open": self.connections_created - self.connections_closed,
+                "checked_out": self.checked_out,
+                "max_checked_out": self.max_checked_out,
+                "checkouts": self.checkouts,
+                "checkout_failures": dict(self.checkout_failures),
+                "wait_time_avg_ms": (self.wait_time_total / attempts * 1000) if attempts else 0.0,
+                "wait_time_max_ms": self.wait_time_max * 1000,
+            }
+
+
+pool_stats = PoolStatsListener()
+
+
+def pool_listener() -> "ConnectionPoolListener":
+    """pool_stats behind the listener base class pymongo checks for"""
+    from pymongo.monitoring import ConnectionPoolListener
+
+    class Listener(ConnectionPoolListener):
+        def __getattribute__(self, name):
+            return getattr(pool_stats, name)
+
+    return Listener()
+
+client: Optional["AsyncIOMotorClient"] = None
+db = None
+
+# Env var -> (client option, type), only passed on when set
+CLIENT_OPTIONS = {
+    "MONGO_MAX_POOL_SIZE": ("maxPoolSize", int),
+    "MONGO_MIN_POOL_SIZE": ("minPoolSize", int),
+    "MONGO_MAX_IDLE_TIME_MS": ("maxIdleTimeMS", int),
+    "MONGO_MAX_CONNECTING": ("maxConnecting", int),
+    "MONGO_WAIT_QUEUE_TIMEOUT_MS": ("waitQueueTimeoutMS", int),
+    "MONGO_SERVER_SELECTION_TIMEOUT_MS": ("serverSelectionTimeoutMS", int),
+    "MONGO_CONNECT_TIMEOUT_MS": ("connectTimeoutMS", int),
+    "MONGO_SOCKET_TIMEOUT_MS": ("socketTimeoutMS", int),
+    "MONGO_COMPRESSORS": ("compressors", str),
+    "MONGO_WRITE_CONCERN": ("w", lambda v: int(v) if v.isdigit() else v),
+    "MONGO_JOURNAL": ("journal", lambda v: v.lower() in ("1", "true", "yes")),
+    "MONGO_READ_CONCERN": ("readConcernLevel", str),
+    "MONGO_READ_PREFERENCE": ("readPreference", str),
+}
+
+
+def index(keys: List[Tuple[str, object]], **options) -> tuple:
+    """An entry of INDEXES: pymongo IndexModel arguments, built by ensure_indexes"""
+    return keys, options
+
+
+# Indexes ensured at startup, per collection
+# Relevance weights of the contact search fields, shared with the in-process index
+CONTACT_TEXT_WEIGHTS = {"name": 5, "email": 5, "message": 1}
+
+INDEXES: Dict[str, List[tuple]] = {
+    "contacts": [
+        index([("id", ASCENDING)], unique=True, name="id_unique"),
+        # Admin listing: newest first, `id` breaks ties for keyset pagination
+        index(
+            [("created_at", DESCENDING), ("id", DESCENDING)],
+            name="created_at_id",
+        ),
+        index(
+            [("read", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="read_created_at_id",
+        ),
+        # /api/admin/contacts/analytics: covers the time range scan, message bodies are never read
+        index(
+            [("created_at", ASCENDING), ("email", ASCENDING), ("user_agent", ASCENDING)],
+            name="created_at_email_user_agent",
+        ),
+        # Incremental analytics refreshes: contacts stored since the last watermark
+        index(
+            [("ingested_at", ASCENDING), ("created_at", ASCENDING), ("email", ASCENDING), ("user_agent", ASCENDING)],
+            name="ingested_at_created_at_email_user_agent",
+        ),
+        # Notification outbox sweep: only contacts still waiting for their outbox entry
+        index(
+            [("notify_pending", ASCENDING)],
+            name="notify_pending", partialFilterExpression={"notify_pending": True},
+        ),
+        # /api/admin/contacts/search (a collection can only have one text index)
+        index(
+            [(field, TEXT) for field in CONTACT_TEXT_WEIGHTS],
+            weights=CONTACT_TEXT_WEIGHTS, default_language="english", name="contact_text",
+        ),
+    ],
+    "status_checks": [
+        index([("id", ASCENDING)], unique=True, name="id_unique"),
+        # Listing: newest first, optionally filtered by client_name
+        index(
+            [("timestamp", DESCENDING), ("id", DESCENDING)],
+            name="timestamp_id",
+        ),
+        index(
+            [("client_name", ASCENDING), ("timestamp", DESCENDING), ("id", DESCENDING)],
+            name="client_name_timestamp_id",
+        ),
+    ],
+    # New-contact notifications waiting for services.notifications
+    "notification_outbox": [
+        index(
+            [("status", ASCENDING), ("next_attempt_at", ASCENDING), ("created_at", ASCENDING)],
+            name="status_next_attempt_at",
+        ),
+        index([("claim", ASCENDING)], name="claim", sparse=True),
+        # Delivered entries are only kept for a week
+        index([("sent_at", ASCENDING)], name="sent_at_ttl", expireAfterSeconds=7 * 86400),
+    ],
+    # Responses of POSTs sent with an Idempotency-Key (IDEMPOTENCY_BACKEND=mongo),
+    # keyed on `_id`; each document expires at its own `expires_at`
+    "idempotency_keys": [
+        index([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    # Hourly per-client status check counts written by the retention rollup
+    "status_check_rollups": [
+        index(
+            [("client_name", ASCENDING), ("hour", ASCENDING)],
+            unique=True, name="client_name_hour_unique",
+        ),
+    ],
+}
+
+
+def get_client_options() -> dict:
+    """Motor client options from MONGO_* environment variables"""
+    options = {}
+    for env_name, (option, convert) in CLIENT_OPTIONS.items():
+        value = os.environ.get(env_name)
+        if value:
+            options[option] = convert(value)
+    return options
+
+
+def connect() -> "AsyncIOMotorClient":
+    """Create the process-wide client, normally called from the app lifespan"""
+    global client, db
+    if client is None:
+        # Motor pulls in multiprocessing and friends, only pay for it once needed
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(
+            os.environ['MONGO_URL'],
+            event_listeners=[pool_listener()],
+            **get_client_options()
+        )
+        db = client[os.environ.get('DB_NAME', 'portfolio_db')]
+    return client
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME', 'portfolio_db')]
 
 def get_database():
     """Get database instance"""
+    if db is None:
+        connect()
     return db
 
+
+async def ensure_indexes():
+    """Create any missing indexes from INDEXES (no-op for existing ones)"""
+    from pymongo import IndexModel
+    db = get_database()
+    for collection, indexes in INDEXES.items():
+        try:
+            await db[collection].create_indexes([IndexModel(keys, **options) for keys, options in indexes])
+        except Exception as e:
+            logger.error(f"Error creating indexes on {collection}: {str(e)}")
+
+
+def get_pool_stats() -> dict:
+    """Connection pool metrics plus the configured pool limits"""
+    stats = pool_stats.snapshot()
+    if client is not None:
+        pool_options = client.delegate.options.pool_options
+        stats["max_pool_size"] = pool_options.max_pool_size
+        stats["min_pool_size"] = pool_options.min_pool_size
+        stats["max_idle_time_seconds"] = pool_options.max_idle_time_seconds
+    return stats
+
+
 async def close_database():
     """Close database connection"""
-    client.close()
\ No newline at end of file
+    global client, db
+    if client is not None:
+        client.close()
+        client = None
+        db = None
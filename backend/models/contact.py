@@ -1,48 +1,85 @@
-from pydantic import BaseModel, Field, EmailStr, validator
+from pydantic import AfterValidator, BaseModel, Field, EmailStr, TypeAdapter
 from datetime import datetime
-from typing import Optional
+from typing import List, Literal, Optional
+from typing_extensions import Annotated, TypedDict
 import uuid
 
+def not_blank(label: str):
+    """Strip surrounding whitespace, rejecting values that are only whitespace"""
+    def check(v: str) -> str:
+        v = v.strip()
+        if not v:
+            raise ValueError(f'{label} cannot be empty')
+        return v
+    return AfterValidator(check)
+
+# Constraints and cleanup compiled into the core schema, no Python-level validator hop
+ContactName = Annotated[str, Field(min_length=2, max_length=100), not_blank('Name')]
+ContactText = Annotated[str, Field(min_length=10, max_length=1000), not_blank('Message')]
+
 class ContactMessage(BaseModel):
+    """
+    A stored contact message. Submissions are validated once as
+    ContactMessageCreate and turned into this with model_construct().
+    """
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    name: str = Field(..., min_length=2, max_length=100)
+    name: ContactName
     email: EmailStr
-    message: str = Field(..., min_length=10, max_length=1000)
+    message: ContactText
     created_at: datetime = Field(default_factory=datetime.utcnow)
     read: bool = False
     ip_address: Optional[str] = None
     user_agent: Optional[str] = None
 
-    @validator('name')
-    def validate_name(cls, v):
-        if not v.strip():
-            raise ValueError('Name cannot be empty')
-        return v.strip()
-
-    @validator('message')
-    def validate_message(cls, v):
-        if not v.strip():
-            raise ValueError('Message cannot be empty')
-        return v.strip()
-
 class ContactMessageCreate(BaseModel):
-    name: str = Field(..., min_length=2, max_length=100)
+    name: ContactName
     email: EmailStr
-    message: str = Field(..., min_length=10, max_length=1000)
+    message: ContactText
+    # Honeypot: hidden in the form, only bots fill it in. Never stored.
+    website: Optional[str] = Field(None, max_length=200)
 
-    @validator('name')
-    def validate_name(cls, v):
-        if not v.strip():
-            raise ValueError('Name cannot be empty')
-        return v.strip()
+class ContactResponse(BaseModel):
+    success: bool
+    message: str
+    id: Optional[str] = None
 
-    @validator('message')
-    def validate_message(cls, v):
-        if not v.strip():
-            raise ValueError('Message cannot be empty')
-        return v.strip()
+class ContactBulkAction(BaseModel):
+    """Apply one action to many contacts, selected by ids and/or a filter"""
+    action: Literal["mark_read", "mark_unread", "delete"]
+    ids: Optional[List[str]] = Field(None, min_length=1, max_length=10000)
+    before: Optional[datetime] = None
+    unread_only: bool = False
 
-class ContactResponse(BaseModel):
+class ContactBulkResponse(BaseModel):
     success: bool
+    matched: int
+    modified: int
+
+class ContactMessageRow(TypedDict, total=False):
+    """
+    A stored contact document as returned by a projected query.
+    Used to serialize admin listings straight from raw documents: the data
+    was validated on the way in, so it is not re-validated on the way out.
+    """
+    id: str
+    name: str
+    email: str
     message: str
-    id: Optional[str] = None
\ No newline at end of file
+    created_at: datetime
+    read: bool
+    ip_address: Optional[str]
+    user_agent: Optional[str]
+
+# Built once at import, dump_json() serializes a page of rows in one pass
+contact_rows_adapter = TypeAdapter(List[ContactMessageRow])
+contact_row_adapter = TypeAdapter(ContactMessageRow)
+
+class ContactSearchRow(ContactMessageRow, total=False):
+    """A contact row from /api/admin/contacts/search with its relevance score"""
+    score: float
+
+contact_search_rows_adapter = TypeAdapter(List[ContactSearchRow])
+
+CONTACT_FIELDS = list(ContactMessageRow.__annotations__)
+# Listing without the bulky per-message fields
+CONTACT_SUMMARY_FIELDS = [f for f in CONTACT_FIELDS if f not in ("message", "user_agent")]
\ No newline at end of file
@@ -0,0 +1,33 @@
+from pydantic import BaseModel, Field, TypeAdapter
+from datetime import datetime
+from typing import List
+from typing_extensions import TypedDict
+import uuid
+
+class StatusCheck(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    client_name: str
+    timestamp: datetime = Field(default_factory=datetime.utcnow)
+
+class StatusCheckCreate(BaseModel):
+    client_name: str
+
+class StatusBatchError(BaseModel):
+    """Why the item at `index` of a batch was not stored"""
+    index: int
+    error: str
+
+class StatusBatchResponse(BaseModel):
+    inserted: int
+    errors: List[StatusBatchError]
+
+class StatusCheckRow(TypedDict, total=False):
+    """A stored status check document, serialized without re-validation"""
+    id: str
+    client_name: str
+    timestamp: datetime
+
+# Validates a whole POST /api/status/batch body in one pass
+status_batch_adapter = TypeAdapter(List[StatusCheckCreate])
+status_rows_adapter = TypeAdapter(List[StatusCheckRow])
+status_row_adapter = TypeAdapter(StatusCheckRow)
\ No newline at end of file
@@ -0,0 +1,98 @@
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+import logging
+import os
+
+from database import get_pool_stats
+from services.retention import RetentionRunInProgress, retention_policy
+from services.profiler import worker_profiler
+from services.storage import storage
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/admin", tags=["admin"])
+
+@router.get("/db/pool")
+async def get_db_pool_stats():
+    """
+    MongoDB connection pool metrics (checked-out connections, wait times,
+    checkout failures such as pool exhaustion timeouts)
+    In production, add proper authentication
+    """
+    return get_pool_stats()
+
+@router.get("/retention")
+async def get_retention_report():
+    """Retention policy settings and the report of the last run"""
+    return {
+        "status_ttl_days": retention_policy.status_ttl_days,
+        "status_rollup_hours": retention_policy.status_rollup_hours,
+        "contact_archive_days": retention_policy.contact_archive_days,
+        "contact_archive_path": retention_policy.contact_archive_path,
+        "interval": retention_policy.interval,
+        "last_report": retention_policy.last_report,
+    }
+
+@router.post("/retention/run")
+async def run_retention():
+    """
+    Apply the retention policy now: TTL index, status check rollup and
+    contact archival. Returns removed documents and size changes, or 409
+    while another run is in progress.
+    """
+    if not storage.uses_mongo:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Retention works on MongoDB collections, not with STORAGE_BACKEND={storage.backend}"
+        )
+    try:
+        return await retention_policy.run()
+    except RetentionRunInProgress:
+        raise HTTPException(
+            status_code=409,
+            detail="The retention policy is already being applied"
+        )
+    except Exception as e:
+        logger.error(f"Error running retention policy: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Error running retention policy"
+        )
+
+def check_profiling_access(token: Optional[str]):
+    if not worker_profiler.enabled:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if worker_profiler.token and token != worker_profiler.token:
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+@router.get("/profile/workers")
+async def get_profiling_workers(x_profiling_token: Optional[str] = Header(None)):
+    """Worker pids that can be targeted by /api/admin/profile"""
+    check_profiling_access(x_profiling_token)
+    return {"this_worker": os.getpid(), "workers": worker_profiler.workers()}
+
+@router.post("/profile", response_class=PlainTextResponse)
+async def run_profile(
+    seconds: float = Query(10, gt=0, le=120),
+    requests: Optional[int] = Query(None, ge=1),
+    interval_ms: float = Query(5, ge=1, le=1000),
+    pid: Optional[int] = None,
+    x_profiling_token: Optional[str] = Header(None)
+):
+    """
+    Sample the stacks of one worker for `seconds` (or until it has handled
+    `requests` more requests) and return them in collapsed-stack format,
+    ready for flamegraph.pl or speedscope. `pid` targets another worker.
+    Requires PROFILING_ENABLED=true (and X-Profiling-Token if PROFILING_TOKEN is set).
+    """
+    check_profiling_access(x_profiling_token)
+    try:
+        result = await worker_profiler.profile(seconds, interval_ms / 1000, requests, pid)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    return PlainTextResponse(result)
\ No newline at end of file
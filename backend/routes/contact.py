@@ -1,75 +1,186 @@
-from fastapi import APIRouter, HTTPException, Request, Depends
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response, Depends
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import List, Optional
 import logging
+import uuid
 from datetime import datetime, timedelta
 import asyncio
-from collections import defaultdict
-import time
 
-from models.contact import ContactMessage, ContactMessageCreate, ContactResponse
+from models.contact import (
+    ContactMessage, ContactMessageCreate, ContactResponse,
+    ContactBulkAction, ContactBulkResponse,
+    CONTACT_FIELDS, CONTACT_SUMMARY_FIELDS, contact_rows_adapter, contact_row_adapter,
+    contact_search_rows_adapter
+)
 from database import get_database
-
-# Rate limiting storage (in production, use Redis)
-rate_limit_storage = defaultdict(list)
+from services.storage import CONTACTS_SORT, SEARCH_SORT, storage
+from services.rate_limit import rate_limiter
+from services.write_behind import WriteBehindQueue
+from services.pagination import InvalidCursor, decode_cursor, encode_cursor, next_cursor
+from services.export import csv_chunks, ndjson_chunks
+from services.contact_stats import ContactCounters
+from services.response_cache import response_cache
+from services.metrics import db_timer, rate_limit_rejections, spam_rejections
+from services.spam_filter import EMAIL_THROTTLED, TOO_MANY_LINKS, spam_filter
+from services.search import ContactSearchIndex
+from services.notifications import NotificationDispatcher
+from services.analytics import ContactAnalytics
+from services.idempotency import run_idempotent
 
 logger = logging.getLogger(__name__)
 
+def contacts_flushed():
+    response_cache.invalidate("contacts")
+    if notification_dispatcher is not None:
+        # Buffered contacts only get their outbox entry once they are stored
+        notification_dispatcher.wake_sweep()
+
+# Opt-in write-behind buffering of contact inserts (CONTACT_WRITE_BEHIND=true)
+contact_writer = WriteBehindQueue.from_env(
+    "CONTACT_WRITE_BEHIND", lambda: storage.contacts, on_flush=contacts_flushed
+)
+
+# Cached total/unread counts for /api/admin/contacts/stats
+contact_counters = ContactCounters.from_env(storage.contacts)
+
+# In-process search index (CONTACT_SEARCH_BACKEND=memory), None means the storage's search
+contact_search = ContactSearchIndex.from_env(storage.contacts)
+
+# Incrementally refreshed traffic counts for /api/admin/contacts/analytics
+contact_analytics = ContactAnalytics.from_env(storage.contacts)
+
 router = APIRouter(prefix="/api", tags=["contact"])
 
-def check_rate_limit(ip_address: str, max_requests: int = 5, window_hours: int = 1) -> bool:
+# Owner notifications about new messages (NOTIFY_TRANSPORT=smtp|webhook)
+notification_dispatcher = NotificationDispatcher.from_env(
+    lambda: get_database().notification_outbox, lambda: get_database().contacts
+)
+
+def build_contact_projection(fields: Optional[str], summary: bool) -> dict:
     """
-    Simple rate limiting - max 5 requests per hour per IP
-    In production, use Redis for distributed rate limiting
+    Mongo projection for the admin listing: never `_id`, and only the
+    requested fields (the sort keys are always included for the cursor)
     """
-    now = time.time()
-    window_start = now - (window_hours * 3600)
-    
-    # Clean old entries
-    rate_limit_storage[ip_address] = [
-        timestamp for timestamp in rate_limit_storage[ip_address] 
-        if timestamp > window_start
-    ]
-    
-    # Check if under limit
-    if len(rate_limit_storage[ip_address]) >= max_requests:
-        return False
-    
-    # Add current request
-    rate_limit_storage[ip_address].append(now)
-    return True
+    if fields:
+        requested = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in requested if f not in CONTACT_FIELDS]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown fields: {', '.join(unknown)}"
+            )
+    else:
+        requested = CONTACT_SUMMARY_FIELDS if summary else CONTACT_FIELDS
+
+    projection = {"_id": 0}
+    for field in requested:
+        projection[field] = 1
+    for field, _ in CONTACTS_SORT:
+        projection[field] = 1
+    return projection
+
+async def check_rate_limit(ip_address: str, route: str = "contact") -> bool:
+    """
+    Sliding window rate limiting per IP, limits are configured per route
+    (default for contact: max 5 requests per hour per IP)
+    """
+    return await rate_limiter.check(route, ip_address)
 
 @router.post("/contact", response_model=ContactResponse)
 async def submit_contact_form(
     contact_data: ContactMessageCreate,
-    request: Request
+    request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, max_length=255)
 ):
     """
     Submit contact form message
+    With an Idempotency-Key header, a retry gets the original response back
+    instead of storing the message again.
     """
+    return await run_idempotent(
+        "contact", idempotency_key, contact_data.model_dump_json(), response,
+        lambda: save_contact_message(contact_data, request)
+    )
+
+async def save_contact_message(contact_data: ContactMessageCreate, request: Request) -> dict:
     try:
         # Get client IP and user agent
         client_ip = request.client.host
         user_agent = request.headers.get("user-agent", "")
         
         # Rate limiting check
-        if not check_rate_limit(client_ip):
+        if not await check_rate_limit(client_ip):
+            rate_limit_rejections.inc(("contact",))
             raise HTTPException(
                 status_code=429,
-                detail="Too many requests. Please try again later."
+                detail="Too many requests. Please try again later.",
+                headers={"Retry-After": str(rate_limiter.retry_after("contact", client_ip))}
             )
         
-        # Create contact message
-        contact_message = ContactMessage(
-            **contact_data.dict(),
+        # Spam/duplicate screening, before any database work
+        verdict = None
+        if spam_filter is not None:
+            verdict = spam_filter.check(contact_data.email, contact_data.message, contact_data.website)
+            if not verdict.accepted:
+                spam_rejections.inc((verdict.reason,))
+                if verdict.reason == EMAIL_THROTTLED:
+                    raise HTTPException(
+                        status_code=429,
+                        detail="Too many requests. Please try again later.",
+                        headers={"Retry-After": str(spam_filter.retry_after(contact_data.email))}
+                    )
+                if verdict.reason == TOO_MANY_LINKS:
+                    raise HTTPException(
+                        status_code=400,
+                        detail="Please include fewer links in your message."
+                    )
+                # Bots get the usual answer and double submits the id of the
+                # message already stored; nothing new is stored
+                return ContactResponse(
+                    success=True,
+                    message="Thank you for your message! I'll get back to you soon.",
+                    id=verdict.original_id or str(uuid.uuid4())
+                ).model_dump()
+        
+        # Create contact message (contact_data is already validated)
+        contact_message = ContactMessage.model_construct(
+            **contact_data.model_dump(exclude={"website"}),
             ip_address=client_ip,
             user_agent=user_agent
         )
         
         # Save to database
-        db = get_database()
-        contact_dict = contact_message.dict()
-        await db.contacts.insert_one(contact_dict)
+        contact_dict = contact_message.model_dump()
+        if notification_dispatcher is not None:
+            # Stored with the contact and cleared once its outbox entry is written
+            # below, so the outbox sweep catches a contact whose entry never was
+            contact_dict["notify_pending"] = True
+        if contact_writer is not None:
+            try:
+                await contact_writer.enqueue(contact_dict)
+            except asyncio.QueueFull:
+                raise HTTPException(
+                    status_code=503,
+                    detail="Server is busy. Please try again shortly."
+                )
+        else:
+            with db_timer("contacts", "insert_one"):
+                await storage.contacts.insert(contact_dict)
+        if verdict is not None:
+            spam_filter.record(verdict.fingerprint, contact_message.id)
+        if contact_search is not None:
+            contact_search.add(contact_dict)
+        if notification_dispatcher is not None and contact_writer is None:
+            # Only the outbox write happens here, delivery is in the background. A
+            # buffered contact isn't stored yet: the sweep writes its entry after the flush
+            try:
+                with db_timer("notification_outbox", "insert_one"):
+                    await notification_dispatcher.enqueue(contact_dict)
+            except Exception as e:
+                logger.warning(f"Outbox write for contact {contact_message.id} failed, left to the outbox sweep: {str(e)}")
+        contact_counters.record_insert()
+        response_cache.invalidate("contacts")
         
         logger.info(f"New contact message from {contact_data.email} - {contact_data.name}")
         
@@ -77,7 +188,7 @@ async def submit_contact_form(
             success=True,
             message="Thank you for your message! I'll get back to you soon.",
             id=contact_message.id
-        )
+        ).model_dump()
         
     except HTTPException:
         raise
@@ -90,31 +201,59 @@ async def submit_contact_form(
 
 @router.get("/admin/contacts", response_model=List[ContactMessage])
 async def get_contact_messages(
+    request: Request,
     skip: int = 0,
     limit: int = 50,
-    unread_only: bool = False
+    unread_only: bool = False,
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    summary: bool = False
 ):
     """
     Get contact messages for admin (basic implementation)
+    Pass the X-Next-Cursor header of a page as `after` to fetch the next one;
+    unlike `skip` (ignored when `after` is set) this costs O(limit) at any depth.
+    `fields` (comma separated) or `summary` (no message/user_agent) trim the rows.
+    Responses are cached and carry an ETag, send If-None-Match to get a 304.
     In production, add proper authentication
     """
+    return await response_cache.respond(
+        request, "contacts",
+        lambda: list_contact_messages(skip, limit, unread_only, after, fields, summary)
+    )
+
+async def list_contact_messages(
+    skip: int,
+    limit: int,
+    unread_only: bool,
+    after: Optional[str],
+    fields: Optional[str],
+    summary: bool
+) -> Response:
     try:
-        db = get_database()
+        projection = build_contact_projection(fields, summary)
+        after_values = decode_cursor(after, CONTACTS_SORT) if after else None
         
-        # Build query
-        query = {}
-        if unread_only:
-            query["read"] = False
+        # Get messages with pagination (`skip` is ignored after a cursor)
+        with db_timer("contacts", "find"):
+            contacts = await storage.contacts.find_page(projection, limit, unread_only, after_values, skip)
         
-        # Get messages with pagination
-        cursor = db.contacts.find(query).sort("created_at", -1).skip(skip).limit(limit)
-        contacts = await cursor.to_list(length=limit)
-        
-        # Convert to ContactMessage objects
-        contact_messages = [ContactMessage(**contact) for contact in contacts]
+        # Documents were validated on insert, serialize them as stored instead
+        # of rebuilding ContactMessage objects and validating them again
+        response = Response(
+            content=contact_rows_adapter.dump_json(contacts),
+            media_type="application/json"
+        )
+        cursor_token = next_cursor(contacts, limit, CONTACTS_SORT)
+        if cursor_token:
+            response.headers["X-Next-Cursor"] = cursor_token
         
-        return contact_messages
+        return response
         
+    except HTTPException:
+        raise
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching contact messages: {str(e)}")
         raise HTTPException(
@@ -122,21 +261,172 @@ async def get_contact_messages(
             detail="Error fetching contact messages"
         )
 
+@router.get("/admin/contacts/search", response_model=List[ContactMessage])
+async def search_contact_messages(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    summary: bool = False
+):
+    """
+    Search contact messages by name, email or message text, most relevant first
+    Each row carries its relevance `score`; pass the X-Next-Cursor header of a
+    page as `after` to fetch the next one.
+    In production, add proper authentication
+    """
+    return await response_cache.respond(
+        request, "contacts",
+        lambda: search_contacts(q, limit, after, fields, summary)
+    )
+
+async def search_contacts(
+    q: str,
+    limit: int,
+    after: Optional[str],
+    fields: Optional[str],
+    summary: bool
+) -> Response:
+    try:
+        projection = build_contact_projection(fields, summary)
+        after_values = decode_cursor(after, SEARCH_SORT) if after else None
+        
+        if contact_search is not None:
+            hits = contact_search.search(q, limit, after_values)
+            with db_timer("contacts", "find"):
+                found = await storage.contacts.find_by_ids([contact_id for _, _, contact_id in hits], projection)
+            by_id = {contact["id"]: contact for contact in found}
+            contacts = []
+            for score, _, contact_id in hits:
+                # Missing only if deleted (or not flushed yet) since it was indexed
+                if contact_id in by_id:
+                    contacts.append({**by_id[contact_id], "score": score})
+            cursor_token = None
+            if len(hits) == limit:
+                score, created_at, contact_id = hits[-1]
+                cursor_token = encode_cursor({"score": score, "created_at": created_at, "id": contact_id}, SEARCH_SORT)
+        else:
+            with db_timer("contacts", "aggregate"):
+                contacts = await storage.contacts.search(q, limit, after_values, projection)
+            cursor_token = next_cursor(contacts, limit, SEARCH_SORT)
+        
+        response = Response(
+            content=contact_search_rows_adapter.dump_json(contacts),
+            media_type="application/json"
+        )
+        if cursor_token:
+            response.headers["X-Next-Cursor"] = cursor_token
+        return response
+        
+    except HTTPException:
+        raise
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error searching contact messages: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Error searching contact messages"
+        )
+
+@router.get("/admin/contacts/stats")
+async def get_contact_stats():
+    """
+    Total/read/unread contact counts from the in-memory counter cache
+    In production, add proper authentication
+    """
+    return await contact_counters.snapshot()
+
+@router.get("/admin/contacts/analytics")
+async def get_contact_analytics(
+    request: Request,
+    days: int = Query(7, ge=1, le=365),
+    bucket: str = Query("day", pattern="^(hour|day)$"),
+    top: int = Query(10, ge=1, le=100)
+):
+    """
+    Contact traffic of the last `days` days: submissions per hour or day,
+    totals per hour of day, top sender domains and user agents, and the
+    current read/unread split. Aggregated in the database and refreshed
+    incrementally, so the cost does not grow with the collection size.
+    In production, add proper authentication
+    """
+    if days > contact_analytics.max_days:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Analytics cover at most {contact_analytics.max_days} days"
+        )
+    if bucket == "hour" and days > 31:
+        raise HTTPException(
+            status_code=400,
+            detail="Hourly buckets are limited to 31 days"
+        )
+    return await response_cache.respond(
+        request, "contacts",
+        lambda: contact_analytics_report(days, bucket, top)
+    )
+
+async def contact_analytics_report(days: int, bucket: str, top: int) -> Response:
+    try:
+        with db_timer("contacts", "aggregate"):
+            report = await contact_analytics.report(days, bucket, top)
+        counters = await contact_counters.snapshot()
+        report["read"] = counters["read"]
+        report["unread"] = counters["unread"]
+        return JSONResponse(report)
+        
+    except Exception as e:
+        logger.error(f"Error building contact analytics: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Error building contact analytics"
+        )
+
+@router.get("/admin/contacts/export")
+async def export_contact_messages(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    batch_size: int = Query(500, ge=1, le=10000),
+    unread_only: bool = False,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+):
+    """
+    Stream all matching contact messages as NDJSON or CSV
+    Rows are read from the cursor `batch_size` at a time, so memory use does
+    not depend on the collection size. Filters run in the query.
+    In production, add proper authentication
+    """
+    cursor = storage.contacts.iterate(
+        build_contact_projection(None, False), batch_size, unread_only, since, until
+    )
+    
+    if format == "csv":
+        body = csv_chunks(cursor, CONTACT_FIELDS, batch_size)
+        media_type = "text/csv"
+    else:
+        body = ndjson_chunks(cursor, contact_row_adapter, batch_size)
+        media_type = "application/x-ndjson"
+    
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="contacts.{format}"'}
+    )
+
 @router.patch("/admin/contacts/{contact_id}/read")
 async def mark_contact_as_read(contact_id: str):
     """
     Mark contact message as read
     """
     try:
-        db = get_database()
-        
-        result = await db.contacts.update_one(
-            {"id": contact_id},
-            {"$set": {"read": True}}
-        )
+        with db_timer("contacts", "update_one"):
+            matched, modified = await storage.contacts.set_read(contact_id)
         
-        if result.matched_count == 0:
+        if matched == 0:
             raise HTTPException(status_code=404, detail="Contact message not found")
+        contact_counters.record_read_change(became_read=modified)
+        response_cache.invalidate("contacts")
         
         return {"success": True, "message": "Contact marked as read"}
         
@@ -147,4 +437,52 @@ async def mark_contact_as_read(contact_id: str):
         raise HTTPException(
             status_code=500,
             detail="Error updating contact message"
+        )
+
+@router.post("/admin/contacts/bulk", response_model=ContactBulkResponse)
+async def bulk_update_contacts(action: ContactBulkAction):
+    """
+    Mark read/unread or delete many contact messages in one database call
+    Select messages by `ids`, by `before` (created before a timestamp) and/or
+    `unread_only`; at least one of `ids` or `before` is required.
+    """
+    if not action.ids and action.before is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Provide ids or before to select contact messages"
+        )
+    
+    try:
+        selection = {"ids": action.ids, "before": action.before, "unread_only": action.unread_only}
+        
+        if action.action == "delete":
+            with db_timer("contacts", "delete_many"):
+                matched = modified = await storage.contacts.delete_many(**selection)
+            contact_counters.invalidate()
+            contact_analytics.invalidate()
+            if contact_search is not None:
+                if action.before is None and not action.unread_only:
+                    contact_search.remove(action.ids)
+                else:
+                    contact_search.invalidate()
+        else:
+            with db_timer("contacts", "update_many"):
+                matched, modified = await storage.contacts.set_read_many(
+                    action.action == "mark_read", **selection
+                )
+            if action.action == "mark_read":
+                contact_counters.record_read_change(became_read=modified)
+            else:
+                contact_counters.record_read_change(became_unread=modified)
+        response_cache.invalidate("contacts")
+        
+        logger.info(f"Bulk {action.action} on contacts: {matched} matched, {modified} modified")
+        
+        return ContactBulkResponse(success=True, matched=matched, modified=modified)
+        
+    except Exception as e:
+        logger.error(f"Error applying bulk contact update: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail="Error updating contact messages"
         )
\ No newline at end of file
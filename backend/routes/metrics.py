@@ -0,0 +1,39 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from database import pool_stats
+from routes.contact import contact_writer
+from services.admission import admission_controller
+from services.idempotency import idempotency_store
+from services.metrics import registry
+from services.rate_limit import rate_limiter
+from services.response_cache import response_cache
+from services.spam_filter import spam_filter
+
+router = APIRouter(tags=["metrics"])
+
+# Gauges read at scrape time, so they cost nothing on the request path
+registry.gauge("rate_limit_storage_keys", "Keys held by the rate limiter", lambda: len(rate_limiter))
+registry.gauge("response_cache_entries", "Responses held by the response cache", lambda: len(response_cache))
+registry.gauge("response_cache_hits", "Response cache hits", lambda: response_cache.hits)
+registry.gauge("response_cache_misses", "Response cache misses", lambda: response_cache.misses)
+registry.gauge("db_pool_checked_out", "MongoDB connections checked out of the pool", lambda: pool_stats.checked_out)
+registry.gauge(
+    "db_pool_checkout_failures",
+    "Failed MongoDB connection checkouts (e.g. pool exhaustion timeouts)",
+    lambda: sum(pool_stats.checkout_failures.values())
+)
+registry.gauge("admission_limit", "Adaptive limit on requests running at once", lambda: admission_controller.limit.current)
+registry.gauge("admission_in_flight", "Admission controlled requests running", lambda: admission_controller.in_flight)
+registry.gauge("admission_queued", "Requests waiting for admission", lambda: admission_controller.queued)
+registry.gauge("idempotency_keys", "Idempotency keys held in memory", lambda: len(idempotency_store))
+registry.gauge("idempotency_replays", "Requests answered with a stored idempotent response", lambda: idempotency_store.replays)
+if contact_writer is not None:
+    registry.gauge("contact_write_behind_pending", "Contact documents waiting to be flushed", lambda: len(contact_writer))
+if spam_filter is not None:
+    registry.gauge("contact_spam_filter_fingerprints", "Message fingerprints held by the spam filter", lambda: len(spam_filter))
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus text-format metrics for this worker"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
\ No newline at end of file
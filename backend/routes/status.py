@@ -0,0 +1,219 @@
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from typing import List, Optional, Tuple
+from datetime import datetime
+import json
+import logging
+import os
+
+from models.status import (
+    StatusBatchError,
+    StatusBatchResponse,
+    StatusCheck,
+    StatusCheckCreate,
+    status_batch_adapter,
+    status_rows_adapter,
+    status_row_adapter,
+)
+from services.storage import STATUS_SORT, storage
+from services.export import ndjson_chunks
+from services.pagination import InvalidCursor, decode_cursor, next_cursor
+from services.response_cache import response_cache
+from services.metrics import db_timer
+from services.idempotency import run_idempotent
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api", tags=["status"])
+
+STATUS_PROJECTION = {"_id": 0, "id": 1, "client_name": 1, "timestamp": 1}
+STATUS_BATCH_MAX_ITEMS = int(os.environ.get("STATUS_BATCH_MAX_ITEMS", 5000))
+STATUS_BATCH_MAX_BYTES = int(os.environ.get("STATUS_BATCH_MAX_BYTES", STATUS_BATCH_MAX_ITEMS * 1024))
+
+@router.post("/status", response_model=StatusCheck)
+async def create_status_check(
+    input: StatusCheckCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, max_length=255)
+):
+    """A retry with the same Idempotency-Key header gets the original status check back"""
+    return await run_idempotent(
+        "status", idempotency_key, input.model_dump_json(), response,
+        lambda: save_status_check(input)
+    )
+
+async def save_status_check(input: StatusCheckCreate) -> dict:
+    status_dict = input.model_dump()
+    status_obj = StatusCheck(**status_dict)
+    with db_timer("status_checks", "insert_one"):
+        await storage.status_checks.insert(status_obj.model_dump())
+    response_cache.invalidate("status_checks")
+    # JSON types, so a stored response can be kept in Mongo and replayed as is
+    return status_obj.model_dump(mode="json")
+
+def format_validation_error(error: dict) -> str:
+    field = ".".join(str(part) for part in error["loc"][1:])
+    return f"{field}: {error['msg']}" if field else error["msg"]
+
+def batch_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"A batch holds at most {STATUS_BATCH_MAX_ITEMS} status checks"
+    )
+
+def parse_status_batch(body: bytes, ndjson: bool) -> Tuple[List[Tuple[int, StatusCheckCreate]], List[StatusBatchError]]:
+    """
+    Validate a batch body, returning (index, item) pairs for the valid items
+    and an error for each invalid one. The item count is checked before any
+    item is validated. NDJSON lines are parsed one by one, so a malformed
+    line is a single error and never shifts the indexes after it. A clean
+    batch takes a single validate_python pass; only a batch with bad items
+    is split up to find them.
+    """
+    errors = []
+    if ndjson:
+        lines = [line for line in body.splitlines() if line.strip()]
+        if len(lines) > STATUS_BATCH_MAX_ITEMS:
+            raise batch_too_large()
+        raw_items = []
+        for index, line in enumerate(lines):
+            try:
+                raw_items.append((index, json.loads(line)))
+            except ValueError:
+                errors.append(StatusBatchError(index=index, error="Invalid JSON"))
+    else:
+        try:
+            data = json.loads(body)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        if not isinstance(data, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array of status checks")
+        if len(data) > STATUS_BATCH_MAX_ITEMS:
+            raise batch_too_large()
+        raw_items = list(enumerate(data))
+
+    try:
+        valid = status_batch_adapter.validate_python([item for _, item in raw_items])
+        return [(index, item) for (index, _), item in zip(raw_items, valid)], errors
+    except ValidationError as e:
+        invalid = {}
+        for error in e.errors():
+            invalid.setdefault(error["loc"][0], format_validation_error(error))
+        errors.extend(StatusBatchError(index=raw_items[position][0], error=message) for position, message in invalid.items())
+        raw_items = [raw_items[position] for position in range(len(raw_items)) if position not in invalid]
+        errors.sort(key=lambda error: error.index)
+
+    valid = status_batch_adapter.validate_python([item for _, item in raw_items])
+    return [(index, item) for (index, _), item in zip(raw_items, valid)], errors
+
+@router.post("/status/batch", response_model=StatusBatchResponse)
+async def create_status_checks(request: Request):
+    """
+    Store many status checks in one call
+    The body is a JSON array of StatusCheckCreate objects, or NDJSON (one per
+    line) with Content-Type application/x-ndjson. Valid items are stored even
+    when others are not; `errors` lists each rejected item by its position.
+    """
+    ndjson = request.headers.get("content-type", "").startswith("application/x-ndjson")
+    # Oversized bodies are turned away before they are read or parsed
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > STATUS_BATCH_MAX_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"A batch body is at most {STATUS_BATCH_MAX_BYTES} bytes"
+        )
+    body = await request.body()
+    if len(body) > STATUS_BATCH_MAX_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"A batch body is at most {STATUS_BATCH_MAX_BYTES} bytes"
+        )
+    items, errors = parse_status_batch(body, ndjson)
+    if not items:
+        return StatusBatchResponse(inserted=0, errors=errors)
+
+    documents = [StatusCheck.model_construct(client_name=item.client_name).model_dump() for _, item in items]
+    # Raised by the Mongo storage; pymongo is imported on first use, see database.connect
+    from pymongo.errors import BulkWriteError
+    try:
+        with db_timer("status_checks", "insert_many"):
+            inserted = await storage.status_checks.insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        # ordered=False: everything but the failed documents was written
+        write_errors = e.details.get("writeErrors", [])
+        inserted = e.details.get("nInserted", len(documents) - len(write_errors))
+        errors.extend(
+            StatusBatchError(index=items[error["index"]][0], error=error.get("errmsg", "Write failed"))
+            for error in write_errors
+        )
+        errors.sort(key=lambda error: error.index)
+    except Exception as e:
+        logger.error(f"Error storing status check batch: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error storing status checks")
+
+    if inserted:
+        response_cache.invalidate("status_checks")
+    return StatusBatchResponse(inserted=inserted, errors=errors)
+
+@router.get("/status", response_model=List[StatusCheck])
+async def get_status_checks(
+    request: Request,
+    limit: int = Query(1000, ge=1, le=1000),
+    after: Optional[str] = None,
+    client_name: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    batch_size: int = Query(500, ge=1, le=10000)
+):
+    """
+    List status checks, newest first
+    Pages hold up to `limit` rows; pass the X-Next-Cursor header back as
+    `after` for the next page. `format=ndjson` streams every matching row
+    instead, reading `batch_size` documents at a time.
+    """
+    if format == "ndjson":
+        return stream_status_checks(client_name, since, until, batch_size)
+    return await response_cache.respond(
+        request, "status_checks",
+        lambda: list_status_checks(limit, after, client_name, since, until)
+    )
+
+async def list_status_checks(
+    limit: int,
+    after: Optional[str],
+    client_name: Optional[str],
+    since: Optional[datetime],
+    until: Optional[datetime]
+) -> Response:
+    try:
+        after_values = decode_cursor(after, STATUS_SORT) if after else None
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    with db_timer("status_checks", "find"):
+        status_checks = await storage.status_checks.find_page(
+            STATUS_PROJECTION, limit, client_name, since, until, after_values
+        )
+
+    response = Response(
+        content=status_rows_adapter.dump_json(status_checks),
+        media_type="application/json"
+    )
+    cursor_token = next_cursor(status_checks, limit, STATUS_SORT)
+    if cursor_token:
+        response.headers["X-Next-Cursor"] = cursor_token
+    return response
+
+def stream_status_checks(
+    client_name: Optional[str],
+    since: Optional[datetime],
+    until: Optional[datetime],
+    batch_size: int
+) -> StreamingResponse:
+    cursor = storage.status_checks.iterate(STATUS_PROJECTION, batch_size, client_name, since, until)
+    return StreamingResponse(
+        ndjson_chunks(cursor, status_row_adapter, batch_size),
+        media_type="application/x-ndjson"
+    )
\ No newline at end of file
@@ -1,61 +1,68 @@
-from fastapi import FastAPI, APIRouter
 from dotenv import load_dotenv
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent
+# Before the app modules below, which read their settings at import time
+load_dotenv(ROOT_DIR / '.env')
+
+from fastapi import FastAPI, APIRouter
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
+from contextlib import asynccontextmanager
+import asyncio
 import logging
-from pathlib import Path
-from pydantic import BaseModel, Field
-from typing import List
-import uuid
-from datetime import datetime
+import os
 
 # Import routes
-from routes.contact import router as contact_router
+from routes.contact import (
+    router as contact_router, contact_writer, contact_counters, contact_search, contact_analytics,
+    notification_dispatcher
+)
+from routes.status import router as status_router
+from routes.admin import router as admin_router
+from routes.metrics import router as metrics_router
+from services.rate_limit import rate_limiter
+from services.idempotency import idempotency_store
+from services.retention import retention_policy
+from services.metrics import MetricsMiddleware
+from services.admission import AdmissionControlMiddleware
+from services.profiler import worker_profiler
+from services.storage import storage
+from database import connect, close_database, ensure_indexes
+# Models (keeping existing import path for compatibility)
+from models.status import StatusCheck, StatusCheckCreate
 
-ROOT_DIR = Path(__file__).parent
-load_dotenv(ROOT_DIR / '.env')
+# With LAZY_STARTUP the worker takes requests as soon as it is up: the Mongo
+# client (and with it motor and pymongo) is loaded on first use and
+# index/counter setup runs in the background
+LAZY_STARTUP = os.environ.get("LAZY_STARTUP", "false").lower() in ("1", "true", "yes")
+warmup_task = None
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME', 'portfolio_db')]
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await startup_event()
+    yield
+    await shutdown_db_client()
 
 # Create the main app without a prefix
-app = FastAPI(title="Hemanth Challa Portfolio API", version="1.0.0")
+app = FastAPI(title="Hemanth Challa Portfolio API", version="1.0.0", lifespan=lifespan)
 
 # Create a router with the /api prefix for other routes
 api_router = APIRouter(prefix="/api")
 
-# Define Models (keeping existing for compatibility)
-class StatusCheck(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    client_name: str
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
-
-class StatusCheckCreate(BaseModel):
-    client_name: str
-
 # Add existing routes to the router
 @api_router.get("/")
 async def root():
     return {"message": "Hemanth Challa Portfolio API - Ready!"}
 
-@api_router.post("/status", response_model=StatusCheck)
-async def create_status_check(input: StatusCheckCreate):
-    status_dict = input.dict()
-    status_obj = StatusCheck(**status_dict)
-    _ = await db.status_checks.insert_one(status_obj.dict())
-    return status_obj
-
-@api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
-    status_checks = await db.status_checks.find().to_list(1000)
-    return [StatusCheck(**status_check) for status_check in status_checks]
-
 # Include the routers in the main app
 app.include_router(api_router)
+app.include_router(status_router)
 app.include_router(contact_router)
+app.include_router(admin_router)
+app.include_router(metrics_router)
+
+# Inside CORS, so shed requests (503) still carry the CORS headers
+app.add_middleware(AdmissionControlMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -65,6 +72,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so the recorded latency covers the whole middleware stack
+app.add_middleware(MetricsMiddleware)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -72,11 +82,61 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@app.on_event("startup")
 async def startup_event():
+    global warmup_task
     logger.info("Hemanth Challa Portfolio API starting up...")
+    storage.check_mongo_settings({
+        "NOTIFY_TRANSPORT": notification_dispatcher is not None,
+        "IDEMPOTENCY_BACKEND=mongo": idempotency_store.get_collection is not None,
+        "RATE_LIMIT_BACKEND=mongo": rate_limiter.backend == "mongo",
+    })
+    rate_limiter.start_sweeper()
+    if contact_writer is not None:
+        await contact_writer.start()
+    retention_policy.on_contacts_archived.append(contact_counters.invalidate)
+    retention_policy.on_contacts_archived.append(contact_analytics.invalidate)
+    if contact_search is not None:
+        retention_policy.on_contacts_archived.append(contact_search.invalidate)
+    worker_profiler.register()
+    if notification_dispatcher is not None:
+        notification_dispatcher.start()
+    if LAZY_STARTUP:
+        warmup_task = asyncio.create_task(warm_up_database())
+    else:
+        if storage.uses_mongo:
+            # Single MongoDB client (and connection pool) per worker
+            connect()
+        await warm_up_database()
+
+async def warm_up_database():
+    if storage.uses_mongo:
+        await ensure_indexes()
+    else:
+        await storage.start()
+    await contact_counters.start()
+    if contact_search is not None:
+        await contact_search.start()
+    # Retention works on the Mongo collections only
+    if storage.uses_mongo:
+        await retention_policy.start()
 
-@app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
+    worker_profiler.unregister()
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+        try:
+            await warmup_task
+        except asyncio.CancelledError:
+            pass
+    await rate_limiter.stop_sweeper()
+    if notification_dispatcher is not None:
+        await notification_dispatcher.stop()
+    await contact_counters.stop()
+    if contact_search is not None:
+        await contact_search.stop()
+    await retention_policy.stop()
+    if contact_writer is not None:
+        await contact_writer.drain()
+    await storage.close()
+    await close_database()
     logger.info("Database connection closed.")
\ No newline at end of file
@@ -0,0 +1,311 @@
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional
+import asyncio
+import logging
+import math
+import os
+import time
+
+from starlette.responses import JSONResponse
+
+from services.metrics import admission_rejections
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RouteClass:
+    """
+    Requests admitted under one concurrency cap. When full they wait in a
+    queue for at most `queue_timeout` seconds; classes with a lower
+    `priority` are admitted first.
+    """
+    name: str
+    priority: int
+    max_concurrency: int
+    queue_timeout: float
+
+    def with_override(self, value: str) -> "RouteClass":
+        """Apply a `<max_concurrency>/<queue_timeout_seconds>` string, e.g. `32/2`"""
+        max_concurrency, queue_timeout = value.split("/", 1)
+        return RouteClass(self.name, self.priority, int(max_concurrency), float(queue_timeout))
+
+
+# Overridable with ADMISSION_<CLASS>="<max_concurrency>/<queue_timeout_seconds>"
+DEFAULT_ROUTE_CLASSES: Dict[str, RouteClass] = {
+    # New messages are what the site is for: first in line, longest wait
+    "contact": RouteClass("contact", priority=0, max_concurrency=32, queue_timeout=2.0),
+    "status": RouteClass("status", priority=1, max_concurrency=16, queue_timeout=1.0),
+    "admin": RouteClass("admin", priority=2, max_concurrency=8, queue_timeout=0.5),
+}
+
+# (class, method or None for any, path prefix), first match wins
+ROUTE_RULES = (
+    ("contact", "POST", "/api/contact"),
+    ("status", None, "/api/status"),
+    ("admin", None, "/api/admin/"),
+)
+
+# Diagnostics stay reachable when everything else is shed
+EXEMPT_PREFIXES = ("/api/admin/db/", "/api/admin/profile")
+
+
+class AdaptiveLimit:
+    """
+    AIMD limit on the requests running at once, across every route class.
+    Every `window` seconds: when the p90 service time of the window (until
+    the response starts) was above `target_latency` the limit is multiplied
+    by `backoff`, otherwise it grows by one if it was reached in the window.
+    """
+
+    def __init__(
+        self,
+        initial: int = 64,
+        min_limit: int = 4,
+        max_limit: int = 256,
+        target_latency: float = 0.25,
+        backoff: float = 0.8,
+        window: float = 1.0,
+    ):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.backoff = backoff
+        self.window = window
+        self.saturated = False
+        self._samples: List[float] = []
+        self._window_start = time.monotonic()
+
+    @property
+    def current(self) -> int:
+        return int(self.limit)
+
+    def record(self, latency: float, now: Optional[float] = None):
+        self._samples.append(latency)
+        now = time.monotonic() if now is None else now
+        if now - self._window_start >= self.window:
+            self._adjust()
+            self._window_start = now
+
+    def _adjust(self):
+        samples = sorted(self._samples)
+        p90 = samples[int(0.9 * (len(samples) - 1))]
+        previous = self.current
+        if p90 > self.target_latency:
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+        elif self.saturated:
+            self.limit = min(self.max_limit, self.limit + 1)
+        if self.current != previous:
+            logger.info(f"Admission limit {previous} -> {self.current} (p90 {p90 * 1000:.0f}ms)")
+        self._samples = []
+        self.saturated = False
+
+
+class AdmissionController:
+    """
+    Admission control: a request runs only while fewer than the adaptive
+    limit are running overall and fewer than its class's `max_concurrency`
+    are running in its class. Otherwise it waits in its class's queue;
+    freed slots go to the highest priority class with waiters.
+
+    Requests are shed (503 + Retry-After) instead of piling up on the
+    database pool: when the expected wait exceeds the class's queue
+    timeout, when the timeout passes while waiting, or when the queue of
+    `max_queue` waiters is full (a waiter of a lower priority class is
+    dropped to make room, if there is one).
+    """
+
+    def __init__(
+        self,
+        route_classes: Optional[Dict[str, RouteClass]] = None,
+        limit: Optional[AdaptiveLimit] = None,
+        max_queue: int = 256,
+        enabled: bool = True,
+    ):
+        self.route_classes = dict(route_classes or DEFAULT_ROUTE_CLASSES)
+        self.limit = limit or AdaptiveLimit()
+        self.max_queue = max_queue
+        self.enabled = enabled
+        self.in_flight = 0
+        self.queued = 0
+        self._running = {name: 0 for name in self.route_classes}
+        self._queues: Dict[str, Deque[asyncio.Future]] = {name: deque() for name in self.route_classes}
+        self._by_priority = sorted(self.route_classes.values(), key=lambda route: route.priority)
+        # Moving average of the service time, for estimating waits
+        self._service_time = 0.01
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        route_classes = dict(DEFAULT_ROUTE_CLASSES)
+        for name, route in list(route_classes.items()):
+            override = os.environ.get(f"ADMISSION_{name.upper()}")
+            if override:
+                route_classes[name] = route.with_override(override)
+
+        return cls(
+            route_classes=route_classes,
+            limit=AdaptiveLimit(
+                initial=int(os.environ.get("ADMISSION_INITIAL_LIMIT", 64)),
+                min_limit=int(os.environ.get("ADMISSION_MIN_LIMIT", 4)),
+                max_limit=int(os.environ.get("ADMISSION_MAX_LIMIT", 256)),
+                target_latency=float(os.environ.get("ADMISSION_TARGET_LATENCY", 0.25)),
+                window=float(os.environ.get("ADMISSION_WINDOW", 1.0)),
+            ),
+            max_queue=int(os.environ.get("ADMISSION_MAX_QUEUE", 256)),
+            enabled=os.environ.get("ADMISSION_CONTROL", "true").lower() in ("1", "true", "yes"),
+        )
+
+    def classify(self, method: str, path: str) -> Optional[RouteClass]:
+        """The route class of a request, None if it is not admission controlled"""
+        if path.startswith(EXEMPT_PREFIXES):
+            return None
+        for name, rule_method, prefix in ROUTE_RULES:
+            if path.startswith(prefix) and (rule_method is None or rule_method == method):
+                return self.route_classes[name]
+        return None
+
+    def _has_room(self, route: RouteClass) -> bool:
+        return self.in_flight < self.limit.current and self._running[route.name] < route.max_concurrency
+
+    def _queue_ahead_can_run(self, route: RouteClass) -> bool:
+        """A waiter of the same or a higher priority class would take a free slot first"""
+        return any(
+            self._queues[other.name] and self._running[other.name] < other.max_concurrency
+            for other in self._by_priority if other.priority <= route.priority
+        )
+
+    def _waiting_ahead(self, route: RouteClass) -> int:
+        return sum(len(self._queues[other.name]) for other in self._by_priority if other.priority <= route.priority)
+
+    def _expected_wait(self, route: RouteClass) -> float:
+        overall = (self._waiting_ahead(route) + 1) * self._service_time / max(1, self.limit.current)
+        in_class = (len(self._queues[route.name]) + 1) * self._service_time / route.max_concurrency
+        return max(overall, in_class)
+
+    def retry_after(self, route: RouteClass) -> int:
+        """Seconds until the queue ahead of `route` should have drained"""
+        return max(1, math.ceil(self._expected_wait(route)))
+
+    def _start(self, route: RouteClass):
+        self.in_flight += 1
+        self._running[route.name] += 1
+
+    def _make_room(self, route: RouteClass) -> bool:
+        """Drop the newest waiter of a lower priority class than `route`"""
+        for other in reversed(self._by_priority):
+            if other.priority <= route.priority:
+                return False
+            queue = self._queues[other.name]
+            while queue:
+                future = queue.pop()
+                self.queued -= 1
+                if not future.done():
+                    future.set_result(False)
+                    return True
+        return False
+
+    async def acquire(self, route: RouteClass) -> Optional[str]:
+        """Wait for a slot; returns None once admitted, else why the request is shed"""
+        if self._has_room(route) and not self._queue_ahead_can_run(route):
+            self._start(route)
+            return None
+        if self.in_flight >= self.limit.current:
+            self.limit.saturated = True
+        if self.queued >= self.max_queue and not self._make_room(route):
+            return "queue_full"
+        if self._expected_wait(route) > route.queue_timeout:
+            return "deadline"
+
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues[route.name]
+        queue.append(future)
+        self.queued += 1
+        self._wake()
+        try:
+            admitted = await asyncio.wait_for(future, route.queue_timeout)
+        except asyncio.TimeoutError:
+            return "deadline"
+        except asyncio.CancelledError:
+            # Client went away, possibly right after being handed a slot
+            if future.done() and not future.cancelled() and future.result():
+                self.release(route)
+            raise
+        finally:
+            if not future.done() or future.cancelled():
+                try:
+                    queue.remove(future)
+                    self.queued -= 1
+                except ValueError:
+                    pass
+        return None if admitted else "evicted"
+
+    def release(self, route: RouteClass, latency: Optional[float] = None):
+        self.in_flight -= 1
+        self._running[route.name] -= 1
+        if latency is not None:
+            self._service_time += 0.1 * (latency - self._service_time)
+            self.limit.record(latency)
+        self._wake()
+
+    def _wake(self):
+        for route in self._by_priority:
+            queue = self._queues[route.name]
+            while queue and self._has_room(route):
+                future = queue.popleft()
+                self.queued -= 1
+                if not future.done():
+                    self._start(route)
+                    future.set_result(True)
+            if self.in_flight >= self.limit.current:
+                return
+
+
+class AdmissionControlMiddleware:
+    """
+    ASGI middleware putting every admission controlled request through the
+    controller (see AdmissionController), answering 503 with Retry-After
+    when it is shed.
+    """
+
+    def __init__(self, app, controller: Optional[AdmissionController] = None):
+        self.app = app
+        self.controller = controller or admission_controller
+
+    async def __call__(self, scope, receive, send):
+        controller = self.controller
+        route = None
+        if scope["type"] == "http" and controller.enabled:
+            route = controller.classify(scope["method"], scope["path"])
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+
+        reason = await controller.acquire(route)
+        if reason is not None:
+            admission_rejections.inc((route.name, reason))
+            response = JSONResponse(
+                {"detail": "Server is busy, please retry later"},
+                status_code=503,
+                headers={"Retry-After": str(controller.retry_after(route))},
+            )
+            await response(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        latency = [None]
+
+        async def send_wrapper(message):
+            # Service time until the response starts, so slow streaming clients don't count
+            if message["type"] == "http.response.start" and latency[0] is None:
+                latency[0] = time.perf_counter() - start
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            controller.release(route, latency[0] if latency[0] is not None else time.perf_counter() - start)
+
+
+admission_controller = AdmissionController.from_env()
@@ -0,0 +1,155 @@
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+import asyncio
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+HOUR_FORMAT = "%Y-%m-%dT%H"
+DAY_FORMAT = "%Y-%m-%d"
+
+
+class ContactAnalytics:
+    """
+    Contact traffic for /api/admin/contacts/analytics: submissions per UTC
+    hour, sender domains and user agents per UTC day.
+
+    The counts are aggregated by the database once, then kept in memory and
+    refreshed incrementally: each refresh only aggregates contacts stored
+    since the previous one, so the cost of a report depends on the traffic
+    since the last request and the size of the window, not on the size of the
+    collection. Refreshes follow the repository's ingest watermark rather than
+    `created_at`, so a contact that write-behind stores late still counts (in
+    the hour it was created). Contacts stored in the last `settle` seconds
+    (inserts of other workers may still be in flight) are aggregated live on
+    every report and never cached.
+
+    Deletes can't be folded in as deltas: `invalidate()` makes the next
+    report rebuild from the database, which also happens every
+    `rebuild_interval` seconds to pick up deletes made by other workers.
+    Counts older than `max_days` are dropped.
+    """
+
+    def __init__(self, repository, settle: float = 10.0, rebuild_interval: float = 3600.0, max_days: int = 365):
+        self.repository = repository
+        self.settle = settle
+        self.rebuild_interval = rebuild_interval
+        self.max_days = max_days
+        self._hours: Counter = Counter()
+        self._domains: Dict[str, Counter] = {}
+        self._agents: Dict[str, Counter] = {}
+        # Everything stored up to the watermark is in the counters above
+        self._watermark = None
+        self._oldest: Optional[datetime] = None
+        self._built_at: Optional[float] = None
+        self._stale = True
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def from_env(cls, repository) -> "ContactAnalytics":
+        return cls(
+            repository,
+            settle=float(os.environ.get("ANALYTICS_SETTLE_SECONDS", 10)),
+            rebuild_interval=float(os.environ.get("ANALYTICS_REBUILD_INTERVAL", 3600)),
+            max_days=int(os.environ.get("ANALYTICS_MAX_DAYS", 365)),
+        )
+
+    def invalidate(self):
+        """Contacts were deleted, rebuild on the next report"""
+        self._stale = True
+
+    @staticmethod
+    def _fold(traffic: dict, hours: Counter, domains: Dict[str, Counter], agents: Dict[str, Counter]):
+        hours.update(traffic["hours"])
+        for (day, domain), count in traffic["domains"].items():
+            domains.setdefault(day, Counter())[domain] += count
+        for (day, agent), count in traffic["user_agents"].items():
+            agents.setdefault(day, Counter())[agent] += count
+
+    def _prune(self, oldest: datetime):
+        oldest_hour, oldest_day = oldest.strftime(HOUR_FORMAT), oldest.strftime(DAY_FORMAT)
+        for hour in [hour for hour in self._hours if hour < oldest_hour]:
+            del self._hours[hour]
+        for days in (self._domains, self._agents):
+            for day in [day for day in days if day < oldest_day]:
+                del days[day]
+
+    async def refresh(self, now: datetime):
+        """Bring the cached counts up to the contacts stored `settle` seconds ago"""
+        async with self._lock:
+            watermark = await self.repository.ingest_watermark(self.settle)
+            oldest = (now - timedelta(days=self.max_days)).replace(minute=0, second=0, microsecond=0)
+            rebuild = (
+                self._stale or self._built_at is None
+                or time.monotonic() - self._built_at > self.rebuild_interval
+            )
+            if rebuild:
+                # Cleared first: an invalidate() while this runs means another rebuild
+                self._stale = False
+                started = time.perf_counter()
+                traffic = await self.repository.traffic(since=oldest, through=watermark)
+                hours, domains, agents = Counter(), {}, {}
+                self._fold(traffic, hours, domains, agents)
+                self._hours, self._domains, self._agents = hours, domains, agents
+                self._watermark, self._oldest, self._built_at = watermark, oldest, time.monotonic()
+                logger.info(f"Contact analytics rebuilt in {time.perf_counter() - started:.2f}s")
+            elif watermark > self._watermark:
+                traffic = await self.repository.traffic(since=oldest, after=self._watermark, through=watermark)
+                self._fold(traffic, self._hours, self._domains, self._agents)
+                if oldest.date() != self._oldest.date():
+                    self._prune(oldest)
+                self._watermark, self._oldest = watermark, oldest
+
+    async def report(self, days: int, bucket: str = "day", top: int = 10, now: Optional[datetime] = None) -> dict:
+        """
+        Traffic of the last `days` days (counted from the start of the first
+        UTC hour/day bucket): `buckets` per hour or day, `hour_of_day` totals
+        for spotting peak hours, and the `top` sender domains and user agents
+        (counted over whole UTC days)
+        """
+        now = now or datetime.utcnow()
+        await self.refresh(now)
+
+        first_hour = (now - timedelta(days=days)).replace(minute=0, second=0, microsecond=0)
+        step = timedelta(hours=1) if bucket == "hour" else timedelta(days=1)
+        start = first_hour if bucket == "hour" else first_hour.replace(hour=0)
+        tail = await self.repository.traffic(since=start, after=self._watermark)
+
+        hourly = []
+        hour = start
+        while hour <= now:
+            key = hour.strftime(HOUR_FORMAT)
+            hourly.append((hour, self._hours.get(key, 0) + tail["hours"].get(key, 0)))
+            hour += timedelta(hours=1)
+
+        buckets = []
+        for hour, count in hourly:
+            if not buckets or hour >= buckets[-1][0] + step:
+                buckets.append([hour, 0])
+            buckets[-1][1] += count
+        hour_of_day = [0] * 24
+        for hour, count in hourly:
+            hour_of_day[hour.hour] += count
+
+        domains, agents = Counter(), Counter()
+        for totals, cached, live in ((domains, self._domains, tail["domains"]), (agents, self._agents, tail["user_agents"])):
+            day = start
+            while day <= now:
+                totals.update(cached.get(day.strftime(DAY_FORMAT), {}))
+                day += timedelta(days=1)
+            # The live tail was stored in the last few seconds, created inside the window
+            for (_, value), count in live.items():
+                totals[value] += count
+
+        return {
+            "since": start.isoformat(),
+            "bucket": bucket,
+            "total": sum(count for _, count in hourly),
+            "buckets": [{"start": hour.isoformat(), "count": count} for hour, count in buckets],
+            "hour_of_day": hour_of_day,
+            "top_domains": [{"domain": domain, "count": count} for domain, count in domains.most_common(top)],
+            "top_user_agents": [{"user_agent": agent, "count": count} for agent, count in agents.most_common(top)],
+        }
@@ -0,0 +1,164 @@
+from typing import Optional
+import asyncio
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ContactCounters:
+    """
+    In-memory total/unread contact counters so the admin dashboard can poll
+    without hitting the database.
+
+    Counters are kept current by the write paths of this worker (write-through)
+    and re-synced with `count_documents` every `reconcile_interval` seconds,
+    which also picks up writes made by other workers. With `change_stream`
+    enabled (needs the Mongo storage backend on a replica set) every worker applies the changes of the
+    whole deployment from a Mongo change stream instead of its own writes.
+    A snapshot older than `max_staleness` seconds is reconciled inline on read.
+    """
+
+    def __init__(
+        self,
+        repository,
+        reconcile_interval: float = 30.0,
+        max_staleness: float = 60.0,
+        change_stream: bool = False,
+    ):
+        self.repository = repository
+        self.reconcile_interval = reconcile_interval
+        self.max_staleness = max_staleness
+        self.change_stream = change_stream
+        self.total = 0
+        self.unread = 0
+        self.reconciled_at: Optional[float] = None
+        self._watching = False
+        self._dirty: Optional[asyncio.Event] = None
+        self._tasks = []
+
+    @classmethod
+    def from_env(cls, repository) -> "ContactCounters":
+        return cls(
+            repository,
+            reconcile_interval=float(os.environ.get("CONTACT_STATS_RECONCILE_INTERVAL", 30)),
+            max_staleness=float(os.environ.get("CONTACT_STATS_MAX_STALENESS", 60)),
+            change_stream=os.environ.get("CONTACT_STATS_CHANGE_STREAM", "false").lower() in ("1", "true", "yes"),
+        )
+
+    # Write-through hooks, no-ops while the change stream is delivering the same changes
+
+    def record_insert(self, unread: bool = True):
+        if not self._watching:
+            self.total += 1
+            self.unread += 1 if unread else 0
+
+    def record_read_change(self, became_read: int = 0, became_unread: int = 0):
+        if not self._watching:
+            self.unread = max(0, self.unread - became_read + became_unread)
+
+    def invalidate(self):
+        """The change can't be applied as a delta (e.g. deletes), re-count soon"""
+        if self._dirty is not None:
+            self._dirty.set()
+
+    async def reconcile(self):
+        total, unread = await asyncio.gather(
+            self.repository.count(),
+            self.repository.count(unread_only=True),
+        )
+        self.total, self.unread = total, unread
+        self.reconciled_at = time.time()
+
+    def age(self) -> Optional[float]:
+        return None if self.reconciled_at is None else time.time() - self.reconciled_at
+
+    async def snapshot(self) -> dict:
+        """Current counters, re-counted first only if older than max_staleness"""
+        age = self.age()
+        stale = age is None or (age > self.max_staleness and not self._watching)
+        if stale:
+            try:
+                await self.reconcile()
+                stale = False
+            except Exception as e:
+                logger.error(f"Error reconciling contact counters: {str(e)}")
+
+        return {
+            "total": self.total,
+            "unread": self.unread,
+            "read": max(0, self.total - self.unread),
+            "reconciled_seconds_ago": self.age(),
+            "live": self._watching,
+            "stale": stale,
+        }
+
+    async def _reconcile_forever(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._dirty.wait(), self.reconcile_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._dirty.clear()
+            try:
+                await self.reconcile()
+            except Exception as e:
+                logger.error(f"Error reconciling contact counters: {str(e)}")
+
+    async def _watch_forever(self):
+        delay = 1.0
+        pipeline = [{"$match": {"operationType": {"$in": ["insert", "update", "replace", "delete"]}}}]
+        while True:
+            try:
+                async with self.repository.watch(pipeline) as stream:
+                    # Counts taken once the stream is open don't miss events
+                    await self.reconcile()
+                    self._watching = True
+                    delay = 1.0
+                    async for change in stream:
+                        self._apply_change(change)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Contact change stream unavailable, retrying in {delay:.0f}s: {str(e)}")
+            self._watching = False
+            self.invalidate()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 60.0)
+
+    def _apply_change(self, change: dict):
+        operation = change["operationType"]
+        if operation == "insert":
+            self.total += 1
+            if not change["fullDocument"].get("read", False):
+                self.unread += 1
+        elif operation == "update":
+            updated = change.get("updateDescription", {}).get("updatedFields", {})
+            if "read" in updated:
+                # No-op $set writes produce no event, so this is a real flip
+                self.unread = max(0, self.unread + (-1 if updated["read"] else 1))
+        else:
+            # Deletes/replaces don't carry the previous read state
+            self.invalidate()
+
+    async def start(self):
+        self._dirty = asyncio.Event()
+        try:
+            await self.reconcile()
+        except Exception as e:
+            logger.error(f"Error loading contact counters: {str(e)}")
+        self._tasks = [asyncio.create_task(self._reconcile_forever())]
+        if self.change_stream:
+            self._tasks.append(asyncio.create_task(self._watch_forever()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        self._watching = False
@@ -0,0 +1,45 @@
+from datetime import datetime
+from typing import Any, AsyncIterator, List
+import csv
+import io
+
+from pydantic import TypeAdapter
+
+# Chunk sizes are driven by the cursor batch size, so at most one batch of
+# documents plus its encoded chunk is held in memory at any time
+
+
+async def ndjson_chunks(cursor, row_adapter: TypeAdapter, batch_size: int) -> AsyncIterator[bytes]:
+    """Encode documents from a Motor cursor as newline-delimited JSON"""
+    batch: List[bytes] = []
+    async for document in cursor:
+        batch.append(row_adapter.dump_json(document))
+        if len(batch) >= batch_size:
+            yield b"\n".join(batch) + b"\n"
+            batch = []
+    if batch:
+        yield b"\n".join(batch) + b"\n"
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return "" if value is None else value
+
+
+async def csv_chunks(cursor, fields: List[str], batch_size: int) -> AsyncIterator[bytes]:
+    """Encode documents from a Motor cursor as CSV with a header row"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    rows = 0
+    async for document in cursor:
+        writer.writerow([_csv_value(document.get(field)) for field in fields])
+        rows += 1
+        if rows >= batch_size:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+    if buffer.tell():
+        yield buffer.getvalue().encode()
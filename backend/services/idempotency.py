@@ -0,0 +1,249 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional, Tuple
+import asyncio
+import hashlib
+import logging
+import os
+import time
+
+from fastapi import HTTPException, Response
+
+from database import get_database
+
+logger = logging.getLogger(__name__)
+
+
+class IdempotencyKeyMismatch(Exception):
+    """The key was already used for a request with a different body"""
+
+
+class IdempotencyKeyInProgress(Exception):
+    """Another worker is still handling a request with this key"""
+
+
+@dataclass
+class IdempotencyEntry:
+    fingerprint: str
+    future: asyncio.Future
+    expires_at: float
+
+
+class IdempotencyStore:
+    """
+    Responses of POST requests sent with an Idempotency-Key header, so that a
+    retried request gets the original response back without a second write.
+
+    Keys are scoped per route and kept in a size-bounded LRU for `ttl`
+    seconds. The first request with a key runs; concurrent requests with the
+    same key await its future instead of racing it, and get the same
+    response (or the same error; failed requests are not remembered, so a
+    later retry runs again). A key reused with a different body is rejected.
+
+    With `get_collection` set (IDEMPOTENCY_BACKEND=mongo) keys are also
+    claimed in Mongo, where the key is the `_id`, so a retry that lands on
+    another worker or after a restart still gets the original response.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        ttl: float = 86400.0,
+        get_collection: Optional[Callable] = None,
+        wait_timeout: float = 10.0,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.get_collection = get_collection
+        self.wait_timeout = wait_timeout
+        self.replays = 0
+        self._entries: "OrderedDict[str, IdempotencyEntry]" = OrderedDict()
+
+    @classmethod
+    def from_env(cls, get_collection: Callable) -> "IdempotencyStore":
+        backend = os.environ.get("IDEMPOTENCY_BACKEND", "memory").lower()
+        if backend not in ("memory", "mongo"):
+            raise ValueError(f"Unknown IDEMPOTENCY_BACKEND {backend!r}, expected memory or mongo")
+        return cls(
+            max_entries=int(os.environ.get("IDEMPOTENCY_MAX_ENTRIES", 10_000)),
+            ttl=float(os.environ.get("IDEMPOTENCY_TTL", 86400)),
+            get_collection=get_collection if backend == "mongo" else None,
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def fingerprint(body: str) -> str:
+        return hashlib.blake2b(body.encode(), digest_size=16).hexdigest()
+
+    def _get(self, key: str) -> Optional[IdempotencyEntry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _put(self, key: str, entry: IdempotencyEntry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        excess = len(self._entries) - self.max_entries
+        if excess <= 0:
+            return
+        # Least recently used first, but never a request still running: a
+        # retry of it would not find the key and run it a second time
+        evicted = []
+        for old_key, old_entry in self._entries.items():
+            if len(evicted) == excess:
+                break
+            if old_entry.future.done():
+                evicted.append(old_key)
+        for old_key in evicted:
+            del self._entries[old_key]
+
+    async def run(
+        self,
+        scope: str,
+        key: str,
+        fingerprint: str,
+        produce: Callable[[], Awaitable[dict]],
+    ) -> Tuple[dict, bool]:
+        """
+        The response for `key`: produced now, or the one stored by an earlier
+        request. Returns (response, replayed).
+        """
+        key = f"{scope}:{key}"
+        entry = self._get(key)
+        if entry is not None:
+            if entry.fingerprint != fingerprint:
+                raise IdempotencyKeyMismatch()
+            # Shielded: a waiter going away must not cancel the request it waits on
+            response = await asyncio.shield(entry.future)
+            self.replays += 1
+            return response, True
+
+        future = asyncio.get_running_loop().create_future()
+        self._put(key, IdempotencyEntry(fingerprint, future, time.monotonic() + self.ttl))
+        claimed = completed = False
+        try:
+            if self.get_collection is not None:
+                stored = await self._claim(key, fingerprint)
+                if stored is not None:
+                    future.set_result(stored)
+                    self.replays += 1
+                    return stored, True
+                claimed = True
+
+            response = await produce()
+            future.set_result(response)
+            if claimed:
+                completed = await self._complete(key, response)
+            return response, False
+        except BaseException as e:
+            # Once the response exists it stays in the local store, even when
+            # storing it in Mongo failed or was cancelled
+            if not future.done():
+                if self._entries.get(key) is not None and self._entries[key].future is future:
+                    del self._entries[key]
+                if isinstance(e, asyncio.CancelledError):
+                    future.cancel()
+                else:
+                    future.set_exception(e)
+                    # Retrieved here, so no "never retrieved" warning without waiters
+                    future.exception()
+            raise
+        finally:
+            if claimed and not completed:
+                # Don't leave the key "in progress" in Mongo until it expires.
+                # Shielded, so a cancellation can't cut the release short
+                await asyncio.shield(self._release(key))
+
+    async def _claim(self, key: str, fingerprint: str) -> Optional[dict]:
+        """
+        Reserve `key` in Mongo. Returns the stored response if another request
+        already completed it, None once this request owns the key.
+        """
+        # Only the Mongo backend needs pymongo, keep it out of startup otherwise
+        from pymongo.errors import DuplicateKeyError, PyMongoError
+        collection = self.get_collection()
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            try:
+                await collection.insert_one({
+                    "_id": key,
+                    "fingerprint": fingerprint,
+                    "response": None,
+                    "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl),
+                })
+                return None
+            except DuplicateKeyError:
+                pass
+            except PyMongoError as e:
+                # Still idempotent within this worker
+                logger.warning(f"Error claiming idempotency key, using the local store only: {str(e)}")
+                return None
+
+            stored = await collection.find_one({"_id": key})
+            if stored is not None:
+                if stored["fingerprint"] != fingerprint:
+                    raise IdempotencyKeyMismatch()
+                if stored["response"] is not None:
+                    return stored["response"]
+                if time.monotonic() > deadline:
+                    raise IdempotencyKeyInProgress()
+                await asyncio.sleep(0.05)
+            # Deleted in between (the other request failed): try to claim it again
+
+    async def _complete(self, key: str, response: dict) -> bool:
+        """Store the response for `key`; False if that failed"""
+        from pymongo.errors import PyMongoError
+        try:
+            await self.get_collection().update_one({"_id": key}, {"$set": {"response": response}})
+            return True
+        except PyMongoError as e:
+            logger.error(f"Error storing idempotent response: {str(e)}")
+            return False
+
+    async def _release(self, key: str):
+        from pymongo.errors import PyMongoError
+        try:
+            await self.get_collection().delete_one({"_id": key, "response": None})
+        except PyMongoError as e:
+            logger.error(f"Error releasing idempotency key: {str(e)}")
+
+
+idempotency_store = IdempotencyStore.from_env(lambda: get_database().idempotency_keys)
+
+
+async def run_idempotent(
+    scope: str,
+    key: Optional[str],
+    body: str,
+    response: Response,
+    produce: Callable[[], Awaitable[dict]],
+) -> dict:
+    """
+    Run `produce` once per Idempotency-Key `key` (always when there is no
+    key). Replayed responses carry `Idempotent-Replayed: true`.
+    """
+    if key is None:
+        return await produce()
+    try:
+        result, replayed = await idempotency_store.run(scope, key, idempotency_store.fingerprint(body), produce)
+    except IdempotencyKeyMismatch:
+        raise HTTPException(
+            status_code=422,
+            detail="Idempotency-Key was already used with a different request body"
+        )
+    except IdempotencyKeyInProgress:
+        raise HTTPException(
+            status_code=409,
+            detail="A request with this Idempotency-Key is still being processed"
+        )
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
@@ -0,0 +1,231 @@
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+import time
+
+# Latency buckets in seconds, shared by every histogram
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Everything here is updated from the event loop thread only, so recording a
+# sample is a dict lookup, a bisect and a few integer adds - no locks.
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by interpolating inside its bucket"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else self.bounds[-1]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.bounds[-1]
+
+
+class HistogramFamily:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.children: Dict[Tuple[str, ...], Histogram] = {}
+
+    def observe(self, label_values: Tuple[str, ...], value: float):
+        child = self.children.get(label_values)
+        if child is None:
+            child = self.children[label_values] = Histogram()
+        child.observe(value)
+
+    def total_count(self) -> int:
+        """Samples across all label sets (safe to call from other threads)"""
+        return sum(child.count for child in list(self.children.values()))
+
+    def render(self, lines: List[str]):
+        lines.append(f"# HELP {self.name} {self.help}")
+        lines.append(f"# TYPE {self.name} histogram")
+        for label_values, child in self.children.items():
+            labels = _labels(self.labels, label_values)
+            cumulative = 0
+            for bound, bucket_count in zip(child.bounds, child.counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {child.count}')
+            lines.append(f"{self.name}_sum{{{labels}}} {child.sum}")
+            lines.append(f"{self.name}_count{{{labels}}} {child.count}")
+        # Pre-computed percentiles for dashboards without histogram_quantile()
+        lines.append(f"# TYPE {self.name}_quantile gauge")
+        for label_values, child in self.children.items():
+            labels = _labels(self.labels, label_values)
+            for q in QUANTILES:
+                lines.append(f'{self.name}_quantile{{{labels},quantile="{q}"}} {child.quantile(q):.6f}')
+
+
+class CounterFamily:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values: Dict[Tuple[str, ...], int] = {}
+
+    def inc(self, label_values: Tuple[str, ...], amount: int = 1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self, lines: List[str]):
+        lines.append(f"# HELP {self.name} {self.help}")
+        lines.append(f"# TYPE {self.name} counter")
+        for label_values, value in self.values.items():
+            lines.append(f"{self.name}{{{_labels(self.labels, label_values)}}} {value}")
+
+
+class Gauge:
+    """Gauge set directly, or read from `collect` at scrape time"""
+
+    def __init__(self, name: str, help: str, collect: Optional[Callable[[], float]] = None):
+        self.name = name
+        self.help = help
+        self.collect = collect
+        self.value = 0
+
+    def render(self, lines: List[str]):
+        value = self.collect() if self.collect is not None else self.value
+        lines.append(f"# HELP {self.name} {self.help}")
+        lines.append(f"# TYPE {self.name} gauge")
+        lines.append(f"{self.name} {value}")
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def gauge(self, name: str, help: str, collect: Callable[[], float]) -> Gauge:
+        return self.register(Gauge(name, help, collect))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self.metrics.values()):
+            try:
+                metric.render(lines)
+            except Exception:
+                # A broken collector must not take the whole scrape down
+                continue
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_request_duration = registry.register(HistogramFamily(
+    "http_request_duration_seconds", "HTTP request latency by route and status",
+    ("method", "route", "status"),
+))
+http_requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled",
+))
+http_validation_failures = registry.register(CounterFamily(
+    "http_validation_failures_total", "Requests rejected by request validation (422)",
+    ("route",),
+))
+db_operation_duration = registry.register(HistogramFamily(
+    "db_operation_duration_seconds", "MongoDB operation latency as seen by the handlers",
+    ("collection", "operation"),
+))
+rate_limit_rejections = registry.register(CounterFamily(
+    "rate_limit_rejections_total", "Requests rejected by the rate limiter",
+    ("route",),
+))
+notification_deliveries = registry.register(CounterFamily(
+    "notification_deliveries_total", "Contact notifications delivered or failed, per outbox entry",
+    ("transport", "result"),
+))
+spam_rejections = registry.register(CounterFamily(
+    "contact_spam_rejections_total", "Contact submissions dropped by the spam filter",
+    ("reason",),
+))
+admission_rejections = registry.register(CounterFamily(
+    "http_admission_rejections_total", "Requests shed by admission control (503)",
+    ("route_class", "reason"),
+))
+
+
+class db_timer:
+    """
+    Time a Motor call into db_operation_duration:
+
+        with db_timer("contacts", "insert_one"):
+            await db.contacts.insert_one(doc)
+    """
+    __slots__ = ("labels", "start")
+
+    def __init__(self, collection: str, operation: str):
+        self.labels = (collection, operation)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        db_operation_duration.observe(self.labels, time.perf_counter() - self.start)
+        return False
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency per route template and status code.
+    Routes are labelled by their path template (e.g. /api/admin/contacts/{contact_id}/read)
+    so label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        http_requests_in_flight.value += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_requests_in_flight.value -= 1
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            http_request_duration.observe((scope["method"], route_path, str(status[0])), elapsed)
+            if status[0] == 422:
+                http_validation_failures.inc((route_path,))
@@ -0,0 +1,368 @@
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from typing import Callable, List, Optional
+import asyncio
+import json
+import logging
+import os
+import random
+import smtplib
+import urllib.request
+import uuid
+
+from services.metrics import notification_deliveries
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+DUPLICATE_KEY_ERROR = 11000
+
+# Outbox entries carry the contact fields the transports need
+OUTBOX_FIELDS = {"_id": 0, "id": 1, "name": 1, "email": 1, "message": 1, "created_at": 1}
+
+
+class SmtpTransport:
+    """Sends one email per batch through an SMTP relay"""
+    name = "smtp"
+
+    def __init__(
+        self,
+        host: str,
+        port: int = 25,
+        sender: str = "portfolio@localhost",
+        recipient: str = "owner@localhost",
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        starttls: bool = False,
+        timeout: float = 30.0,
+    ):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.recipient = recipient
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+
+    def build_message(self, batch: List[dict]) -> EmailMessage:
+        message = EmailMessage()
+        message["From"] = self.sender
+        message["To"] = self.recipient
+        if len(batch) == 1:
+            message["Subject"] = f"New contact message from {batch[0]['name']}"
+        else:
+            message["Subject"] = f"{len(batch)} new contact messages"
+        message.set_content("\n\n".join(
+            f"From: {item['name']} <{item['email']}>\nReceived: {item['created_at']:%Y-%m-%d %H:%M} UTC\n\n{item['message']}"
+            for item in batch
+        ))
+        return message
+
+    def _send(self, batch: List[dict]):
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password or "")
+            smtp.send_message(self.build_message(batch))
+
+    async def send(self, batch: List[dict]):
+        # smtplib blocks, keep it off the event loop
+        await asyncio.to_thread(self._send, batch)
+
+
+class WebhookTransport:
+    """POSTs a batch as JSON: {"messages": [{contact_id, name, email, message, created_at}, ...]}"""
+    name = "webhook"
+
+    def __init__(self, url: str, timeout: float = 30.0):
+        self.url = url
+        self.timeout = timeout
+
+    def _send(self, batch: List[dict]):
+        body = json.dumps({"messages": [
+            {
+                "contact_id": item["contact_id"],
+                "name": item["name"],
+                "email": item["email"],
+                "message": item["message"],
+                "created_at": item["created_at"].isoformat(),
+            }
+            for item in batch
+        ]}).encode()
+        request = urllib.request.Request(
+            self.url, data=body, method="POST", headers={"Content-Type": "application/json"}
+        )
+        # Non-2xx responses raise HTTPError and are retried
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+    async def send(self, batch: List[dict]):
+        await asyncio.to_thread(self._send, batch)
+
+
+class NotificationDispatcher:
+    """
+    Delivers new-contact notifications off the request path.
+
+    The request handler stores the contact with `notify_pending: true`,
+    writes an outbox document keyed on the contact id, clears the flag and
+    wakes the dispatcher. A sweep task writes the outbox entries of flagged contacts
+    that don't have one yet (the outbox write failed, or the contact was
+    buffered by write-behind and only stored later) and clears the flag, so
+    every stored contact gets exactly one entry and no entry exists for a
+    contact that was never stored. A pool of `workers` tasks claims due
+    outbox entries with a lease, so several workers (and processes) never
+    deliver the same entry twice unless a lease runs out, then hands them to
+    the transport. Delivery is at-least-once.
+
+    Digest mode: entries are sent together once `digest_size` are waiting
+    or the oldest has waited `digest_interval` seconds; the default of 1 sends
+    one notification per message right away. Failed batches are retried with
+    exponential backoff and jitter, and marked failed after `max_attempts`.
+    """
+
+    def __init__(
+        self,
+        get_collection: Callable,
+        transport,
+        get_contacts: Optional[Callable] = None,
+        workers: int = 2,
+        digest_size: int = 1,
+        digest_interval: float = 0,
+        max_attempts: int = 8,
+        retry_delay: float = 5.0,
+        max_retry_delay: float = 600.0,
+        poll_interval: float = 5.0,
+        lease: float = 60.0,
+        sweep_batch: int = 500,
+    ):
+        self.get_collection = get_collection
+        self.transport = transport
+        self.get_contacts = get_contacts
+        self.workers = workers
+        self.digest_size = digest_size
+        self.digest_interval = digest_interval
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.sweep_batch = sweep_batch
+        self._wake: Optional[asyncio.Event] = None
+        self._sweep_wake: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    @classmethod
+    def from_env(cls, get_collection: Callable, get_contacts: Callable) -> Optional["NotificationDispatcher"]:
+        """Build the dispatcher from NOTIFY_* env vars, None unless NOTIFY_TRANSPORT is set"""
+        transport_name = os.environ.get("NOTIFY_TRANSPORT", "").lower()
+        if not transport_name:
+            return None
+        if transport_name == "smtp":
+            transport = SmtpTransport(
+                host=os.environ.get("NOTIFY_SMTP_HOST", "localhost"),
+                port=int(os.environ.get("NOTIFY_SMTP_PORT", 25)),
+                sender=os.environ.get("NOTIFY_FROM", "portfolio@localhost"),
+                recipient=os.environ.get("NOTIFY_TO", "owner@localhost"),
+                username=os.environ.get("NOTIFY_SMTP_USERNAME") or None,
+                password=os.environ.get("NOTIFY_SMTP_PASSWORD") or None,
+                starttls=os.environ.get("NOTIFY_SMTP_STARTTLS", "false").lower() in ("1", "true", "yes"),
+            )
+        elif transport_name == "webhook":
+            transport = WebhookTransport(os.environ["NOTIFY_WEBHOOK_URL"])
+        else:
+            raise ValueError(f"Unknown NOTIFY_TRANSPORT {transport_name!r}, expected smtp or webhook")
+        return cls(
+            get_collection,
+            transport,
+            get_contacts,
+            workers=int(os.environ.get("NOTIFY_WORKERS", 2)),
+            digest_size=int(os.environ.get("NOTIFY_DIGEST_SIZE", 1)),
+            digest_interval=float(os.environ.get("NOTIFY_DIGEST_INTERVAL", 0)),
+            max_attempts=int(os.environ.get("NOTIFY_MAX_ATTEMPTS", 8)),
+            retry_delay=float(os.environ.get("NOTIFY_RETRY_DELAY", 5)),
+            max_retry_delay=float(os.environ.get("NOTIFY_MAX_RETRY_DELAY", 600)),
+            poll_interval=float(os.environ.get("NOTIFY_POLL_INTERVAL", 5)),
+        )
+
+    @staticmethod
+    def _entry(contact: dict, now: datetime) -> dict:
+        return {
+            # One entry per contact, whether the request or the sweep writes it
+            "_id": contact["id"],
+            "contact_id": contact["id"],
+            "name": contact["name"],
+            "email": contact["email"],
+            "message": contact["message"],
+            "created_at": contact["created_at"],
+            "status": PENDING,
+            "attempts": 0,
+            "next_attempt_at": now,
+        }
+
+    async def enqueue(self, contact: dict):
+        """Write the outbox entry for a stored contact, clear its flag and wake a worker"""
+        # pymongo is imported on first use, see database.connect
+        from pymongo.errors import DuplicateKeyError
+        try:
+            await self.get_collection().insert_one(self._entry(contact, datetime.utcnow()))
+        except DuplicateKeyError:
+            # The sweep got there first
+            pass
+        if self.get_contacts is not None and contact.get("notify_pending"):
+            # The entry exists now: the sweep only has to look at contacts whose
+            # outbox write failed or never happened (a crash in between)
+            await self.get_contacts().update_one({"id": contact["id"]}, {"$unset": {"notify_pending": ""}})
+        if self._wake is not None:
+            self._wake.set()
+
+    def wake_sweep(self):
+        """Look for flagged contacts now, e.g. after write-behind stored a batch"""
+        if self._sweep_wake is not None:
+            self._sweep_wake.set()
+
+    async def sweep(self) -> int:
+        """
+        Write the missing outbox entries of contacts flagged `notify_pending`
+        and clear the flag. Returns how many contacts were flagged.
+        """
+        from pymongo.errors import BulkWriteError
+        contacts = self.get_contacts()
+        swept = 0
+        while True:
+            flagged = await contacts.find({"notify_pending": True}, OUTBOX_FIELDS) \
+                .limit(self.sweep_batch).to_list(self.sweep_batch)
+            if not flagged:
+                return swept
+            now = datetime.utcnow()
+            try:
+                await self.get_collection().insert_many([self._entry(contact, now) for contact in flagged], ordered=False)
+            except BulkWriteError as e:
+                # Entries the request handler already wrote are duplicates; anything else is retried
+                if any(error.get("code") != DUPLICATE_KEY_ERROR for error in e.details.get("writeErrors", [])):
+                    raise
+            await contacts.update_many(
+                {"id": {"$in": [contact["id"] for contact in flagged]}},
+                {"$unset": {"notify_pending": ""}},
+            )
+            swept += len(flagged)
+            if self._wake is not None:
+                self._wake.set()
+            if len(flagged) < self.sweep_batch:
+                return swept
+
+    async def _sweep_forever(self):
+        while True:
+            try:
+                await self.sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Notification outbox sweep error: {str(e)}")
+            try:
+                await asyncio.wait_for(self._sweep_wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._sweep_wake.clear()
+
+    @staticmethod
+    def _due(now: datetime) -> dict:
+        # Pending entries, plus claimed ones whose worker died before finishing
+        return {
+            "$or": [{"status": PENDING}, {"status": SENDING, "locked_until": {"$lt": now}}],
+            "next_attempt_at": {"$lte": now},
+        }
+
+    async def dispatch_once(self) -> bool:
+        """Claim and deliver one batch, False when nothing is ready to send"""
+        collection = self.get_collection()
+        now = datetime.utcnow()
+        due = self._due(now)
+
+        candidates = await collection.find(due, {"_id": 1, "created_at": 1}) \
+            .sort("created_at", 1).limit(self.digest_size).to_list(self.digest_size)
+        if not candidates:
+            return False
+        digest_deadline = now - timedelta(seconds=self.digest_interval)
+        if len(candidates) < self.digest_size and candidates[0]["created_at"] > digest_deadline:
+            return False
+
+        claim = uuid.uuid4().hex
+        await collection.update_many(
+            {"_id": {"$in": [candidate["_id"] for candidate in candidates]}, **due},
+            {"$set": {"status": SENDING, "claim": claim, "locked_until": now + timedelta(seconds=self.lease)}},
+        )
+        batch = await collection.find({"claim": claim}).sort("created_at", 1).to_list(None)
+        if not batch:
+            # Another worker claimed them first
+            return True
+
+        try:
+            await self.transport.send(batch)
+        except Exception as e:
+            await self._failed(batch, claim, e)
+        else:
+            await collection.update_many(
+                {"claim": claim},
+                {"$set": {"status": SENT, "sent_at": datetime.utcnow()}, "$unset": {"claim": "", "locked_until": ""}},
+            )
+            notification_deliveries.inc((self.transport.name, "sent"), len(batch))
+        return True
+
+    async def _failed(self, batch: List[dict], claim: str, error: Exception):
+        attempts = max(item.get("attempts", 0) for item in batch) + 1
+        notification_deliveries.inc((self.transport.name, "error"), len(batch))
+        if attempts >= self.max_attempts:
+            logger.error(f"Giving up on {len(batch)} notifications after {attempts} attempts: {str(error)}")
+            update = {"$set": {"status": FAILED, "last_error": str(error)}}
+        else:
+            delay = min(self.retry_delay * 2 ** (attempts - 1), self.max_retry_delay)
+            delay *= random.uniform(0.5, 1.0)
+            logger.warning(f"Notification delivery failed (attempt {attempts}), retrying in {delay:.0f}s: {str(error)}")
+            update = {"$set": {
+                "status": PENDING,
+                "next_attempt_at": datetime.utcnow() + timedelta(seconds=delay),
+                "last_error": str(error),
+            }}
+        update["$set"]["attempts"] = attempts
+        update["$unset"] = {"claim": "", "locked_until": ""}
+        await self.get_collection().update_many({"claim": claim}, update)
+
+    async def _work(self):
+        while True:
+            try:
+                if await self.dispatch_once():
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Notification dispatch error: {str(e)}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def start(self):
+        self._wake = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        if self.get_contacts is not None:
+            self._sweep_wake = asyncio.Event()
+            self._tasks.append(asyncio.create_task(self._sweep_forever()))
+
+    async def stop(self):
+        # A batch cut off mid-delivery keeps its lease and is retried once it expires
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
@@ -0,0 +1,70 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import base64
+import json
+
+# Sort spec as passed to cursor.sort(): [(field, 1 | -1), ...]
+SortSpec = List[Tuple[str, int]]
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(document: dict, sort: SortSpec) -> str:
+    """Opaque keyset cursor holding the sort key values of `document`"""
+    values = {}
+    for field, _ in sort:
+        value = document[field]
+        if isinstance(value, datetime):
+            values[field] = {"$dt": value.isoformat()}
+        else:
+            values[field] = value
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str, sort: SortSpec) -> Dict[str, Any]:
+    """Decode a cursor produced by encode_cursor for the same sort spec"""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, dict) or set(values) != {field for field, _ in sort}:
+            raise ValueError("cursor does not match sort order")
+        for field, value in values.items():
+            if isinstance(value, dict):
+                # Only encode_cursor's datetimes, never a query operator
+                if set(value) != {"$dt"} or not isinstance(value["$dt"], str):
+                    raise ValueError(f"unexpected value for {field}")
+                values[field] = datetime.fromisoformat(value["$dt"])
+            elif not isinstance(value, (str, int, float)) or isinstance(value, bool):
+                raise ValueError(f"unexpected value for {field}")
+        return values
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid pagination cursor: {str(e)}")
+
+
+def keyset_filter(sort: SortSpec, after: Optional[Dict[str, Any]]) -> dict:
+    """
+    Query matching documents strictly after `after` in `sort` order, e.g. for
+    [(created_at, -1), (id, -1)]:
+    {$or: [{created_at: {$lt: c}}, {created_at: c, id: {$lt: i}}]}
+    With an index on the sort fields this is a bounded index range scan,
+    so each page costs O(limit) whatever its depth.
+    """
+    if not after:
+        return {}
+
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        clause = {prefix: after[prefix] for prefix, _ in sort[:i]}
+        clause[field] = {"$lt" if direction < 0 else "$gt": after[field]}
+        clauses.append(clause)
+    return {"$or": clauses}
+
+
+def next_cursor(documents: List[dict], limit: int, sort: SortSpec) -> Optional[str]:
+    """Cursor for the page following `documents`, None when this was the last page"""
+    if limit <= 0 or len(documents) < limit:
+        return None
+    return encode_cursor(documents[-1], sort)
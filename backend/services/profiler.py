@@ -0,0 +1,239 @@
+from collections import Counter
+from typing import Callable, Optional
+import asyncio
+import json
+import logging
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+
+from services.metrics import http_request_duration
+
+logger = logging.getLogger(__name__)
+
+
+class StackSampler:
+    """
+    Wall-clock stack sampler.
+    While active, a background thread snapshots every thread's stack each
+    `interval` seconds via sys._current_frames() and counts identical stacks.
+    The result is in collapsed-stack format ("a;b;c <count>" per line), which
+    flamegraph.pl, speedscope and inferno read directly. Nothing runs when
+    the sampler is idle, so it costs nothing unless a profile was requested.
+    """
+
+    def __init__(self):
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.result: Optional[str] = None
+
+    @property
+    def active(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(
+        self,
+        seconds: float,
+        interval: float = 0.005,
+        max_requests: Optional[int] = None,
+        count_requests: Optional[Callable[[], int]] = None,
+        on_done: Optional[Callable[[str], None]] = None,
+    ):
+        """Sample for `seconds`, or until `max_requests` more requests were handled"""
+        if self.active:
+            raise RuntimeError("A profile is already running in this worker")
+        self._stop.clear()
+        self.result = None
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(seconds, interval, max_requests, count_requests, on_done),
+            name="stack-sampler",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[str]:
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.result
+
+    @staticmethod
+    def _collapse(thread_name: str, frame) -> str:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        stack.append(thread_name)
+        return ";".join(reversed(stack))
+
+    def _run(self, seconds, interval, max_requests, count_requests, on_done):
+        own_id = threading.get_ident()
+        counts: Counter = Counter()
+        requests_at_start = count_requests() if count_requests and max_requests else 0
+        deadline = time.monotonic() + seconds
+        samples = 0
+
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_id:
+                    counts[self._collapse(names.get(thread_id, str(thread_id)), frame)] += 1
+            samples += 1
+            if max_requests and count_requests() - requests_at_start >= max_requests:
+                break
+            time.sleep(interval)
+
+        header = f"# pid {os.getpid()}, {samples} samples every {interval * 1000:g}ms"
+        self.result = "\n".join([header] + [f"{stack} {count}" for stack, count in counts.most_common()]) + "\n"
+        if on_done is not None:
+            on_done(self.result)
+
+
+class WorkerProfiler:
+    """
+    Profiling entry point for one worker process.
+
+    With several uvicorn workers an HTTP request lands on an arbitrary one,
+    so each worker registers its pid in `directory`. A profile aimed at
+    another worker is handed over by writing `<pid>.request` and sending it
+    SIGUSR2; that worker samples itself and writes `<pid>.folded`, which
+    the requesting worker returns.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        directory: Optional[str] = None,
+        token: Optional[str] = None,
+        count_requests: Optional[Callable[[], int]] = None,
+    ):
+        self.enabled = enabled
+        self.directory = directory or os.path.join(tempfile.gettempdir(), "portfolio-profiles")
+        self.token = token
+        self.count_requests = count_requests
+        self.sampler = StackSampler()
+        self._registered = False
+
+    @classmethod
+    def from_env(cls, count_requests: Optional[Callable[[], int]] = None) -> "WorkerProfiler":
+        return cls(
+            enabled=os.environ.get("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes"),
+            directory=os.environ.get("PROFILING_DIR") or None,
+            token=os.environ.get("PROFILING_TOKEN") or None,
+            count_requests=count_requests,
+        )
+
+    def _path(self, pid: int, suffix: str) -> str:
+        return os.path.join(self.directory, f"{pid}.{suffix}")
+
+    def workers(self):
+        pids = []
+        if not os.path.isdir(self.directory):
+            return pids
+        for name in os.listdir(self.directory):
+            if name.endswith(".worker"):
+                pid = int(name.split(".", 1)[0])
+                try:
+                    os.kill(pid, 0)
+                    pids.append(pid)
+                except OSError:
+                    # Left behind by a worker that died without cleaning up
+                    os.unlink(os.path.join(self.directory, name))
+        return sorted(pids)
+
+    def register(self):
+        """Announce this worker and listen for hand-over requests"""
+        if not self.enabled:
+            return
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGUSR2, self._on_signal)
+        except (RuntimeError, ValueError) as e:
+            # Signals need the loop in the main thread, it can still profile itself
+            logger.warning(f"Profiling hand-over to this worker unavailable: {str(e)}")
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        open(self._path(os.getpid(), "worker"), "w").close()
+        self._registered = True
+
+    def unregister(self):
+        self.sampler.stop()
+        if not self._registered:
+            return
+        self._registered = False
+        for suffix in ("worker", "request"):
+            try:
+                os.unlink(self._path(os.getpid(), suffix))
+            except FileNotFoundError:
+                pass
+        asyncio.get_running_loop().remove_signal_handler(signal.SIGUSR2)
+
+    def _on_signal(self):
+        pid = os.getpid()
+        try:
+            with open(self._path(pid, "request")) as request_file:
+                options = json.load(request_file)
+            os.unlink(self._path(pid, "request"))
+            self._start(options, on_done=lambda result: self._write_result(pid, result))
+        except Exception as e:
+            logger.error(f"Error starting requested profile: {str(e)}")
+
+    def _write_result(self, pid: int, result: str):
+        tmp_path = self._path(pid, "folded.tmp")
+        with open(tmp_path, "w") as output:
+            output.write(result)
+        os.replace(tmp_path, self._path(pid, "folded"))
+
+    def _start(self, options: dict, on_done=None):
+        self.sampler.start(
+            seconds=options["seconds"],
+            interval=options["interval"],
+            max_requests=options.get("max_requests"),
+            count_requests=self.count_requests,
+            on_done=on_done,
+        )
+
+    async def profile(
+        self,
+        seconds: float,
+        interval: float = 0.005,
+        max_requests: Optional[int] = None,
+        pid: Optional[int] = None,
+    ) -> str:
+        """Profile this worker, or the worker `pid`, and return collapsed stacks"""
+        options = {"seconds": seconds, "interval": interval, "max_requests": max_requests}
+
+        if pid is None or pid == os.getpid():
+            self._start(options)
+            return await asyncio.to_thread(self.sampler.wait)
+
+        if pid not in self.workers():
+            raise LookupError(f"No profiling-enabled worker with pid {pid}")
+
+        output_path = self._path(pid, "folded")
+        if os.path.exists(output_path):
+            os.unlink(output_path)
+        with open(self._path(pid, "request"), "w") as request_file:
+            json.dump(options, request_file)
+        os.kill(pid, signal.SIGUSR2)
+
+        deadline = time.monotonic() + seconds + 10
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+            if os.path.exists(output_path):
+                with open(output_path) as output:
+                    result = output.read()
+                os.unlink(output_path)
+                return result
+        raise TimeoutError(f"Worker {pid} did not return a profile")
+
+
+# Stops request-bounded profiles by watching the request latency histogram,
+# which adds nothing to the request path
+worker_profiler = WorkerProfiler.from_env(count_requests=http_request_duration.total_count)
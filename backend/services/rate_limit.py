@@ -0,0 +1,299 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional
+import asyncio
+import logging
+import math
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RouteLimit:
+    """Limit settings for a single route: `limit` hits per `window` seconds"""
+    limit: int
+    window: float
+
+    @classmethod
+    def parse(cls, value: str) -> "RouteLimit":
+        """Parse a `<limit>/<window_seconds>` string, e.g. `5/3600`"""
+        limit, window = value.split("/", 1)
+        return cls(limit=int(limit), window=float(window))
+
+
+# Default per-route limits, overridable with RATE_LIMIT_<ROUTE>="<limit>/<seconds>"
+DEFAULT_ROUTE_LIMITS: Dict[str, RouteLimit] = {
+    "contact": RouteLimit(limit=5, window=3600),
+}
+
+
+def sliding_window_hit(entry: list, limit: int, window: float, now: float) -> bool:
+    """
+    Apply one hit to a sliding window counter entry in place.
+    Entry layout: [window_index, previous_count, current_count]
+    """
+    current_window = int(now // window)
+
+    if entry[0] != current_window:
+        entry[1] = entry[2] if entry[0] == current_window - 1 else 0
+        entry[2] = 0
+        entry[0] = current_window
+
+    elapsed = (now - current_window * window) / window
+    estimate = entry[1] * (1 - elapsed) + entry[2]
+    if estimate >= limit:
+        return False
+
+    entry[2] += 1
+    return True
+
+
+def sliding_window_retry_after(entry: list, limit: int, window: float, now: float) -> float:
+    """Seconds until a sliding window counter entry lets a hit through again"""
+    current_window = int(now // window)
+    previous, current = entry[1], entry[2]
+    if entry[0] != current_window:
+        previous = current if entry[0] == current_window - 1 else 0
+        current = 0
+
+    if current >= limit:
+        # Once this window is the previous one and has slid far enough out
+        return (current_window + 1 + 1 - limit / current) * window - now
+    if previous + current < limit:
+        return 0.0
+    return (current_window + 1 - (limit - current) / previous) * window - now
+
+
+class RateLimitStore:
+    """
+    Base class for per-key rate limit stores.
+    Every store keeps its keys in LRU order and never holds more than
+    `max_entries` of them, so memory stays bounded whatever the key space is.
+    """
+
+    def __init__(self, limit: int, window: float, max_entries: int = 100_000):
+        self.limit = limit
+        self.window = window
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, list]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def hit(self, key: str, now: Optional[float] = None) -> bool:
+        """Record a request for `key`, returns False if it is over the limit"""
+        raise NotImplementedError
+
+    def retry_after(self, key: str, now: Optional[float] = None) -> float:
+        """Seconds until `key` may be let through again, 0 if it already is"""
+        raise NotImplementedError
+
+    def _get_entry(self, key: str, now: float) -> list:
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._new_entry(now)
+            self._entries[key] = entry
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(key)
+        return entry
+
+    def _new_entry(self, now: float) -> list:
+        raise NotImplementedError
+
+    def _is_idle(self, entry: list, now: float) -> bool:
+        raise NotImplementedError
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """
+        Drop idle keys. Entries are in LRU order, so this stops at the first
+        key that is still active and only costs O(evicted).
+        """
+        now = time.time() if now is None else now
+        removed = 0
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if not self._is_idle(entry, now):
+                break
+            del self._entries[key]
+            removed += 1
+        return removed
+
+
+class SlidingWindowCounterStore(RateLimitStore):
+    """
+    Sliding window counter: keeps the count of the current and previous
+    fixed window and weights the previous one by how much of it still
+    overlaps the sliding window. O(1) time and memory per key.
+    Entry layout: [window_index, previous_count, current_count]
+    """
+
+    def _new_entry(self, now: float) -> list:
+        return [int(now // self.window), 0, 0]
+
+    def _is_idle(self, entry: list, now: float) -> bool:
+        return entry[0] < int(now // self.window) - 1
+
+    def hit(self, key: str, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        return sliding_window_hit(self._get_entry(key, now), self.limit, self.window, now)
+
+    def retry_after(self, key: str, now: Optional[float] = None) -> float:
+        now = time.time() if now is None else now
+        entry = self._entries.get(key)
+        return sliding_window_retry_after(entry, self.limit, self.window, now) if entry is not None else 0.0
+
+
+class TokenBucketStore(RateLimitStore):
+    """
+    Token bucket: `limit` tokens refilled evenly over `window` seconds.
+    Entry layout: [tokens, last_refill_timestamp]
+    """
+
+    def _new_entry(self, now: float) -> list:
+        return [float(self.limit), now]
+
+    def _is_idle(self, entry: list, now: float) -> bool:
+        # A bucket that has had a full window to refill is back at capacity
+        return now - entry[1] >= self.window
+
+    def hit(self, key: str, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        entry = self._get_entry(key, now)
+
+        rate = self.limit / self.window
+        entry[0] = min(float(self.limit), entry[0] + (now - entry[1]) * rate)
+        entry[1] = now
+
+        if entry[0] < 1:
+            return False
+
+        entry[0] -= 1
+        return True
+
+    def retry_after(self, key: str, now: Optional[float] = None) -> float:
+        now = time.time() if now is None else now
+        entry = self._entries.get(key)
+        if entry is None:
+            return 0.0
+        rate = self.limit / self.window
+        tokens = min(float(self.limit), entry[0] + (now - entry[1]) * rate)
+        return max(0.0, (1 - tokens) / rate)
+
+
+STORE_TYPES = {
+    "sliding_window": SlidingWindowCounterStore,
+    "token_bucket": TokenBucketStore,
+}
+
+
+class RateLimiter:
+    """
+    Rate limiter with one bounded store per route and a background
+    sweeper that evicts idle keys.
+    With `backend` set to "shared_memory" or "mongo" the counters live in a
+    store shared by every worker instead (see services.rate_limit_shared).
+    """
+
+    def __init__(
+        self,
+        route_limits: Optional[Dict[str, RouteLimit]] = None,
+        algorithm: str = "sliding_window",
+        max_entries: int = 100_000,
+        sweep_interval: float = 60.0,
+        backend: str = "local",
+    ):
+        if algorithm not in STORE_TYPES:
+            raise ValueError(f"Unknown rate limit algorithm: {algorithm}")
+        self.route_limits = dict(route_limits or DEFAULT_ROUTE_LIMITS)
+        self.algorithm = algorithm
+        self.max_entries = max_entries
+        self.sweep_interval = sweep_interval
+        self.backend = backend
+        self._shared = None
+        self._stores: Dict[str, RateLimitStore] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        """Build a limiter from RATE_LIMIT_* environment variables"""
+        route_limits = dict(DEFAULT_ROUTE_LIMITS)
+        for route in list(route_limits):
+            override = os.environ.get(f"RATE_LIMIT_{route.upper()}")
+            if override:
+                route_limits[route] = RouteLimit.parse(override)
+
+        return cls(
+            route_limits=route_limits,
+            algorithm=os.environ.get("RATE_LIMIT_ALGORITHM", "sliding_window"),
+            max_entries=int(os.environ.get("RATE_LIMIT_MAX_ENTRIES", 100_000)),
+            sweep_interval=float(os.environ.get("RATE_LIMIT_SWEEP_INTERVAL", 60)),
+            backend=os.environ.get("RATE_LIMIT_BACKEND", "local"),
+        )
+
+    def __len__(self) -> int:
+        return sum(len(store) for store in self._stores.values())
+
+    def store_for(self, route: str) -> RateLimitStore:
+        store = self._stores.get(route)
+        if store is None:
+            route_limit = self.route_limits[route]
+            store = STORE_TYPES[self.algorithm](
+                route_limit.limit, route_limit.window, self.max_entries
+            )
+            self._stores[route] = store
+        return store
+
+    async def check(self, route: str, key: str, now: Optional[float] = None) -> bool:
+        """Record a hit for `key` on `route`, returns False if rate limited"""
+        if self.backend == "local":
+            return self.store_for(route).hit(key, now)
+
+        if self._shared is None:
+            from services.rate_limit_shared import build_shared_backend
+            self._shared = build_shared_backend(self.backend)
+        return await self._shared.hit(route, key, self.route_limits[route], now)
+
+    def retry_after(self, route: str, key: str, now: Optional[float] = None) -> int:
+        """Whole seconds a client rejected by check() should wait, for a Retry-After header"""
+        if self.backend == "local":
+            seconds = self.store_for(route).retry_after(key, now)
+        else:
+            seconds = self._shared.retry_after(route, key, now) if self._shared is not None else 0.0
+        return max(1, math.ceil(seconds))
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        removed = sum(store.sweep(now) for store in self._stores.values())
+        if self._shared is not None:
+            removed += self._shared.sweep(now)
+        return removed
+
+    async def _sweep_forever(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            removed = self.sweep()
+            if removed:
+                logger.debug(f"Rate limiter sweep removed {removed} idle keys")
+
+    def start_sweeper(self):
+        """Start the background sweeper on the running event loop"""
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep_forever())
+
+    async def stop_sweeper(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+        if self._shared is not None:
+            self._shared.close()
+            self._shared = None
+
+
+rate_limiter = RateLimiter.from_env()
@@ -0,0 +1,278 @@
+from collections import OrderedDict
+from datetime import datetime, timezone
+from multiprocessing import resource_tracker, shared_memory
+from typing import Optional, Tuple
+import asyncio
+import fcntl
+import hashlib
+import logging
+import os
+import struct
+import tempfile
+import time
+
+from pymongo import ReturnDocument
+
+from services.rate_limit import RouteLimit, sliding_window_hit, sliding_window_retry_after
+
+logger = logging.getLogger(__name__)
+
+
+class SharedCounterTable:
+    """
+    Atomic check-and-increment of sliding window counters shared between
+    processes. Implementations must apply the whole read-modify-write of one
+    key atomically, so N workers enforce the same limit as a single one.
+    """
+
+    async def hit(self, key: str, limit: int, window: float, now: float) -> Tuple[bool, float]:
+        """(allowed, seconds until `key` is let through again, 0 when allowed)"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SharedMemoryCounterTable(SharedCounterTable):
+    """
+    Fixed-size hash table in a `multiprocessing.shared_memory` segment,
+    guarded by an flock so every process on the box sees the same counters.
+    Stand-in for a networked store when running several uvicorn workers on
+    one machine. Collisions are resolved with a short linear probe; when the
+    probe is full the slot with the oldest window is recycled, so memory is
+    fixed at `slots * SLOT.size` bytes.
+    """
+
+    # key_hash, window_index, previous_count, current_count
+    SLOT = struct.Struct("<QqII")
+    PROBE = 8
+    # Backoff while another process holds the lock, in seconds
+    LOCK_RETRY_MIN = 0.0001
+    LOCK_RETRY_MAX = 0.005
+
+    def __init__(self, name: str = "portfolio_rate_limit", slots: int = 65536):
+        self.name = name
+        self.slots = slots
+        size = slots * self.SLOT.size
+        try:
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            self._shm = shared_memory.SharedMemory(name=name)
+            if self._shm.size < size:
+                self._shm.close()
+                raise ValueError(f"Shared rate limit table {name} is smaller than {size} bytes")
+        # Creating or attaching registers the segment with this process'
+        # resource tracker, which would unlink it when that worker exits while
+        # the others still use it. It outlives the workers; see unlink()
+        resource_tracker.unregister(self._shm._name, "shared_memory")
+        self._buf = self._shm.buf
+        self._lock_file = open(os.path.join(tempfile.gettempdir(), f"{name}.lock"), "a+")
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        # Built-in hash() is salted per process, so use a stable digest
+        value = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little")
+        return value or 1
+
+    def hit_sync(self, key: str, limit: int, window: float, now: float) -> Tuple[bool, float]:
+        """hit() for callers outside the event loop, blocks on the lock"""
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        try:
+            return self._hit_locked(key, limit, window, now)
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    async def hit(self, key: str, limit: int, window: float, now: float) -> Tuple[bool, float]:
+        # The critical section is a handful of struct ops, cheaper than a thread
+        # hop, but a blocking flock would stall the event loop while another
+        # worker holds it: retry a non-blocking one with a short sleep instead
+        delay = self.LOCK_RETRY_MIN
+        while True:
+            try:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.LOCK_RETRY_MAX)
+        try:
+            return self._hit_locked(key, limit, window, now)
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _hit_locked(self, key: str, limit: int, window: float, now: float) -> Tuple[bool, float]:
+        key_hash = self._hash(key)
+        start = key_hash % self.slots
+        slot_size = self.SLOT.size
+
+        target = None
+        oldest = None
+        for i in range(self.PROBE):
+            offset = ((start + i) % self.slots) * slot_size
+            slot_hash, window_index, previous, current = self.SLOT.unpack_from(self._buf, offset)
+            if slot_hash == key_hash:
+                target = (offset, [window_index, previous, current])
+                break
+            if slot_hash == 0:
+                if target is None:
+                    target = (offset, [0, 0, 0])
+                continue
+            if oldest is None or window_index < oldest[1]:
+                oldest = (offset, window_index)
+
+        if target is None:
+            target = (oldest[0], [0, 0, 0])
+
+        offset, entry = target
+        allowed = sliding_window_hit(entry, limit, window, now)
+        self.SLOT.pack_into(self._buf, offset, key_hash, *entry)
+        return allowed, 0.0 if allowed else sliding_window_retry_after(entry, limit, window, now)
+
+    def close(self):
+        self._buf = None
+        self._shm.close()
+        self._lock_file.close()
+
+    def unlink(self):
+        """Remove the segment, only needed when tearing down tests/benchmarks"""
+        try:
+            shared_memory.SharedMemory(name=self.name).unlink()
+        except FileNotFoundError:
+            pass
+
+
+class MongoCounterTable(SharedCounterTable):
+    """
+    Counters kept in a MongoDB collection, shared by every worker and node.
+    A single `find_one_and_update` with an aggregation pipeline rolls the
+    window, evaluates the limit and increments atomically on the server.
+    A TTL index on `expires_at` removes idle keys.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+        self._indexes_ready = False
+
+    async def ensure_indexes(self):
+        if not self._indexes_ready:
+            await self.collection.create_index("expires_at", expireAfterSeconds=0)
+            self._indexes_ready = True
+
+    async def hit(self, key: str, limit: int, window: float, now: float) -> Tuple[bool, float]:
+        await self.ensure_indexes()
+        current_window = int(now // window)
+        elapsed = (now - current_window * window) / window
+        same_window = {"$eq": ["$w", current_window]}
+
+        pipeline = [
+            {"$set": {
+                "prev": {"$switch": {
+                    "branches": [
+                        {"case": same_window, "then": "$prev"},
+                        {"case": {"$eq": ["$w", current_window - 1]}, "then": "$curr"},
+                    ],
+                    "default": 0,
+                }},
+                "curr": {"$cond": [same_window, "$curr", 0]},
+                "w": current_window,
+                "expires_at": datetime.fromtimestamp((current_window + 2) * window, tz=timezone.utc),
+            }},
+            {"$set": {"allowed": {"$lt": [
+                {"$add": [{"$multiply": ["$prev", 1 - elapsed]}, "$curr"]}, limit
+            ]}}},
+            {"$set": {"curr": {"$cond": ["$allowed", {"$add": ["$curr", 1]}, "$curr"]}}},
+        ]
+
+        doc = await self.collection.find_one_and_update(
+            {"_id": key}, pipeline, upsert=True, return_document=ReturnDocument.AFTER,
+            projection={"allowed": 1, "w": 1, "prev": 1, "curr": 1},
+        )
+        if doc["allowed"]:
+            return True, 0.0
+        return False, sliding_window_retry_after([doc["w"], doc["prev"], doc["curr"]], limit, window, now)
+
+
+class SharedRateLimitBackend:
+    """
+    Distributed rate limiting on top of a SharedCounterTable.
+    Keeps a small client-side cache of rejected keys so hot abusers are
+    turned away without a round trip, and either lets requests through
+    (fail open) or rejects them (fail closed) when the table is unavailable.
+    A cached rejection lasts at most `reject_cache_ttl` seconds, but keeps
+    when the table said the key would be let through again, for Retry-After.
+    """
+
+    def __init__(
+        self,
+        table: SharedCounterTable,
+        fail_open: bool = True,
+        reject_cache_ttl: float = 5.0,
+        reject_cache_size: int = 10_000,
+    ):
+        self.table = table
+        self.fail_open = fail_open
+        self.reject_cache_ttl = reject_cache_ttl
+        self.reject_cache_size = reject_cache_size
+        # cache key -> (cached until, let through again at)
+        self._rejected: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._rejected)
+
+    async def hit(self, route: str, key: str, route_limit: RouteLimit, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        cache_key = f"{route}:{key}"
+
+        rejected = self._rejected.get(cache_key)
+        if rejected is not None:
+            if now < rejected[0]:
+                return False
+            del self._rejected[cache_key]
+
+        try:
+            allowed, retry_after = await self.table.hit(cache_key, route_limit.limit, route_limit.window, now)
+        except Exception as e:
+            logger.error(f"Shared rate limit backend error, failing {'open' if self.fail_open else 'closed'}: {str(e)}")
+            return self.fail_open
+
+        if not allowed:
+            self._rejected[cache_key] = (now + min(self.reject_cache_ttl, retry_after), now + retry_after)
+            if len(self._rejected) > self.reject_cache_size:
+                self._rejected.popitem(last=False)
+        return allowed
+
+    def retry_after(self, route: str, key: str, now: Optional[float] = None) -> float:
+        """Seconds until a rejected `key` is let through again, 0 if unknown"""
+        now = time.time() if now is None else now
+        rejected = self._rejected.get(f"{route}:{key}")
+        return max(0.0, rejected[1] - now) if rejected is not None else 0.0
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        expired = [key for key, (until, _) in self._rejected.items() if until <= now]
+        for key in expired:
+            del self._rejected[key]
+        return len(expired)
+
+    def close(self):
+        self.table.close()
+
+
+def build_shared_backend(kind: str) -> SharedRateLimitBackend:
+    """Build the shared backend selected by RATE_LIMIT_BACKEND"""
+    if kind == "shared_memory":
+        table = SharedMemoryCounterTable(
+            name=os.environ.get("RATE_LIMIT_SHM_NAME", "portfolio_rate_limit"),
+            slots=int(os.environ.get("RATE_LIMIT_SHM_SLOTS", 65536)),
+        )
+    elif kind == "mongo":
+        from database import get_database
+        table = MongoCounterTable(get_database().rate_limits)
+    else:
+        raise ValueError(f"Unknown rate limit backend: {kind}")
+
+    return SharedRateLimitBackend(
+        table,
+        fail_open=os.environ.get("RATE_LIMIT_FAIL_MODE", "open") == "open",
+        reject_cache_ttl=float(os.environ.get("RATE_LIMIT_REJECT_CACHE_TTL", 5)),
+        reject_cache_size=int(os.environ.get("RATE_LIMIT_REJECT_CACHE_SIZE", 10_000)),
+    )
@@ -0,0 +1,209 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple, Union
+from urllib.parse import urlencode
+import asyncio
+import hashlib
+import logging
+import os
+import time
+
+from fastapi import Request, Response
+
+logger = logging.getLogger(__name__)
+
+# Response headers kept with a cached body (others are recomputed per request)
+CACHED_HEADERS = ("x-next-cursor", "content-disposition")
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str
+    media_type: str
+    expires_at: float
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+class ResponseCache:
+    """
+    Size-bounded LRU cache of serialized GET responses with a TTL.
+    Entries are keyed on path + query string and tagged with the collection
+    they were read from; write handlers call `invalidate(tag)`. Every
+    response carries a strong ETag, so a poll whose If-None-Match matches a
+    live entry gets a 304 without touching the database or the serializer.
+    The cache is per worker: writes handled by other workers only show up
+    once the TTL runs out.
+
+    Concurrent misses on one key share a single `produce` call. Each tag
+    has a generation that `invalidate` bumps; a response whose tag was
+    invalidated while it was being produced is returned but not cached,
+    and requests arriving after the invalidation don't wait for it.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        self._generations: Dict[str, int] = {}
+        self._cleared = 0
+        # key -> (tag generation it was started at, future of its entry)
+        self._flights: Dict[str, Tuple[tuple, asyncio.Future]] = {}
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        return cls(
+            max_entries=int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", 256)),
+            ttl=float(os.environ.get("RESPONSE_CACHE_TTL", 30)),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(request: Request) -> str:
+        # Re-encoded, so `?q=a%26b%3D1` and `?q=a&b=1` stay different keys
+        query = urlencode(sorted(request.query_params.multi_items()))
+        return f"{request.url.path}?{query}"
+
+    @staticmethod
+    def make_etag(body: bytes) -> str:
+        return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, tag: str, entry: CachedResponse):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str):
+        self._entries.pop(key, None)
+        for keys in self._tags.values():
+            keys.discard(key)
+
+    def _generation(self, tag: str) -> tuple:
+        return self._cleared, self._generations.get(tag, 0)
+
+    def invalidate(self, tag: str):
+        """Drop every cached response read from `tag`"""
+        self._generations[tag] = self._generations.get(tag, 0) + 1
+        for key in self._tags.pop(tag, ()):
+            self._entries.pop(key, None)
+
+    def clear(self):
+        self._cleared += 1
+        self._entries.clear()
+        self._tags.clear()
+
+    @staticmethod
+    def _not_modified(request: Request, etag: str) -> bool:
+        if_none_match = request.headers.get("if-none-match")
+        if not if_none_match:
+            return False
+        return if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]
+
+    @staticmethod
+    def _build(entry: CachedResponse, status_code: int = 200) -> Response:
+        headers = dict(entry.headers)
+        headers["ETag"] = entry.etag
+        headers["Cache-Control"] = "no-cache"
+        if status_code == 304:
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type=entry.media_type, headers=headers)
+
+    async def respond(self, request: Request, tag: str, produce: Callable[[], Awaitable[Response]]) -> Response:
+        """
+        Serve `request` from the cache, or call `produce` for a fresh response
+        and cache it. Answers 304 when If-None-Match matches the ETag.
+        """
+        key = self.make_key(request)
+        entry = self.get(key) if self.enabled else None
+
+        if entry is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            result = await self._fill(key, tag, produce)
+            if isinstance(result, Response):
+                return result
+            entry = result
+
+        if self._not_modified(request, entry.etag):
+            return self._build(entry, 304)
+        return self._build(entry)
+
+    async def _fill(
+        self, key: str, tag: str, produce: Callable[[], Awaitable[Response]]
+    ) -> Union[CachedResponse, Response]:
+        """
+        A fresh entry for `key`, or the response itself when it can't be
+        cached (not a 200). Joins a `produce` call already running for `key`
+        unless `tag` was invalidated since it started.
+        """
+        generation = self._generation(tag)
+        flight = self._flights.get(key) if self.enabled else None
+        if flight is not None and flight[0] == generation:
+            # Shielded: a waiter going away must not cancel the call it waits on
+            entry = await asyncio.shield(flight[1])
+            if entry is not None:
+                return entry
+            # Nothing cacheable came out of it: produce this response alone
+            return await self._produce(produce)
+
+        future = asyncio.get_running_loop().create_future()
+        if self.enabled:
+            self._flights[key] = (generation, future)
+        try:
+            result = await self._produce(produce)
+        except asyncio.CancelledError:
+            future.set_result(None)
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Retrieved here, so no "never retrieved" warning without waiters
+            future.exception()
+            raise
+        finally:
+            if key in self._flights and self._flights[key][1] is future:
+                del self._flights[key]
+
+        if isinstance(result, Response):
+            future.set_result(None)
+            return result
+        future.set_result(result)
+        if self.enabled and self._generation(tag) == generation:
+            self.put(key, tag, result)
+        return result
+
+    async def _produce(self, produce: Callable[[], Awaitable[Response]]) -> Union[CachedResponse, Response]:
+        response = await produce()
+        if response.status_code != 200:
+            return response
+        return CachedResponse(
+            body=response.body,
+            etag=self.make_etag(response.body),
+            media_type=response.media_type or "application/json",
+            expires_at=time.monotonic() + self.ttl,
+            headers={k: v for k, v in response.headers.items() if k in CACHED_HEADERS},
+        )
+
+
+response_cache = ResponseCache.from_env()
@@ -0,0 +1,311 @@
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+import asyncio
+import gzip
+import logging
+import os
+import uuid
+
+from database import get_database
+from services.response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+STATUS_TTL_INDEX = "timestamp_ttl"
+RETENTION_LEASE_ID = "retention"
+
+
+class RetentionRunInProgress(Exception):
+    """Another run, in this worker or another one, holds the retention lease"""
+
+
+def rollup_update(bucket: dict) -> list:
+    """
+    Pipeline update writing one hourly bucket. Counts are recomputed, not
+    added: a rerun over raw rows that were rolled up but not deleted yet
+    writes the same count again. A rollup of strictly earlier rows of the
+    hour (a partial hour left by a cutoff that wasn't on the hour) is kept
+    as `earlier_count` and added on top.
+    """
+    earlier = {"$lt": [{"$ifNull": ["$last_seen", None]}, bucket["first_seen"]]}
+    return [
+        {"$set": {
+            "earlier_count": {"$cond": [earlier, {"$ifNull": ["$count", 0]}, {"$ifNull": ["$earlier_count", 0]}]},
+            "first_seen": {"$cond": [earlier, {"$ifNull": ["$first_seen", bucket["first_seen"]]}, "$first_seen"]},
+            "last_seen": bucket["last_seen"],
+        }},
+        {"$set": {"count": {"$add": ["$earlier_count", bucket["count"]]}}},
+    ]
+
+
+class RetentionPolicy:
+    """
+    Keeps `status_checks` and `contacts` from growing without bound.
+
+    - status checks older than `status_ttl_days` are removed by a Mongo TTL index
+    - status checks older than `status_rollup_hours` are compacted into
+      per-client hourly counts in `status_check_rollups` and deleted
+    - read contacts older than `contact_archive_days` are moved to the
+      `contacts_archive` collection, or appended to a gzipped NDJSON file
+      when `contact_archive_path` is set
+
+    Any setting left at 0 disables that step. `run()` reports documents
+    removed and the data/index size of each collection before and after.
+    Runs hold a lease in `retention_leases`, so only one worker or process
+    applies the policy at a time; `run()` raises RetentionRunInProgress
+    while another run holds it.
+    """
+
+    def __init__(
+        self,
+        status_ttl_days: float = 0,
+        status_rollup_hours: float = 0,
+        contact_archive_days: float = 0,
+        contact_archive_path: Optional[str] = None,
+        interval: float = 0,
+        batch_size: int = 1000,
+        lease: float = 600.0,
+    ):
+        self.status_ttl_days = status_ttl_days
+        self.status_rollup_hours = status_rollup_hours
+        self.contact_archive_days = contact_archive_days
+        self.contact_archive_path = contact_archive_path
+        self.interval = interval
+        self.batch_size = batch_size
+        self.lease = lease
+        self.last_report: Optional[dict] = None
+        self.on_contacts_archived: List[Callable[[], None]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def from_env(cls) -> "RetentionPolicy":
+        return cls(
+            status_ttl_days=float(os.environ.get("STATUS_CHECK_TTL_DAYS", 0)),
+            status_rollup_hours=float(os.environ.get("STATUS_CHECK_ROLLUP_AFTER_HOURS", 0)),
+            contact_archive_days=float(os.environ.get("CONTACT_ARCHIVE_AFTER_DAYS", 0)),
+            contact_archive_path=os.environ.get("CONTACT_ARCHIVE_PATH") or None,
+            interval=float(os.environ.get("RETENTION_INTERVAL", 0)),
+        )
+
+    async def ensure_ttl_index(self):
+        """Create, retune or drop the status_checks TTL index to match the policy"""
+        # pymongo is imported on first use, see database.connect
+        from pymongo import ASCENDING
+        collection = get_database().status_checks
+        indexes = await collection.index_information()
+        existing = indexes.get(STATUS_TTL_INDEX)
+
+        if not self.status_ttl_days:
+            if existing:
+                await collection.drop_index(STATUS_TTL_INDEX)
+            return
+
+        expire_after = int(self.status_ttl_days * 86400)
+        if existing is None:
+            await collection.create_index(
+                [("timestamp", ASCENDING)], name=STATUS_TTL_INDEX, expireAfterSeconds=expire_after
+            )
+        elif existing.get("expireAfterSeconds") != expire_after:
+            await get_database().command({
+                "collMod": "status_checks",
+                "index": {"name": STATUS_TTL_INDEX, "expireAfterSeconds": expire_after},
+            })
+
+    async def collection_sizes(self, name: str) -> dict:
+        from pymongo.errors import OperationFailure
+        try:
+            stats = await get_database().command({"collStats": name})
+        except OperationFailure:
+            return {"count": 0, "size": 0, "storage_size": 0, "index_size": 0}
+        return {
+            "count": stats.get("count", 0),
+            "size": stats.get("size", 0),
+            "storage_size": stats.get("storageSize", 0),
+            "index_size": stats.get("totalIndexSize", 0),
+        }
+
+    async def rollup_status_checks(self, now: datetime) -> dict:
+        """
+        Fold raw status checks before the cutoff into hourly per-client counts.
+        The cutoff is on the hour, so every bucket is rolled up whole in one run
+        (see rollup_update).
+        """
+        from pymongo import UpdateOne
+        db = get_database()
+        cutoff = (now - timedelta(hours=self.status_rollup_hours)).replace(minute=0, second=0, microsecond=0)
+        match = {"timestamp": {"$lt": cutoff}}
+
+        pipeline = [
+            {"$match": match},
+            {"$group": {
+                "_id": {
+                    "client_name": "$client_name",
+                    "hour": {"$dateFromParts": {
+                        "year": {"$year": "$timestamp"},
+                        "month": {"$month": "$timestamp"},
+                        "day": {"$dayOfMonth": "$timestamp"},
+                        "hour": {"$hour": "$timestamp"},
+                    }},
+                },
+                "count": {"$sum": 1},
+                "first_seen": {"$min": "$timestamp"},
+                "last_seen": {"$max": "$timestamp"},
+            }},
+        ]
+        buckets, requests = 0, []
+        async for bucket in db.status_checks.aggregate(pipeline):
+            requests.append(UpdateOne(
+                {"client_name": bucket["_id"]["client_name"], "hour": bucket["_id"]["hour"]},
+                rollup_update(bucket),
+                upsert=True,
+            ))
+            if len(requests) >= self.batch_size:
+                await db.status_check_rollups.bulk_write(requests, ordered=False)
+                buckets += len(requests)
+                requests = []
+        if requests:
+            await db.status_check_rollups.bulk_write(requests, ordered=False)
+            buckets += len(requests)
+
+        # Timestamps are set at insert time, nothing new can land before the cutoff
+        result = await db.status_checks.delete_many(match)
+        return {"cutoff": cutoff, "compacted": result.deleted_count, "buckets": buckets}
+
+    async def archive_contacts(self, now: datetime) -> dict:
+        """Move read contacts older than the cutoff out of the hot collection"""
+        from pymongo import ASCENDING
+        from pymongo.errors import BulkWriteError
+        db = get_database()
+        cutoff = now - timedelta(days=self.contact_archive_days)
+        query = {"read": True, "created_at": {"$lt": cutoff}}
+        archived = 0
+
+        while True:
+            batch = await db.contacts.find(query).sort("created_at", ASCENDING).limit(self.batch_size).to_list(self.batch_size)
+            if not batch:
+                break
+
+            if self.contact_archive_path:
+                await asyncio.to_thread(self._append_to_file, batch)
+            else:
+                try:
+                    await db.contacts_archive.insert_many(batch, ordered=False)
+                except BulkWriteError as e:
+                    # Left over from an interrupted run, already archived
+                    if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                        raise
+
+            result = await db.contacts.delete_many({"_id": {"$in": [doc["_id"] for doc in batch]}})
+            archived += result.deleted_count
+
+        if archived:
+            for callback in self.on_contacts_archived:
+                callback()
+        return {"cutoff": cutoff, "archived": archived, "target": self.contact_archive_path or "contacts_archive"}
+
+    def _append_to_file(self, documents: List[dict]):
+        from bson import json_util
+        # Each run appends a new gzip member, concatenated members are one valid stream
+        with gzip.open(self.contact_archive_path, "at") as archive:
+            for document in documents:
+                archive.write(json_util.dumps(document) + "\n")
+
+    async def _acquire_lease(self) -> Optional[str]:
+        """A token for the retention lease, None while another run holds it"""
+        from pymongo.errors import DuplicateKeyError
+        token = uuid.uuid4().hex
+        now = datetime.utcnow()
+        try:
+            # Matches a free or expired lease; otherwise the upsert collides on _id
+            await get_database().retention_leases.update_one(
+                {"_id": RETENTION_LEASE_ID, "locked_until": {"$lt": now}},
+                {"$set": {"token": token, "locked_until": now + timedelta(seconds=self.lease)}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            return None
+        return token
+
+    async def _release_lease(self, token: str):
+        try:
+            await get_database().retention_leases.delete_one({"_id": RETENTION_LEASE_ID, "token": token})
+        except Exception as e:
+            logger.error(f"Error releasing retention lease: {str(e)}")
+
+    async def run(self) -> dict:
+        """Apply the whole policy once and report what it reclaimed"""
+        if self._lock.locked():
+            raise RetentionRunInProgress()
+        async with self._lock:
+            token = await self._acquire_lease()
+            if token is None:
+                raise RetentionRunInProgress()
+            try:
+                return await self._run()
+            finally:
+                await self._release_lease(token)
+
+    async def _run(self) -> dict:
+        now = datetime.utcnow()
+        collections = ["status_checks", "contacts"]
+        before = {name: await self.collection_sizes(name) for name in collections}
+
+        report = {"started_at": now}
+        await self.ensure_ttl_index()
+        if self.status_rollup_hours:
+            report["status_rollup"] = await self.rollup_status_checks(now)
+            response_cache.invalidate("status_checks")
+        if self.contact_archive_days:
+            report["contact_archive"] = await self.archive_contacts(now)
+            response_cache.invalidate("contacts")
+
+        after = {name: await self.collection_sizes(name) for name in collections}
+        report["collections"] = {
+            name: {
+                "before": before[name],
+                "after": after[name],
+                "reclaimed_bytes": before[name]["size"] - after[name]["size"],
+                "index_size_change": after[name]["index_size"] - before[name]["index_size"],
+            }
+            for name in collections
+        }
+        report["finished_at"] = datetime.utcnow()
+        self.last_report = report
+        logger.info(
+            "Retention run: " + ", ".join(
+                f"{name} reclaimed {stats['reclaimed_bytes']} bytes"
+                for name, stats in report["collections"].items()
+            )
+        )
+        return report
+
+    async def _run_forever(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run()
+            except RetentionRunInProgress:
+                logger.info("Retention run skipped, another worker is running it")
+            except Exception as e:
+                logger.error(f"Retention run failed: {str(e)}")
+
+    async def start(self):
+        try:
+            await self.ensure_ttl_index()
+        except Exception as e:
+            logger.error(f"Error applying status check TTL index: {str(e)}")
+        if self.interval > 0:
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+retention_policy = RetentionPolicy.from_env()
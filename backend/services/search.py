@@ -0,0 +1,178 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+import asyncio
+import heapq
+import logging
+import math
+import os
+import re
+
+from database import CONTACT_TEXT_WEIGHTS
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r"\w+")
+
+# (score, created_at, id), compared as a tuple it is the search order
+SearchHit = Tuple[float, datetime, str]
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens, emails split at '@' and '.' like a Mongo text index"""
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+
+def bson_datetime(value: datetime) -> datetime:
+    """Truncate to the millisecond precision a datetime has once stored in Mongo"""
+    return value.replace(microsecond=value.microsecond // 1000 * 1000)
+
+
+class ContactSearchIndex:
+    """
+    In-process inverted index over contact name/email/message, for
+    deployments without a Mongo text index (an in-memory stand-in).
+
+    Postings map each token to {contact id: field-weighted term count}, so a
+    query only touches the postings of its own terms and rare-term queries
+    cost the same however large the collection gets. Scores are a weighted
+    tf-idf sum over the query terms, any term may match (like Mongo $text).
+    Inserts and deletes by id are applied incrementally. Changes that can't
+    be (filtered deletes, retention archiving) trigger a background rebuild.
+
+    The index is per process: with several workers, each one only sees its
+    own inserts and deletes right away. Other workers' changes show up at
+    the next rebuild, which runs every `refresh_interval` seconds (0 turns
+    the periodic rebuild off, for a single worker).
+    """
+
+    def __init__(self, repository, batch_size: int = 1000, refresh_interval: float = 0.0):
+        self.repository = repository
+        self.batch_size = batch_size
+        self.refresh_interval = refresh_interval
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._terms: Dict[str, Tuple[str, ...]] = {}
+        self._created_at: Dict[str, datetime] = {}
+        self._pending: Optional[List[Tuple[str, object]]] = None
+        self._stale = False
+        self._rebuild_task: Optional[asyncio.Task] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls, repository) -> Optional["ContactSearchIndex"]:
+        """
+        The in-process index when CONTACT_SEARCH_BACKEND=memory, else None
+        (the storage's own search: Mongo $text or SQLite FTS5). Rebuilt every
+        CONTACT_SEARCH_REFRESH_INTERVAL seconds to pick up other workers'
+        changes.
+        """
+        if os.environ.get("CONTACT_SEARCH_BACKEND", "storage").lower() != "memory":
+            return None
+        return cls(repository, refresh_interval=float(os.environ.get("CONTACT_SEARCH_REFRESH_INTERVAL", 60)))
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def add(self, document: dict):
+        contact_id = document["id"]
+        if self._pending is not None:
+            self._pending.append(("add", document))
+        if contact_id in self._terms:
+            self._unindex(contact_id)
+
+        counts: Dict[str, int] = {}
+        for field, weight in CONTACT_TEXT_WEIGHTS.items():
+            for token in tokenize(document.get(field)):
+                counts[token] = counts.get(token, 0) + weight
+        for token, count in counts.items():
+            self._postings.setdefault(token, {})[contact_id] = count
+        self._terms[contact_id] = tuple(counts)
+        self._created_at[contact_id] = bson_datetime(document["created_at"])
+
+    def remove(self, contact_ids: Iterable[str]):
+        contact_ids = list(contact_ids)
+        if self._pending is not None:
+            self._pending.append(("remove", contact_ids))
+        for contact_id in contact_ids:
+            if contact_id in self._terms:
+                self._unindex(contact_id)
+
+    def _unindex(self, contact_id: str):
+        for token in self._terms.pop(contact_id):
+            postings = self._postings[token]
+            del postings[contact_id]
+            if not postings:
+                del self._postings[token]
+        del self._created_at[contact_id]
+
+    def search(self, query: str, limit: int, after: Optional[dict] = None) -> List[SearchHit]:
+        """Best `limit` hits for `query`, strictly after the `after` cursor values"""
+        total = len(self._terms)
+        scores: Dict[str, float] = {}
+        for token in set(tokenize(query)):
+            postings = self._postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + total / len(postings))
+            for contact_id, count in postings.items():
+                scores[contact_id] = scores.get(contact_id, 0.0) + count * idf
+
+        hits = ((score, self._created_at[contact_id], contact_id) for contact_id, score in scores.items())
+        if after:
+            bound = (after["score"], after["created_at"], after["id"])
+            hits = (hit for hit in hits if hit < bound)
+        return heapq.nlargest(limit, hits)
+
+    async def rebuild(self):
+        """Re-read the whole collection, applying changes made meanwhile on top"""
+        fresh = ContactSearchIndex(self.repository, self.batch_size)
+        self._pending = []
+        try:
+            projection = {"_id": 0, "id": 1, "created_at": 1, **{field: 1 for field in CONTACT_TEXT_WEIGHTS}}
+            async for document in self.repository.iterate(projection, self.batch_size):
+                fresh.add(document)
+            for operation, argument in self._pending:
+                if operation == "add":
+                    fresh.add(argument)
+                else:
+                    fresh.remove(argument)
+        finally:
+            self._pending = None
+        self._postings, self._terms, self._created_at = fresh._postings, fresh._terms, fresh._created_at
+        logger.info(f"Contact search index built ({len(self)} messages, {len(self._postings)} terms)")
+
+    def invalidate(self):
+        """Schedule a rebuild, or another one after the rebuild in progress"""
+        self._stale = True
+        if self._rebuild_task is None or self._rebuild_task.done():
+            self._rebuild_task = asyncio.create_task(self._rebuild_while_stale())
+
+    async def _rebuild_while_stale(self):
+        while self._stale:
+            self._stale = False
+            try:
+                await self.rebuild()
+            except Exception as e:
+                logger.error(f"Error rebuilding contact search index: {str(e)}")
+                return
+
+    async def _refresh_forever(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            self.invalidate()
+
+    async def start(self):
+        self._stale = True
+        await self._rebuild_while_stale()
+        if self.refresh_interval > 0:
+            self._refresh_task = asyncio.create_task(self._refresh_forever())
+
+    async def stop(self):
+        for task in (self._refresh_task, self._rebuild_task):
+            if task is None:
+                continue
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._refresh_task = self._rebuild_task = None
@@ -0,0 +1,237 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+import hashlib
+import logging
+import math
+import os
+import re
+import time
+
+from services.rate_limit import RouteLimit, SlidingWindowCounterStore
+
+logger = logging.getLogger(__name__)
+
+MASK64 = (1 << 64) - 1
+# Shorter messages have too few words for a meaningful SimHash
+MIN_WORDS = 8
+
+WORD_RE = re.compile(r"\w+")
+LINK_RE = re.compile(r"https?://|www\.", re.IGNORECASE)
+
+# Rejection reasons, also used as the metric label
+HONEYPOT = "honeypot"
+TOO_MANY_LINKS = "links"
+EMAIL_THROTTLED = "email_throttled"
+DUPLICATE = "duplicate"
+NEAR_DUPLICATE = "near_duplicate"
+
+
+def simhash(tokens: List[str]) -> int:
+    """
+    64-bit SimHash over the words of a message.
+    Per-bit counts are kept bit-sliced: planes[i] holds bit i of all 64
+    counters, so adding a word is a short ripple-carry over a few ints
+    instead of 64 separate additions, and the final vote is a handful of
+    bitwise operations instead of 64 comparisons.
+    """
+    planes: List[int] = []
+    for token in tokens:
+        # str hashes are randomized per process, fine for an in-memory index
+        carry = hash(token) & MASK64
+        for i, plane in enumerate(planes):
+            planes[i] = plane ^ carry
+            carry &= plane
+            if not carry:
+                break
+        if carry:
+            planes.append(carry)
+
+    # Majority vote for all 64 bits at once: a bit-serial "count > threshold"
+    # comparison from the most significant plane down
+    threshold = len(tokens) // 2
+    greater, equal = 0, MASK64
+    for i in range(len(planes) - 1, -1, -1):
+        if (threshold >> i) & 1:
+            equal &= planes[i]
+        else:
+            greater |= equal & planes[i]
+            equal &= ~planes[i]
+    if threshold >> len(planes):
+        return 0
+    return greater
+
+
+@dataclass
+class Fingerprint:
+    digest: bytes
+    simhash: Optional[int]
+
+
+@dataclass
+class SpamVerdict:
+    reason: Optional[str]
+    fingerprint: Optional[Fingerprint] = None
+    # For (near) duplicates: the id the earlier message was stored under
+    original_id: Optional[str] = None
+
+    @property
+    def accepted(self) -> bool:
+        return self.reason is None
+
+
+class SpamFilter:
+    """
+    Pre-insert filter for contact submissions, cheapest checks first:
+
+    - honeypot: a hidden form field real visitors never fill in
+    - more than `max_links` links in the message
+    - more than `email_limit` submissions from one email address
+    - the same message (after normalizing case and whitespace) seen within
+      `window` seconds, or a near-duplicate whose SimHash is within
+      `max_distance` bits (a changed word or two in a paragraph moves it
+      by a few bits, unrelated messages are 20+ bits apart)
+
+    Near-duplicate lookup splits the SimHash into `max_distance + 1` bands:
+    two hashes within `max_distance` bits agree exactly on at least one band,
+    so only hashes sharing a band value are compared.
+
+    Fingerprints of accepted messages are kept in insertion order, with the
+    id the message was stored under, and never more than `max_entries` of
+    them, so memory stays bounded. Everything is in-process: with several
+    workers each one filters what it sees.
+    """
+
+    def __init__(
+        self,
+        window: float = 3600,
+        max_entries: int = 20_000,
+        max_distance: int = 7,
+        max_links: int = 3,
+        email_limit: Optional[RouteLimit] = RouteLimit(limit=3, window=3600),
+    ):
+        if not 0 <= max_distance < 16:
+            raise ValueError("max_distance must be between 0 and 15")
+        self.window = window
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.max_links = max_links
+        self.email_store = (
+            SlidingWindowCounterStore(email_limit.limit, email_limit.window, max_entries)
+            if email_limit else None
+        )
+        self._digests: "OrderedDict[bytes, float]" = OrderedDict()
+        self._simhashes: "OrderedDict[int, float]" = OrderedDict()
+        self._digest_ids: Dict[bytes, Optional[str]] = {}
+        self._simhash_ids: Dict[int, Optional[str]] = {}
+        self._band_bits = 64 // (max_distance + 1)
+        self._band_mask = (1 << self._band_bits) - 1
+        self._bands: List[Dict[int, Set[int]]] = [{} for _ in range(max_distance + 1)]
+
+    @classmethod
+    def from_env(cls) -> Optional["SpamFilter"]:
+        """Build the filter from SPAM_FILTER_* env vars, None when disabled"""
+        if os.environ.get("SPAM_FILTER_ENABLED", "false").lower() not in ("1", "true", "yes"):
+            return None
+        email_limit = os.environ.get("SPAM_FILTER_EMAIL_LIMIT", "3/3600")
+        return cls(
+            window=float(os.environ.get("SPAM_FILTER_WINDOW", 3600)),
+            max_entries=int(os.environ.get("SPAM_FILTER_MAX_ENTRIES", 20_000)),
+            max_distance=int(os.environ.get("SPAM_FILTER_MAX_DISTANCE", 7)),
+            max_links=int(os.environ.get("SPAM_FILTER_MAX_LINKS", 3)),
+            email_limit=RouteLimit.parse(email_limit) if email_limit != "0" else None,
+        )
+
+    def __len__(self) -> int:
+        return len(self._digests)
+
+    def check(self, email: str, message: str, honeypot: Optional[str] = None, now: Optional[float] = None) -> SpamVerdict:
+        """Screen a submission, call `record()` once it has been stored"""
+        now = time.time() if now is None else now
+        if honeypot:
+            return SpamVerdict(HONEYPOT)
+        if len(LINK_RE.findall(message)) > self.max_links:
+            return SpamVerdict(TOO_MANY_LINKS)
+        if self.email_store is not None and not self.email_store.hit(email.lower(), now):
+            return SpamVerdict(EMAIL_THROTTLED)
+
+        tokens = WORD_RE.findall(message.lower())
+        fingerprint = Fingerprint(
+            digest=hashlib.blake2b(" ".join(tokens).encode(), digest_size=16).digest(),
+            simhash=simhash(tokens) if len(tokens) >= MIN_WORDS else None,
+        )
+        self._expire(now)
+
+        if fingerprint.digest in self._digests:
+            # Keep repeated messages in the window while they keep coming
+            self._digests[fingerprint.digest] = now
+            self._digests.move_to_end(fingerprint.digest)
+            return SpamVerdict(DUPLICATE, fingerprint, self._digest_ids.get(fingerprint.digest))
+        if fingerprint.simhash is not None:
+            near = self._find_near(fingerprint.simhash)
+            if near is not None:
+                return SpamVerdict(NEAR_DUPLICATE, fingerprint, self._simhash_ids.get(near))
+        return SpamVerdict(None, fingerprint)
+
+    def retry_after(self, email: str, now: Optional[float] = None) -> int:
+        """Whole seconds until `email` is let through the throttle again, for a Retry-After header"""
+        seconds = self.email_store.retry_after(email.lower(), now) if self.email_store is not None else 0.0
+        return max(1, math.ceil(seconds))
+
+    def record(self, fingerprint: Fingerprint, contact_id: Optional[str] = None, now: Optional[float] = None):
+        """Remember an accepted message, stored under `contact_id`"""
+        now = time.time() if now is None else now
+        self._digests[fingerprint.digest] = now
+        self._digests.move_to_end(fingerprint.digest)
+        self._digest_ids[fingerprint.digest] = contact_id
+        if len(self._digests) > self.max_entries:
+            del self._digest_ids[self._digests.popitem(last=False)[0]]
+
+        if fingerprint.simhash is not None:
+            if fingerprint.simhash not in self._simhashes:
+                self._index(fingerprint.simhash)
+            self._simhashes[fingerprint.simhash] = now
+            self._simhashes.move_to_end(fingerprint.simhash)
+            self._simhash_ids[fingerprint.simhash] = contact_id
+            if len(self._simhashes) > self.max_entries:
+                self._forget(self._simhashes.popitem(last=False)[0])
+
+    def _find_near(self, value: int) -> Optional[int]:
+        for band, index in enumerate(self._bands):
+            for candidate in index.get((value >> (band * self._band_bits)) & self._band_mask, ()):
+                if (candidate ^ value).bit_count() <= self.max_distance:
+                    return candidate
+        return None
+
+    def _index(self, value: int):
+        for band, index in enumerate(self._bands):
+            index.setdefault((value >> (band * self._band_bits)) & self._band_mask, set()).add(value)
+
+    def _forget(self, value: int):
+        self._simhash_ids.pop(value, None)
+        for band, index in enumerate(self._bands):
+            key = (value >> (band * self._band_bits)) & self._band_mask
+            members = index.get(key)
+            if members is not None:
+                members.discard(value)
+                if not members:
+                    del index[key]
+
+    def _expire(self, now: float):
+        """Drop fingerprints older than the window, oldest first"""
+        cutoff = now - self.window
+        while self._digests:
+            digest, seen = next(iter(self._digests.items()))
+            if seen >= cutoff:
+                break
+            del self._digests[digest]
+            self._digest_ids.pop(digest, None)
+        while self._simhashes:
+            value, seen = next(iter(self._simhashes.items()))
+            if seen >= cutoff:
+                break
+            del self._simhashes[value]
+            self._forget(value)
+
+
+spam_filter = SpamFilter.from_env()
@@ -0,0 +1,394 @@
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+import logging
+import os
+
+from database import get_database
+from services.pagination import keyset_filter
+
+logger = logging.getLogger(__name__)
+
+# Admin listing order, backed by the created_at_id / read_created_at_id indexes
+CONTACTS_SORT = [("created_at", -1), ("id", -1)]
+# Search order: most relevant first, then the listing order
+SEARCH_SORT = [("score", -1)] + CONTACTS_SORT
+# Newest first, backed by the timestamp_id / client_name_timestamp_id indexes
+STATUS_SORT = [("timestamp", -1), ("id", -1)]
+
+
+class ContactRepository:
+    """
+    Storage of contact messages. Listings are always in CONTACTS_SORT order,
+    `after` holds the sort key values of the last row of the previous page
+    and `projection` is a Mongo-style {field: 1} projection.
+    """
+
+    async def insert(self, document: dict):
+        raise NotImplementedError
+
+    async def insert_many(self, documents: List[dict], ordered: bool = False) -> int:
+        """Insert a batch, returns how many were written"""
+        raise NotImplementedError
+
+    async def find_page(
+        self,
+        projection: dict,
+        limit: int,
+        unread_only: bool = False,
+        after: Optional[Dict[str, Any]] = None,
+        skip: int = 0,
+    ) -> List[dict]:
+        raise NotImplementedError
+
+    def iterate(
+        self,
+        projection: dict,
+        batch_size: int,
+        unread_only: bool = False,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> AsyncIterator[dict]:
+        """Every matching contact in listing order, read `batch_size` at a time"""
+        raise NotImplementedError
+
+    async def find_by_ids(self, ids: List[str], projection: dict) -> List[dict]:
+        raise NotImplementedError
+
+    async def search(self, q: str, limit: int, after: Optional[Dict[str, Any]], projection: dict) -> List[dict]:
+        """Full-text search in SEARCH_SORT order, each row with its `score`"""
+        raise NotImplementedError
+
+    async def set_read(self, contact_id: str, read: bool = True) -> tuple:
+        """Returns (matched, modified)"""
+        raise NotImplementedError
+
+    async def set_read_many(
+        self,
+        read: bool,
+        ids: Optional[List[str]] = None,
+        before: Optional[datetime] = None,
+        unread_only: bool = False,
+    ) -> tuple:
+        """Returns (matched, modified)"""
+        raise NotImplementedError
+
+    async def delete_many(
+        self,
+        ids: Optional[List[str]] = None,
+        before: Optional[datetime] = None,
+        unread_only: bool = False,
+    ) -> int:
+        raise NotImplementedError
+
+    async def count(self, unread_only: bool = False) -> int:
+        raise NotImplementedError
+
+    async def ingest_watermark(self, settle: float) -> Any:
+        """
+        A position in the order contacts were stored in: every contact stored
+        more than `settle` seconds ago is at or before it, and every contact
+        stored later will be after it. For `traffic(after=..., through=...)`.
+        """
+        raise NotImplementedError
+
+    async def traffic(
+        self,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        after: Any = None,
+        through: Any = None,
+    ) -> dict:
+        """
+        Contacts created in [since, until) and stored after the `after` and up
+        to the `through` ingest watermark, counted per UTC hour ("hours":
+        {"2024-05-01T13": n}) and per UTC day and sender domain / user agent
+        ("domains" / "user_agents": {("2024-05-01", value): n})
+        """
+        raise NotImplementedError
+
+    def watch(self, pipeline: List[dict]):
+        raise NotImplementedError("Change streams need STORAGE_BACKEND=mongo")
+
+
+class StatusCheckRepository:
+    """Storage of status checks, listed in STATUS_SORT order"""
+
+    async def insert(self, document: dict):
+        raise NotImplementedError
+
+    async def insert_many(self, documents: List[dict], ordered: bool = False) -> int:
+        raise NotImplementedError
+
+    async def find_page(
+        self,
+        projection: dict,
+        limit: int,
+        client_name: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        after: Optional[Dict[str, Any]] = None,
+    ) -> List[dict]:
+        raise NotImplementedError
+
+    def iterate(
+        self,
+        projection: dict,
+        batch_size: int,
+        client_name: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> AsyncIterator[dict]:
+        raise NotImplementedError
+
+
+def build_contact_query(
+    unread_only: bool = False,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    ids: Optional[List[str]] = None,
+) -> dict:
+    """Mongo filter for admin contact queries"""
+    query = {}
+    if unread_only:
+        query["read"] = False
+    if since or until:
+        query["created_at"] = {}
+        if since:
+            query["created_at"]["$gte"] = since
+        if until:
+            query["created_at"]["$lt"] = until
+    if ids:
+        query["id"] = {"$in": ids}
+    return query
+
+
+def build_status_query(
+    client_name: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+) -> dict:
+    """Mongo filter for status check queries"""
+    query = {}
+    if client_name:
+        query["client_name"] = client_name
+    if since or until:
+        query["timestamp"] = {}
+        if since:
+            query["timestamp"]["$gte"] = since
+        if until:
+            query["timestamp"]["$lt"] = until
+    return query
+
+
+class MongoContactRepository(ContactRepository):
+    """Contacts in the `contacts` collection, through Motor"""
+
+    def __init__(self, get_collection: Callable):
+        self.get_collection = get_collection
+
+    async def insert(self, document: dict):
+        document["ingested_at"] = datetime.utcnow()
+        await self.get_collection().insert_one(document)
+
+    async def insert_many(self, documents: List[dict], ordered: bool = False) -> int:
+        # Stamped when written, not when created: write-behind may hold a contact for a while
+        ingested_at = datetime.utcnow()
+        for document in documents:
+            document["ingested_at"] = ingested_at
+        result = await self.get_collection().insert_many(documents, ordered=ordered)
+        return len(result.inserted_ids)
+
+    async def find_page(self, projection, limit, unread_only=False, after=None, skip=0):
+        query = build_contact_query(unread_only)
+        if after:
+            query.update(keyset_filter(CONTACTS_SORT, after))
+            skip = 0
+        cursor = self.get_collection().find(query, projection).sort(CONTACTS_SORT).skip(skip).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    def iterate(self, projection, batch_size, unread_only=False, since=None, until=None):
+        return (
+            self.get_collection().find(build_contact_query(unread_only, since, until), projection)
+            .sort(CONTACTS_SORT)
+            .batch_size(batch_size)
+        )
+
+    async def find_by_ids(self, ids, projection):
+        return await self.get_collection().find({"id": {"$in": ids}}, projection).to_list(length=len(ids))
+
+    async def search(self, q, limit, after, projection):
+        pipeline = [
+            {"$match": {"$text": {"$search": q}}},
+            {"$addFields": {"score": {"$meta": "textScore"}}},
+        ]
+        if after:
+            pipeline.append({"$match": keyset_filter(SEARCH_SORT, after)})
+        pipeline += [
+            {"$sort": dict(SEARCH_SORT)},
+            {"$limit": limit},
+            {"$project": {**projection, "score": 1}},
+        ]
+        return await self.get_collection().aggregate(pipeline).to_list(length=limit)
+
+    async def set_read(self, contact_id, read=True):
+        result = await self.get_collection().update_one({"id": contact_id}, {"$set": {"read": read}})
+        return result.matched_count, result.modified_count
+
+    async def set_read_many(self, read, ids=None, before=None, unread_only=False):
+        result = await self.get_collection().update_many(
+            build_contact_query(unread_only, until=before, ids=ids),
+            {"$set": {"read": read}}
+        )
+        return result.matched_count, result.modified_count
+
+    async def delete_many(self, ids=None, before=None, unread_only=False):
+        result = await self.get_collection().delete_many(build_contact_query(unread_only, until=before, ids=ids))
+        return result.deleted_count
+
+    async def count(self, unread_only=False):
+        return await self.get_collection().count_documents(build_contact_query(unread_only))
+
+    async def ingest_watermark(self, settle):
+        # ingested_at comes from the clocks of the writing workers: `settle` covers
+        # their skew and inserts still in flight
+        watermark = datetime.utcnow() - timedelta(seconds=settle, milliseconds=1)
+        # Stored to the millisecond: a stamp taken from now on still sorts after it
+        return watermark.replace(microsecond=watermark.microsecond // 1000 * 1000)
+
+    async def traffic(self, since=None, until=None, after=None, through=None):
+        day = {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}}
+        query = build_contact_query(since=since, until=until)
+        if after is not None:
+            query["ingested_at"] = {"$gt": after}
+            if through is not None:
+                query["ingested_at"]["$lte"] = through
+        elif through is not None:
+            # Also matches contacts stored before ingested_at was
+            query["ingested_at"] = {"$not": {"$gt": through}}
+        pipeline = [
+            {"$match": query},
+            # Only fields of the analytics indexes, so the scan is covered
+            {"$project": {"_id": 0, "created_at": 1, "email": 1, "user_agent": 1}},
+            {"$facet": {
+                "hours": [
+                    {"$group": {
+                        "_id": {"$dateToString": {"format": "%Y-%m-%dT%H", "date": "$created_at"}},
+                        "count": {"$sum": 1},
+                    }},
+                ],
+                "domains": [
+                    {"$group": {
+                        "_id": {"day": day, "value": {"$toLower": {"$arrayElemAt": [{"$split": ["$email", "@"]}, 1]}}},
+                        "count": {"$sum": 1},
+                    }},
+                ],
+                "user_agents": [
+                    {"$group": {
+                        "_id": {"day": day, "value": {"$ifNull": ["$user_agent", ""]}},
+                        "count": {"$sum": 1},
+                    }},
+                ],
+            }},
+        ]
+        result = (await self.get_collection().aggregate(pipeline).to_list(length=1))[0]
+        traffic = {"hours": {row["_id"]: row["count"] for row in result["hours"]}}
+        for facet in ("domains", "user_agents"):
+            traffic[facet] = {(row["_id"]["day"], row["_id"]["value"]): row["count"] for row in result[facet]}
+        return traffic
+
+    def watch(self, pipeline):
+        return self.get_collection().watch(pipeline)
+
+
+class MongoStatusCheckRepository(StatusCheckRepository):
+    """Status checks in the `status_checks` collection, through Motor"""
+
+    def __init__(self, get_collection: Callable):
+        self.get_collection = get_collection
+
+    async def insert(self, document: dict):
+        await self.get_collection().insert_one(document)
+
+    async def insert_many(self, documents: List[dict], ordered: bool = False) -> int:
+        # ordered=False: a BulkWriteError still means everything else was written
+        result = await self.get_collection().insert_many(documents, ordered=ordered)
+        return len(result.inserted_ids)
+
+    async def find_page(self, projection, limit, client_name=None, since=None, until=None, after=None):
+        query = build_status_query(client_name, since, until)
+        if after:
+            query.update(keyset_filter(STATUS_SORT, after))
+        cursor = self.get_collection().find(query, projection).sort(STATUS_SORT).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    def iterate(self, projection, batch_size, client_name=None, since=None, until=None):
+        return (
+            self.get_collection().find(build_status_query(client_name, since, until), projection)
+            .sort(STATUS_SORT)
+            .batch_size(batch_size)
+        )
+
+
+class Storage:
+    """
+    Where contacts and status checks are kept, picked with STORAGE_BACKEND:
+    `mongo` (default) or `sqlite`, an embedded database file for tests and
+    small single-box deployments (see services.storage_sqlite). Retention,
+    the notification outbox, Mongo-backed idempotency keys and the Mongo
+    rate limit table only exist in Mongo, so they can't be combined with
+    sqlite (see check_mongo_settings).
+    """
+
+    def __init__(
+        self,
+        backend: str,
+        contacts: ContactRepository,
+        status_checks: StatusCheckRepository,
+        engine=None,
+    ):
+        self.backend = backend
+        self.contacts = contacts
+        self.status_checks = status_checks
+        self.engine = engine
+
+    @classmethod
+    def from_env(cls) -> "Storage":
+        backend = os.environ.get("STORAGE_BACKEND", "mongo").lower()
+        if backend == "mongo":
+            return cls(
+                backend,
+                MongoContactRepository(lambda: get_database().contacts),
+                MongoStatusCheckRepository(lambda: get_database().status_checks),
+            )
+        if backend == "sqlite":
+            from services.storage_sqlite import SqliteEngine, SqliteContactRepository, SqliteStatusCheckRepository
+            engine = SqliteEngine.from_env()
+            return cls(backend, SqliteContactRepository(engine), SqliteStatusCheckRepository(engine), engine)
+        raise ValueError(f"Unknown STORAGE_BACKEND {backend!r}, expected mongo or sqlite")
+
+    @property
+    def uses_mongo(self) -> bool:
+        return self.backend == "mongo"
+
+    def check_mongo_settings(self, settings: Dict[str, bool]):
+        """
+        Refuse to start when a setting in `settings` ({name: enabled}) that
+        keeps its data in Mongo is enabled without Mongo storage
+        """
+        enabled = [name for name, on in settings.items() if on]
+        if enabled and not self.uses_mongo:
+            raise ValueError(
+                f"{', '.join(enabled)} need{'s' if len(enabled) == 1 else ''} MongoDB "
+                f"and can't be used with STORAGE_BACKEND={self.backend}"
+            )
+
+    async def start(self):
+        if self.engine is not None:
+            await self.engine.start()
+
+    async def close(self):
+        if self.engine is not None:
+            await self.engine.close()
+
+
+storage = Storage.from_env()
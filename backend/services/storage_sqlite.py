@@ -0,0 +1,509 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+from database import CONTACT_TEXT_WEIGHTS
+from services.search import tokenize
+from services.storage import ContactRepository, StatusCheckRepository
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS contacts (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    message TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    read INTEGER NOT NULL DEFAULT 0,
+    ip_address TEXT,
+    user_agent TEXT
+);
+CREATE INDEX IF NOT EXISTS contacts_created_at_id ON contacts (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS contacts_read_created_at_id ON contacts (read, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS contacts_created_at_email_user_agent ON contacts (created_at, email, user_agent);
+
+-- Full-text index over the contacts rows (external content), kept in sync
+-- by the triggers. Keyed by contacts.rowid: after a manual VACUUM run
+-- INSERT INTO contacts_fts (contacts_fts) VALUES ('rebuild')
+CREATE VIRTUAL TABLE IF NOT EXISTS contacts_fts USING fts5(
+    name, email, message, content='contacts', content_rowid='rowid', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS contacts_fts_insert AFTER INSERT ON contacts BEGIN
+    INSERT INTO contacts_fts (rowid, name, email, message) VALUES (new.rowid, new.name, new.email, new.message);
+END;
+CREATE TRIGGER IF NOT EXISTS contacts_fts_delete AFTER DELETE ON contacts BEGIN
+    INSERT INTO contacts_fts (contacts_fts, rowid, name, email, message)
+    VALUES ('delete', old.rowid, old.name, old.email, old.message);
+END;
+CREATE TRIGGER IF NOT EXISTS contacts_fts_update AFTER UPDATE OF name, email, message ON contacts BEGIN
+    INSERT INTO contacts_fts (contacts_fts, rowid, name, email, message)
+    VALUES ('delete', old.rowid, old.name, old.email, old.message);
+    INSERT INTO contacts_fts (rowid, name, email, message) VALUES (new.rowid, new.name, new.email, new.message);
+END;
+
+CREATE TABLE IF NOT EXISTS status_checks (
+    id TEXT PRIMARY KEY,
+    client_name TEXT NOT NULL,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS status_checks_timestamp_id ON status_checks (timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS status_checks_client_name_timestamp_id
+    ON status_checks (client_name, timestamp DESC, id DESC);
+"""
+
+CONTACT_COLUMNS = ("id", "name", "email", "message", "created_at", "read", "ip_address", "user_agent")
+STATUS_COLUMNS = ("id", "client_name", "timestamp")
+DATETIME_COLUMNS = {"created_at", "timestamp"}
+
+
+def to_text(value: datetime) -> str:
+    """
+    Fixed-width UTC ISO text, so string order is time order. Truncated to
+    milliseconds like a datetime stored in Mongo.
+    """
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat(timespec="milliseconds")
+
+
+def to_row(document: dict, columns: Sequence[str]) -> tuple:
+    values = []
+    for column in columns:
+        value = document.get(column)
+        if column in DATETIME_COLUMNS:
+            value = to_text(value)
+        elif column == "read":
+            value = int(bool(value))
+        values.append(value)
+    return tuple(values)
+
+
+def fetch_documents(cursor: sqlite3.Cursor) -> List[dict]:
+    names = [description[0] for description in cursor.description]
+    documents = []
+    for row in cursor.fetchall():
+        document = dict(zip(names, row))
+        for name in DATETIME_COLUMNS.intersection(document):
+            document[name] = datetime.fromisoformat(document[name])
+        if "read" in document:
+            document["read"] = bool(document["read"])
+        documents.append(document)
+    return documents
+
+
+def select_columns(projection: dict, columns: Sequence[str], sort_keys: Sequence[str]) -> str:
+    """Columns of a Mongo-style inclusion projection, sort keys always included"""
+    if not any(projection.get(column) for column in columns):
+        return ", ".join(columns)
+    return ", ".join(column for column in columns if projection.get(column) or column in sort_keys)
+
+
+class SqliteEngine:
+    """
+    An SQLite database file in WAL mode, shared by the SQLite repositories.
+
+    sqlite3 blocks, so everything runs off the event loop. Reads go to a
+    small thread pool, each thread with its own connection (WAL readers
+    don't block each other or the writer). Writes are queued for a single
+    writer connection and committed in groups: whatever is waiting when the
+    writer picks up, up to `commit_batch` writes, shares one transaction and
+    one fsync, each write in its own savepoint so a failing one doesn't roll
+    back the rest. Statements are constant SQL strings, so the per-connection
+    statement cache keeps them prepared.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        readers: int = 4,
+        commit_batch: int = 256,
+        synchronous: str = "NORMAL",
+        busy_timeout_ms: int = 5000,
+    ):
+        self.path = path
+        self.readers = readers
+        self.commit_batch = commit_batch
+        self.synchronous = synchronous
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._reader_pool: Optional[ThreadPoolExecutor] = None
+        self._writer_pool: Optional[ThreadPoolExecutor] = None
+        self._writer: Optional[sqlite3.Connection] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._start_lock = asyncio.Lock()
+
+    @classmethod
+    def from_env(cls) -> "SqliteEngine":
+        return cls(
+            os.environ.get("SQLITE_PATH", "portfolio.sqlite3"),
+            readers=int(os.environ.get("SQLITE_READERS", 4)),
+            commit_batch=int(os.environ.get("SQLITE_COMMIT_BATCH", 256)),
+            # NORMAL in WAL mode survives an app crash, FULL also a power loss
+            synchronous=os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL").upper(),
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None: transactions are opened explicitly below
+        connection = sqlite3.connect(
+            self.path, isolation_level=None, check_same_thread=False, cached_statements=256
+        )
+        connection.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        connection.execute(f"PRAGMA synchronous = {self.synchronous}")
+        with self._connections_lock:
+            self._connections.append(connection)
+        return connection
+
+    def _open_writer(self):
+        self._writer = self._connect()
+        self._writer.execute("PRAGMA journal_mode = WAL")
+        has_fts = self._writer.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'contacts_fts'"
+        ).fetchone() is not None
+        self._writer.executescript(SCHEMA)
+        if not has_fts:
+            # A database file from before full-text search: index the existing rows
+            self._writer.execute("INSERT INTO contacts_fts (contacts_fts) VALUES ('rebuild')")
+
+    def _open_reader(self):
+        self._local.connection = self._connect()
+        self._local.connection.execute("PRAGMA query_only = 1")
+
+    async def start(self):
+        """Open the database and create the schema, on first use at the latest"""
+        if self._task is not None:
+            return
+        async with self._start_lock:
+            if self._task is not None:
+                return
+            self._writer_pool = ThreadPoolExecutor(1, thread_name_prefix="sqlite-writer")
+            await asyncio.get_running_loop().run_in_executor(self._writer_pool, self._open_writer)
+            self._reader_pool = ThreadPoolExecutor(
+                self.readers, thread_name_prefix="sqlite-reader", initializer=self._open_reader
+            )
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._write_forever())
+            logger.info(f"SQLite storage ready at {self.path}")
+
+    async def read(self, fn: Callable, *args) -> Any:
+        """Run fn(connection, *args) on a reader thread"""
+        await self.start()
+        return await asyncio.get_running_loop().run_in_executor(self._reader_pool, self._read, fn, args)
+
+    def _read(self, fn: Callable, args: tuple) -> Any:
+        return fn(self._local.connection, *args)
+
+    async def write(self, fn: Callable, *args) -> Any:
+        """Queue fn(connection, *args) for the next group commit and wait for it"""
+        await self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((fn, args, future))
+        return await future
+
+    def _commit(self, batch: List[tuple]) -> List[Tuple[bool, Any]]:
+        connection = self._writer
+        results = []
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            for fn, args, _ in batch:
+                connection.execute("SAVEPOINT write")
+                try:
+                    results.append((True, fn(connection, *args)))
+                except Exception as e:
+                    connection.execute("ROLLBACK TO write")
+                    results.append((False, e))
+                connection.execute("RELEASE write")
+            connection.execute("COMMIT")
+        except BaseException:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+        return results
+
+    async def _write_forever(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            while len(batch) < self.commit_batch and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            try:
+                results = await loop.run_in_executor(self._writer_pool, self._commit, batch)
+            except Exception as e:
+                logger.error(f"SQLite commit of {len(batch)} writes failed: {str(e)}")
+                results = [(False, e)] * len(batch)
+            for (_, _, future), (ok, value) in zip(batch, results):
+                if future.done():
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+    async def close(self):
+        """Commit the queued writes, then close every connection"""
+        if self._task is None:
+            return
+        self._queue.put_nowait(None)
+        await self._task
+        self._task = None
+        self._reader_pool.shutdown(wait=True)
+        self._writer_pool.shutdown(wait=True)
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections = []
+
+
+def contact_filter(
+    unread_only: bool = False,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    ids: Optional[List[str]] = None,
+    after: Optional[Dict[str, Any]] = None,
+) -> Tuple[str, list]:
+    """WHERE clause matching build_contact_query, plus the keyset condition"""
+    clauses, params = [], []
+    if unread_only:
+        clauses.append("read = 0")
+    if since:
+        clauses.append("created_at >= ?")
+        params.append(to_text(since))
+    if until:
+        clauses.append("created_at < ?")
+        params.append(to_text(until))
+    if ids:
+        # One parameter however many ids, so the statement stays cacheable
+        clauses.append("id IN (SELECT value FROM json_each(?))")
+        params.append(json.dumps(ids))
+    if after:
+        clauses.append("(created_at, id) < (?, ?)")
+        params += [to_text(after["created_at"]), after["id"]]
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def status_filter(
+    client_name: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    after: Optional[Dict[str, Any]] = None,
+) -> Tuple[str, list]:
+    clauses, params = [], []
+    if client_name:
+        clauses.append("client_name = ?")
+        params.append(client_name)
+    if since:
+        clauses.append("timestamp >= ?")
+        params.append(to_text(since))
+    if until:
+        clauses.append("timestamp < ?")
+        params.append(to_text(until))
+    if after:
+        clauses.append("(timestamp, id) < (?, ?)")
+        params += [to_text(after["timestamp"]), after["id"]]
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def query_documents(connection: sqlite3.Connection, sql: str, params: Sequence) -> List[dict]:
+    return fetch_documents(connection.execute(sql, params))
+
+
+def query_scalar(connection: sqlite3.Connection, sql: str, params: Sequence) -> Any:
+    return connection.execute(sql, params).fetchone()[0]
+
+
+def execute(connection: sqlite3.Connection, sql: str, params: Sequence) -> int:
+    """Run one statement, returns the number of rows it changed"""
+    return connection.execute(sql, params).rowcount
+
+
+def execute_many(connection: sqlite3.Connection, sql: str, rows: List[Sequence]) -> int:
+    return connection.executemany(sql, rows).rowcount
+
+
+def fts_query(q: str) -> Optional[str]:
+    """FTS5 query matching any word of `q` (like Mongo $text), None if it has none"""
+    tokens = tokenize(q)
+    if not tokens:
+        return None
+    # Word tokens never contain quotes, so quoting makes them plain terms
+    return " OR ".join(f'"{token}"' for token in dict.fromkeys(tokens))
+
+
+class SqliteContactRepository(ContactRepository):
+    INSERT = f"INSERT INTO contacts ({', '.join(CONTACT_COLUMNS)}) VALUES ({', '.join('?' * len(CONTACT_COLUMNS))})"
+    INSERT_IGNORE = INSERT.replace("INSERT", "INSERT OR IGNORE", 1)
+    ORDER = " ORDER BY created_at DESC, id DESC"
+    SORT_KEYS = ("created_at", "id")
+    # bm25() is lower for better matches, negated so the search order is score DESC like Mongo
+    SCORED = (
+        "SELECT contacts.*, -bm25(contacts_fts, {weights}) AS score FROM contacts_fts"
+        " JOIN contacts ON contacts.rowid = contacts_fts.rowid WHERE contacts_fts MATCH ?"
+    ).format(weights=", ".join(str(float(weight)) for weight in CONTACT_TEXT_WEIGHTS.values()))
+    SEARCH_AFTER = " WHERE score < ? OR (score = ? AND (created_at, id) < (?, ?))"
+    SEARCH_ORDER = " ORDER BY score DESC, created_at DESC, id DESC LIMIT ?"
+
+    def __init__(self, engine: SqliteEngine):
+        self.engine = engine
+
+    async def insert(self, document: dict):
+        await self.engine.write(execute, self.INSERT, to_row(document, CONTACT_COLUMNS))
+
+    async def insert_many(self, documents: List[dict], ordered: bool = False) -> int:
+        # Already stored ids are skipped, like duplicate key errors of an unordered insert_many
+        rows = [to_row(document, CONTACT_COLUMNS) for document in documents]
+        return await self.engine.write(execute_many, self.INSERT_IGNORE, rows)
+
+    def _select(self, projection: dict, where: str) -> str:
+        return f"SELECT {select_columns(projection, CONTACT_COLUMNS, self.SORT_KEYS)} FROM contacts{where}"
+
+    async def find_page(self, projection, limit, unread_only=False, after=None, skip=0):
+        where, params = contact_filter(unread_only, after=after)
+        sql = self._select(projection, where) + self.ORDER + " LIMIT ? OFFSET ?"
+        return await self.engine.read(query_documents, sql, params + [limit, 0 if after else skip])
+
+    async def iterate(self, projection, batch_size, unread_only=False, since=None, until=None):
+        # Keyset pages, so no cursor is held open across reader threads
+        after = None
+        while True:
+            where, params = contact_filter(unread_only, since, until, after=after)
+            sql = self._select(projection, where) + self.ORDER + " LIMIT ?"
+            documents = await self.engine.read(query_documents, sql, params + [batch_size])
+            for document in documents:
+                yield document
+            if len(documents) < batch_size:
+                return
+            after = {"created_at": documents[-1]["created_at"], "id": documents[-1]["id"]}
+
+    async def find_by_ids(self, ids, projection):
+        if not ids:
+            return []
+        where, params = contact_filter(ids=ids)
+        return await self.engine.read(query_documents, self._select(projection, where), params)
+
+    async def search(self, q, limit, after, projection):
+        query = fts_query(q)
+        if query is None:
+            return []
+        columns = select_columns(projection, CONTACT_COLUMNS, self.SORT_KEYS)
+        sql = f"SELECT {columns}, score FROM ({self.SCORED})"
+        params = [query]
+        if after:
+            sql += self.SEARCH_AFTER
+            params += [after["score"], after["score"], to_text(after["created_at"]), after["id"]]
+        return await self.engine.read(query_documents, sql + self.SEARCH_ORDER, params + [limit])
+
+    async def set_read(self, contact_id, read=True):
+        def update(connection):
+            row = connection.execute("SELECT read FROM contacts WHERE id = ?", (contact_id,)).fetchone()
+            if row is None:
+                return 0, 0
+            if bool(row[0]) == read:
+                return 1, 0
+            connection.execute("UPDATE contacts SET read = ? WHERE id = ?", (int(read), contact_id))
+            return 1, 1
+        return await self.engine.write(update)
+
+    async def set_read_many(self, read, ids=None, before=None, unread_only=False):
+        where, params = contact_filter(unread_only, until=before, ids=ids)
+        changed = f"{where} AND read != ?" if where else " WHERE read != ?"
+
+        def update(connection):
+            matched = query_scalar(connection, f"SELECT COUNT(*) FROM contacts{where}", params)
+            modified = execute(connection, f"UPDATE contacts SET read = ?{changed}", [int(read)] + params + [int(read)])
+            return matched, modified
+        return await self.engine.write(update)
+
+    async def delete_many(self, ids=None, before=None, unread_only=False):
+        where, params = contact_filter(unread_only, until=before, ids=ids)
+        return await self.engine.write(execute, f"DELETE FROM contacts{where}", params)
+
+    async def count(self, unread_only=False):
+        where, params = contact_filter(unread_only)
+        return await self.engine.read(query_scalar, f"SELECT COUNT(*) FROM contacts{where}", params)
+
+    async def ingest_watermark(self, settle):
+        # Rowids are handed out in commit order by the single writer, so nothing
+        # can still land behind the newest one and `settle` isn't needed (the
+        # rowid of a deleted newest row can come back, but deletes rebuild anyway)
+        return await self.engine.read(query_scalar, "SELECT coalesce(max(rowid), 0) FROM contacts", ())
+
+    async def traffic(self, since=None, until=None, after=None, through=None):
+        where, params = contact_filter(since=since, until=until)
+        for condition, watermark in (("rowid > ?", after), ("rowid <= ?", through)):
+            if watermark is not None:
+                where += (" AND " if where else " WHERE ") + condition
+                params.append(watermark)
+        day_of = "substr(created_at, 1, 10)"
+        facets = {
+            "domains": f"SELECT {day_of}, lower(substr(email, instr(email, '@') + 1)), COUNT(*) FROM contacts{where} GROUP BY 1, 2",
+            "user_agents": f"SELECT {day_of}, coalesce(user_agent, ''), COUNT(*) FROM contacts{where} GROUP BY 1, 2",
+        }
+
+        def aggregate(connection):
+            # One read transaction, so the three counts see the same rows
+            connection.execute("BEGIN")
+            try:
+                traffic = {"hours": dict(connection.execute(
+                    f"SELECT substr(created_at, 1, 13), COUNT(*) FROM contacts{where} GROUP BY 1", params
+                ))}
+                for facet, sql in facets.items():
+                    traffic[facet] = {(day, value): count for day, value, count in connection.execute(sql, params)}
+                return traffic
+            finally:
+                connection.execute("COMMIT")
+        return await self.engine.read(aggregate)
+
+
+class SqliteStatusCheckRepository(StatusCheckRepository):
+    INSERT = f"INSERT INTO status_checks ({', '.join(STATUS_COLUMNS)}) VALUES ({', '.join('?' * len(STATUS_COLUMNS))})"
+    INSERT_IGNORE = INSERT.replace("INSERT", "INSERT OR IGNORE", 1)
+    ORDER = " ORDER BY timestamp DESC, id DESC"
+    SORT_KEYS = ("timestamp", "id")
+
+    def __init__(self, engine: SqliteEngine):
+        self.engine = engine
+
+    async def insert(self, document: dict):
+        await self.engine.write(execute, self.INSERT, to_row(document, STATUS_COLUMNS))
+
+    async def insert_many(self, documents: List[dict], ordered: bool = False) -> int:
+        rows = [to_row(document, STATUS_COLUMNS) for document in documents]
+        return await self.engine.write(execute_many, self.INSERT_IGNORE, rows)
+
+    def _select(self, projection: dict, where: str) -> str:
+        return f"SELECT {select_columns(projection, STATUS_COLUMNS, self.SORT_KEYS)} FROM status_checks{where}"
+
+    async def find_page(self, projection, limit, client_name=None, since=None, until=None, after=None):
+        where, params = status_filter(client_name, since, until, after)
+        sql = self._select(projection, where) + self.ORDER + " LIMIT ?"
+        return await self.engine.read(query_documents, sql, params + [limit])
+
+    async def iterate(self, projection, batch_size, client_name=None, since=None, until=None):
+        after = None
+        while True:
+            where, params = status_filter(client_name, since, until, after)
+            sql = self._select(projection, where) + self.ORDER + " LIMIT ?"
+            documents = await self.engine.read(query_documents, sql, params + [batch_size])
+            for document in documents:
+                yield document
+            if len(documents) < batch_size:
+                return
+            after = {"timestamp": documents[-1]["timestamp"], "id": documents[-1]["id"]}
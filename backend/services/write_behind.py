@@ -0,0 +1,356 @@
+from typing import Callable, Dict, List, Optional, Tuple
+import asyncio
+import glob
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+class WriteBehindQueue:
+    """
+    Write-behind buffer for inserts.
+    Accepted documents go into a bounded asyncio queue and a background task
+    flushes them with `insert_many(ordered=False)` once `batch_size` documents
+    are waiting or `flush_interval` seconds have passed since the first one.
+    When `journal_path` is set, every document is appended to a local journal
+    before it is acknowledged and replayed on the next start, so acknowledged
+    writes survive a crash. Documents get their `_id` up front, which makes a
+    replay of already flushed documents a no-op.
+
+    The journal is a series of segment files (`<journal_path>.<n>`). A new
+    segment starts after every flushed batch and older ones are deleted once
+    all their documents are written, so the journal stays small under
+    sustained traffic. fsync runs on a worker thread and is shared by all
+    documents written while the previous one was running (group commit).
+    Replay happens in the background, so startup doesn't wait for Mongo.
+    """
+
+    def __init__(
+        self,
+        get_collection: Callable,
+        max_size: int = 10_000,
+        batch_size: int = 100,
+        flush_interval: float = 0.5,
+        journal_path: Optional[str] = None,
+        fsync: bool = True,
+        retry_delay: float = 0.5,
+        max_retry_delay: float = 30.0,
+        on_flush: Optional[Callable[[], None]] = None,
+    ):
+        self.get_collection = get_collection
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.journal_path = journal_path
+        self.fsync = fsync
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.on_flush = on_flush
+        self._queue: Optional[asyncio.Queue] = None
+        # (segment, document) pairs: the batch being gathered or flushed
+        self._inflight: List[Tuple[int, dict]] = []
+        self._journal = None
+        self._segment = 0
+        # Documents not yet flushed per segment, the current one included
+        self._segment_pending: Dict[int, int] = {}
+        self._segment_written = False
+        # Segments written since the last fsync; replaced ones are closed after it
+        self._unsynced: List = []
+        self._retired: List = []
+        self._sync_waiter: Optional[asyncio.Future] = None
+        self._sync_task: Optional[asyncio.Task] = None
+        self._replaying = 0
+        self._replay_task: Optional[asyncio.Task] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(
+        cls, prefix: str, get_collection: Callable, on_flush: Optional[Callable[[], None]] = None
+    ) -> Optional["WriteBehindQueue"]:
+        """Build a queue from <prefix>_* env vars, or None when <prefix> is not enabled"""
+        if os.environ.get(prefix, "false").lower() not in ("1", "true", "yes"):
+            return None
+        return cls(
+            get_collection,
+            max_size=int(os.environ.get(f"{prefix}_QUEUE_SIZE", 10_000)),
+            batch_size=int(os.environ.get(f"{prefix}_BATCH_SIZE", 100)),
+            flush_interval=float(os.environ.get(f"{prefix}_FLUSH_INTERVAL", 0.5)),
+            journal_path=os.environ.get(f"{prefix}_JOURNAL") or None,
+            fsync=os.environ.get(f"{prefix}_FSYNC", "true").lower() in ("1", "true", "yes"),
+            on_flush=on_flush,
+        )
+
+    def __len__(self) -> int:
+        return (self._queue.qsize() if self._queue else 0) + len(self._inflight) + self._replaying
+
+    async def enqueue(self, document: dict):
+        """
+        Accept a document for writing, returning once it is journaled. Raises
+        asyncio.QueueFull when the buffer is full so the caller can shed load
+        instead of blocking. A failed fsync doesn't fail the call: the
+        document is queued and will be written, and answering with an error
+        would only make the client send it again.
+        """
+        if self._queue is None:
+            raise RuntimeError("WriteBehindQueue.start() has not been called")
+        if self._queue.full():
+            raise asyncio.QueueFull()
+
+        # bson/pymongo are imported on first use, see database.connect
+        from bson import ObjectId, json_util
+        document.setdefault("_id", ObjectId())
+        if self._journal is None:
+            self._queue.put_nowait((self._segment, document))
+            return
+
+        self._journal.write(json_util.dumps(document) + "\n")
+        self._journal.flush()
+        self._segment_pending[self._segment] += 1
+        self._segment_written = True
+        self._queue.put_nowait((self._segment, document))
+        if self.fsync:
+            if self._journal not in self._unsynced:
+                self._unsynced.append(self._journal)
+            try:
+                # Shielded: a client going away must not fail the fsync for the others
+                await asyncio.shield(self._request_sync())
+            except OSError as e:
+                logger.warning(f"Document accepted without a synced journal entry: {str(e)}")
+
+    def _request_sync(self) -> asyncio.Future:
+        """The fsync covering everything written so far, started if none is waiting"""
+        if self._sync_waiter is None:
+            self._sync_waiter = asyncio.get_running_loop().create_future()
+            if self._sync_task is None or self._sync_task.done():
+                self._sync_task = asyncio.create_task(self._sync_loop())
+        return self._sync_waiter
+
+    async def _sync_loop(self):
+        loop = asyncio.get_running_loop()
+        while self._sync_waiter is not None:
+            waiter, self._sync_waiter = self._sync_waiter, None
+            files, self._unsynced = self._unsynced, []
+            retired, self._retired = self._retired, []
+            try:
+                await loop.run_in_executor(None, sync_files, files, retired)
+            except OSError as e:
+                logger.error(f"Write-behind journal fsync failed: {str(e)}")
+                waiter.set_exception(e)
+                # Retrieved here, so no "never retrieved" warning without waiters
+                waiter.exception()
+            else:
+                waiter.set_result(None)
+
+    def _segment_path(self, segment: int) -> str:
+        return f"{self.journal_path}.{segment}"
+
+    def _open_segment(self, segment: int):
+        self._segment = segment
+        self._segment_pending[segment] = 0
+        self._segment_written = False
+        self._journal = open(self._segment_path(segment), "w")
+
+    def _rotate(self):
+        """Start a new segment, so the current one can go once it is flushed"""
+        if self._journal is None or not self._segment_written:
+            return
+        self._retired.append(self._journal)
+        if self.fsync:
+            self._request_sync()
+        else:
+            self._retired.pop().close()
+        self._open_segment(self._segment + 1)
+
+    def _remove_flushed_segments(self):
+        for segment, pending in list(self._segment_pending.items()):
+            if pending == 0 and segment != self._segment:
+                del self._segment_pending[segment]
+                try:
+                    os.unlink(self._segment_path(segment))
+                except OSError as e:
+                    logger.warning(f"Error removing write-behind journal segment: {str(e)}")
+
+    def _batch_flushed(self, batch: List[Tuple[int, dict]]):
+        if self._journal is None:
+            return
+        for segment, _ in batch:
+            self._segment_pending[segment] -= 1
+        self._rotate()
+        self._remove_flushed_segments()
+
+    async def start(self):
+        """Start the flusher and replay the journal left by a previous run in the background"""
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+
+        if self.journal_path:
+            paths = self._journal_files()
+            pending = self._read_journal(paths)
+            segments = [int(path.rsplit(".", 1)[1]) for path in paths if path != self.journal_path]
+            self._open_segment(max(segments, default=-1) + 1)
+            if pending:
+                logger.info(f"Replaying {len(pending)} journaled documents in the background")
+                self._replaying = len(pending)
+                self._replay_task = asyncio.create_task(self._replay(pending, paths))
+            elif paths:
+                remove_files(paths)
+
+        self._task = asyncio.create_task(self._run())
+
+    def _journal_files(self) -> List[str]:
+        """Segments left by a previous run, and a journal written before segments existed"""
+        paths = [
+            path for path in glob.glob(glob.escape(self.journal_path) + ".*")
+            if path.rsplit(".", 1)[1].isdigit()
+        ]
+        paths.sort(key=lambda path: int(path.rsplit(".", 1)[1]))
+        if os.path.exists(self.journal_path):
+            paths.insert(0, self.journal_path)
+        return paths
+
+    def _read_journal(self, paths: List[str]) -> List[dict]:
+        from bson import json_util
+        documents = []
+        for path in paths:
+            with open(path) as journal:
+                for line in journal:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        documents.append(json_util.loads(line))
+                    except ValueError:
+                        # A torn last line means the crash happened before the ack
+                        logger.warning("Skipping unreadable journal entry")
+        return documents
+
+    async def _replay(self, documents: List[dict], paths: List[str]):
+        """Write out a previous run's journal; its files go only once all of it is written"""
+        for i in range(0, len(documents), self.batch_size):
+            batch = documents[i:i + self.batch_size]
+            await self._flush(batch)
+            self._replaying -= len(batch)
+        remove_files(paths)
+        logger.info(f"Replayed {len(documents)} journaled documents")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            # Tracked while it fills up too, so drain() finds it if cancelled here
+            self._inflight = batch
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._flush([document for _, document in batch])
+            self._inflight = []
+            self._batch_flushed(batch)
+
+    async def _flush(self, batch: List[dict], max_attempts: Optional[int] = None) -> bool:
+        """Insert a batch, retrying with backoff until it succeeds or attempts run out"""
+        from pymongo.errors import BulkWriteError
+        delay = self.retry_delay
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                await self.get_collection().insert_many(batch, ordered=False)
+                self._flushed()
+                return True
+            except BulkWriteError as e:
+                errors = e.details.get("writeErrors", [])
+                concern_errors = e.details.get("writeConcernErrors", [])
+                if concern_errors:
+                    # Written but not acknowledged as asked: not durable yet, so
+                    # the batch is retried (its _ids make the retry idempotent)
+                    logger.error(f"Write-behind flush of {len(batch)} documents missed the write concern: {str(e)}")
+                elif errors and all(error.get("code") == DUPLICATE_KEY_ERROR for error in errors):
+                    # Already written by an earlier attempt or a replay
+                    self._flushed()
+                    return True
+                else:
+                    logger.error(f"Write-behind flush failed for {len(errors)} documents: {str(e)}")
+            except Exception as e:
+                logger.error(f"Write-behind flush of {len(batch)} documents failed: {str(e)}")
+
+            if max_attempts is not None and attempt >= max_attempts:
+                return False
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_retry_delay)
+
+    def _flushed(self):
+        if self.on_flush is not None:
+            self.on_flush()
+
+    async def drain(self, max_attempts: int = 3):
+        """Stop the flusher and write out everything still buffered"""
+        if self._task is None:
+            return
+        for task in (self._replay_task, self._task):
+            if task is None:
+                continue
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        if self._replay_task is not None and not self._replay_task.done():
+            logger.error("Write-behind journal replay incomplete, it is retried on the next start")
+        self._replay_task = None
+        self._replaying = 0
+
+        remaining = list(self._inflight)
+        while not self._queue.empty():
+            remaining.append(self._queue.get_nowait())
+        self._inflight = []
+
+        flushed = True
+        for i in range(0, len(remaining), self.batch_size):
+            batch = remaining[i:i + self.batch_size]
+            if await self._flush([document for _, document in batch], max_attempts):
+                self._batch_flushed(batch)
+            else:
+                flushed = False
+
+        if self._journal is not None:
+            if self._sync_task is not None:
+                await self._sync_task
+            if not flushed:
+                logger.error("Write-behind drain incomplete, documents kept in journal for replay")
+            sync_files([self._journal] if self.fsync else [], [self._journal] + self._retired)
+            self._retired = []
+            self._journal = None
+            self._remove_flushed_segments()
+            if not self._segment_pending.get(self._segment):
+                remove_files([self._segment_path(self._segment)])
+            self._segment_pending = {}
+        elif not flushed:
+            logger.error("Write-behind drain incomplete, buffered documents were lost")
+
+        logger.info(f"Write-behind queue drained ({len(remaining)} documents)")
+
+
+def sync_files(files: List, retired: List):
+    """fsync `files`, then close `retired` (run on a worker thread)"""
+    for journal in files:
+        os.fsync(journal.fileno())
+    for journal in retired:
+        journal.close()
+
+
+def remove_files(paths: List[str]):
+    for path in paths:
+        try:
+            os.unlink(path)
+        except OSError as e:
+            logger.warning(f"Error removing write-behind journal file: {str(e)}")
@@ -0,0 +1,89 @@
+"""
+API tests run `server:app` in-process through TestClient, on a
+mongomock-motor database that is new for every test. Parametrize `client`
+with indirect=True over "mongo" and "sqlite" to run a test on the SQLite
+storage backend as well (see tests/test_storage_parity.py).
+
+Extra packages: httpx, mongomock-motor (as for benchmarks/load_test.py).
+"""
+
+from datetime import datetime, timedelta
+import os
+
+# Before the app modules, which read their settings at import time
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ["SPAM_FILTER_ENABLED"] = "false"
+
+import pytest
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+
+import database
+import server
+from routes.contact import contact_analytics, contact_counters
+from services.idempotency import idempotency_store
+from services.rate_limit import rate_limiter
+from services.response_cache import response_cache
+from services.storage import storage
+from services.storage_sqlite import SqliteContactRepository, SqliteEngine, SqliteStatusCheckRepository
+
+
+@pytest.fixture
+def client(request, monkeypatch, tmp_path):
+    # connect() keeps an existing client, so the app runs on this one
+    mock_client = AsyncMongoMockClient()
+    monkeypatch.setattr(database, "client", mock_client)
+    monkeypatch.setattr(database, "db", mock_client["portfolio_test"])
+    if getattr(request, "param", "mongo") == "sqlite":
+        engine = SqliteEngine(str(tmp_path / "portfolio.sqlite3"))
+        contacts = SqliteContactRepository(engine)
+        monkeypatch.setattr(storage, "backend", "sqlite")
+        monkeypatch.setattr(storage, "engine", engine)
+        monkeypatch.setattr(storage, "contacts", contacts)
+        monkeypatch.setattr(storage, "status_checks", SqliteStatusCheckRepository(engine))
+        # Services that were handed the repository at import time
+        monkeypatch.setattr(contact_counters, "repository", contacts)
+        monkeypatch.setattr(contact_analytics, "repository", contacts)
+    # Per-process state that would otherwise leak from one test into the next
+    rate_limiter._stores.clear()
+    idempotency_store._entries.clear()
+    response_cache.clear()
+    with TestClient(server.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def run(client):
+    """Run a coroutine function on the app's event loop, e.g. for database checks"""
+    return client.portal.call
+
+
+@pytest.fixture
+def seed_contacts(run):
+    """Store `count` contacts straight in the storage backend, newest first, one minute apart"""
+    def seed(count: int) -> list:
+        now = datetime.utcnow().replace(microsecond=0)
+        documents = [
+            {
+                "id": f"contact-{i:04d}",
+                "name": f"Person {i}",
+                "email": f"person{i}@example.com",
+                "message": f"Hello, this is test message number {i}.",
+                "created_at": now - timedelta(minutes=i),
+                "read": False,
+                "ip_address": "10.0.0.1",
+                "user_agent": "pytest",
+            }
+            for i in range(count)
+        ]
+        run(storage.contacts.insert_many, [dict(document) for document in documents])
+        return documents
+    return seed
+
+
+def contact_body(i: int) -> dict:
+    return {
+        "name": f"Person {i}",
+        "email": f"person{i}@example.com",
+        "message": f"Hello, this is test message number {i}.",
+    }
@@ -0,0 +1,143 @@
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from services.admission import AdaptiveLimit, AdmissionControlMiddleware, AdmissionController, RouteClass
+from services.metrics import admission_rejections
+
+CONTACT = RouteClass("contact", priority=0, max_concurrency=1, queue_timeout=0.5)
+ADMIN = RouteClass("admin", priority=2, max_concurrency=1, queue_timeout=0.5)
+
+
+def controller(*routes: RouteClass, **kwargs) -> AdmissionController:
+    return AdmissionController(route_classes={route.name: route for route in routes}, **kwargs)
+
+
+def test_limit_backs_off_while_latency_is_above_target():
+    limit = AdaptiveLimit(initial=10, min_limit=4, target_latency=0.1, window=1.0)
+    limit._window_start = 0.0
+    limits = []
+    for second in range(1, 6):
+        # Only the p90 counts: one fast request doesn't hide the slow ones
+        for latency in (0.01, 0.5, 0.5, 0.5, 0.5, 0.5, 0.5, 0.5, 0.5, 0.5):
+            limit.record(latency, now=second - 0.5)
+        limit.record(0.5, now=second)
+        limits.append(limit.current)
+    assert limits == [8, 6, 5, 4, 4]
+
+
+def test_limit_recovers_by_one_per_saturated_window():
+    limit = AdaptiveLimit(initial=4, max_limit=6, target_latency=0.1, window=1.0)
+    limit._window_start = 0.0
+    limits = []
+    for second in range(1, 5):
+        limit.saturated = True
+        limit.record(0.05, now=second)
+        limits.append(limit.current)
+    # Fast but never full: no reason to grow
+    limit.record(0.05, now=5)
+    assert limits == [5, 6, 6, 6]
+    assert limit.current == 6
+
+
+def test_released_latency_drives_the_limit():
+    admission = controller(CONTACT, limit=AdaptiveLimit(initial=10, min_limit=2, target_latency=0.1, window=0))
+
+    async def scenario():
+        for latency in (0.5, 0.5, 0.5):
+            assert await admission.acquire(CONTACT) is None
+            admission.release(CONTACT, latency)
+        slow = admission.limit.current
+        for _ in range(3):
+            assert await admission.acquire(CONTACT) is None
+            admission.limit.saturated = True
+            admission.release(CONTACT, 0.01)
+        return slow, admission.limit.current
+
+    assert asyncio.run(scenario()) == (5, 8)
+
+
+def test_waiter_gets_the_freed_slot():
+    admission = controller(CONTACT)
+
+    async def scenario():
+        assert await admission.acquire(CONTACT) is None
+        waiter = asyncio.create_task(admission.acquire(CONTACT))
+        await asyncio.sleep(0.01)
+        queued = admission.queued
+        admission.release(CONTACT, 0.01)
+        return queued, await waiter, admission.in_flight, admission.queued
+
+    assert asyncio.run(scenario()) == (1, None, 1, 0)
+
+
+def test_waiter_is_shed_when_its_queue_timeout_passes():
+    route = RouteClass("contact", priority=0, max_concurrency=1, queue_timeout=0.05)
+    admission = controller(route)
+
+    async def scenario():
+        assert await admission.acquire(route) is None
+        return await admission.acquire(route), admission.in_flight, admission.queued
+
+    assert asyncio.run(scenario()) == ("deadline", 1, 0)
+
+
+def test_expected_wait_over_the_timeout_is_shed_without_queueing():
+    route = RouteClass("contact", priority=0, max_concurrency=1, queue_timeout=0.5)
+    admission = controller(route)
+    admission._service_time = 1.5
+
+    async def scenario():
+        assert await admission.acquire(route) is None
+        return await admission.acquire(route), admission.queued
+
+    assert asyncio.run(scenario()) == ("deadline", 0)
+    assert admission.retry_after(route) == 2
+
+
+def test_full_queue_drops_a_lower_priority_waiter():
+    admission = controller(CONTACT, ADMIN, limit=AdaptiveLimit(initial=1), max_queue=1)
+
+    async def scenario():
+        assert await admission.acquire(CONTACT) is None
+        admin = asyncio.create_task(admission.acquire(ADMIN))
+        await asyncio.sleep(0.01)
+        contact = asyncio.create_task(admission.acquire(CONTACT))
+        await asyncio.sleep(0.01)
+        evicted = await admin
+        # A second admin request finds the queue full of higher priority waiters
+        full = await admission.acquire(ADMIN)
+        admission.release(CONTACT, 0.01)
+        return evicted, full, await contact
+
+    assert asyncio.run(scenario()) == ("evicted", "queue_full", None)
+
+
+def test_shed_requests_get_503_with_retry_after():
+    route = RouteClass("admin", priority=2, max_concurrency=1, queue_timeout=0)
+    admission = controller(route)
+    app = FastAPI()
+    app.add_middleware(AdmissionControlMiddleware, controller=admission)
+
+    @app.get("/api/admin/contacts")
+    async def contacts():
+        return []
+
+    @app.get("/api/admin/profile")
+    async def profile():
+        return {}
+
+    test_client = TestClient(app)
+    assert test_client.get("/api/admin/contacts").status_code == 200
+    assert admission.in_flight == 0
+
+    # Hold the only admin slot
+    asyncio.run(admission.acquire(route))
+    rejected = admission_rejections.values.get(("admin", "deadline"), 0)
+    response = test_client.get("/api/admin/contacts")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert admission_rejections.values[("admin", "deadline")] == rejected + 1
+    # Diagnostics are never shed
+    assert test_client.get("/api/admin/profile").status_code == 200
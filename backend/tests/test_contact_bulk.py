@@ -0,0 +1,39 @@
+def unread_ids(client) -> set:
+    return {contact["id"] for contact in client.get("/api/admin/contacts", params={"unread_only": True}).json()}
+
+
+def test_bulk_counts_only_the_contacts_that_exist(client, seed_contacts):
+    seed_contacts(4)
+    response = client.post("/api/admin/contacts/bulk", json={
+        "action": "mark_read",
+        "ids": ["contact-0000", "contact-0001", "missing-1", "missing-2"],
+    })
+    assert response.status_code == 200
+    assert response.json() == {"success": True, "matched": 2, "modified": 2}
+    assert unread_ids(client) == {"contact-0002", "contact-0003"}
+
+
+def test_bulk_reports_already_applied_as_matched_not_modified(client, seed_contacts):
+    seed_contacts(3)
+    client.post("/api/admin/contacts/bulk", json={"action": "mark_read", "ids": ["contact-0000"]})
+    response = client.post("/api/admin/contacts/bulk", json={
+        "action": "mark_read", "ids": ["contact-0000", "contact-0001"],
+    })
+    assert response.json() == {"success": True, "matched": 2, "modified": 1}
+
+
+def test_bulk_delete_by_filter(client, seed_contacts):
+    seeded = seed_contacts(5)
+    # Strictly before the third newest: the two oldest go
+    response = client.post("/api/admin/contacts/bulk", json={
+        "action": "delete", "before": seeded[2]["created_at"].isoformat(),
+    })
+    assert response.json()["matched"] == 2
+    remaining = [contact["id"] for contact in client.get("/api/admin/contacts").json()]
+    assert remaining == ["contact-0000", "contact-0001", "contact-0002"]
+
+
+def test_bulk_needs_a_selection(client):
+    response = client.post("/api/admin/contacts/bulk", json={"action": "delete"})
+    assert response.status_code == 400
+    assert client.post("/api/admin/contacts/bulk", json={"action": "archive", "ids": ["x"]}).status_code == 422
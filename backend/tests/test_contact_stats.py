@@ -0,0 +1,106 @@
+import asyncio
+import time
+
+import pytest
+
+from routes.contact import contact_counters
+from services.contact_stats import ContactCounters
+from tests.conftest import contact_body
+
+
+class CountingRepository:
+    """Just enough of a ContactRepository for the counters"""
+
+    def __init__(self, total: int, unread: int):
+        self.total = total
+        self.unread = unread
+        self.counts = 0
+
+    async def count(self, unread_only: bool = False) -> int:
+        self.counts += 1
+        return self.unread if unread_only else self.total
+
+
+def stats(client) -> tuple:
+    snapshot = client.get("/api/admin/contacts/stats").json()
+    return snapshot["total"], snapshot["read"], snapshot["unread"]
+
+
+@pytest.mark.parametrize("client", ["mongo", "sqlite"], indirect=True)
+def test_counters_follow_inserts_and_bulk_updates(client):
+    ids = [client.post("/api/contact", json=contact_body(i)).json()["id"] for i in range(4)]
+    assert stats(client) == (4, 0, 4)
+
+    client.patch(f"/api/admin/contacts/{ids[0]}/read")
+    # Already read: matched but not modified, so not counted twice
+    client.post("/api/admin/contacts/bulk", json={"action": "mark_read", "ids": ids[:3] + ["missing"]})
+    assert stats(client) == (4, 3, 1)
+
+    client.post("/api/admin/contacts/bulk", json={"action": "mark_unread", "ids": ids[1:]})
+    assert stats(client) == (4, 1, 3)
+
+
+@pytest.mark.parametrize("client", ["mongo", "sqlite"], indirect=True)
+def test_counters_are_recounted_after_a_delete(client):
+    ids = [client.post("/api/contact", json=contact_body(i)).json()["id"] for i in range(3)]
+    client.patch(f"/api/admin/contacts/{ids[0]}/read")
+
+    client.post("/api/admin/contacts/bulk", json={"action": "delete", "ids": ids[:2]})
+    # Deletes can't be applied as deltas, the reconcile task counts again
+    deadline = time.monotonic() + 2
+    while stats(client) != (1, 0, 1) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert stats(client) == (1, 0, 1)
+    assert contact_counters.age() < 2
+
+
+def test_snapshot_recounts_only_when_stale():
+    repository = CountingRepository(total=10, unread=4)
+    counters = ContactCounters(repository, max_staleness=60)
+
+    async def scenario():
+        first = await counters.snapshot()
+        counters.record_insert()
+        counters.record_read_change(became_read=2)
+        cached = await counters.snapshot()
+        counters.max_staleness = 0
+        await asyncio.sleep(0.01)
+        recounted = await counters.snapshot()
+        return first, cached, recounted
+
+    first, cached, recounted = asyncio.run(scenario())
+    assert (first["total"], first["unread"], first["read"]) == (10, 4, 6)
+    assert (cached["total"], cached["unread"], cached["read"]) == (11, 3, 8)
+    # The database is the source of truth again once the snapshot is too old
+    assert (recounted["total"], recounted["unread"]) == (10, 4)
+    assert repository.counts == 4
+
+
+def test_unread_never_goes_negative():
+    counters = ContactCounters(CountingRepository(total=1, unread=1))
+    counters.total, counters.unread = 1, 1
+    counters.record_read_change(became_read=5)
+    assert counters.unread == 0
+
+
+def test_change_stream_events_replace_write_through():
+    counters = ContactCounters(CountingRepository(total=0, unread=0))
+    counters._dirty = asyncio.Event()
+    counters._watching = True
+
+    # This worker's own writes arrive as events, the hooks must not count them again
+    counters.record_insert()
+    counters.record_read_change(became_read=1)
+    assert (counters.total, counters.unread) == (0, 0)
+
+    counters._apply_change({"operationType": "insert", "fullDocument": {"read": False}})
+    counters._apply_change({"operationType": "insert", "fullDocument": {"read": True}})
+    assert (counters.total, counters.unread) == (2, 1)
+    counters._apply_change({"operationType": "update", "updateDescription": {"updatedFields": {"read": True}}})
+    assert counters.unread == 0
+    counters._apply_change({"operationType": "update", "updateDescription": {"updatedFields": {"name": "x"}}})
+    assert counters.unread == 0
+    assert not counters._dirty.is_set()
+
+    counters._apply_change({"operationType": "delete"})
+    assert counters._dirty.is_set()
@@ -0,0 +1,38 @@
+import database
+from tests.conftest import contact_body
+
+
+def test_retry_gets_the_original_response(client, run):
+    headers = {"Idempotency-Key": "key-1"}
+    first = client.post("/api/contact", json=contact_body(1), headers=headers)
+    retry = client.post("/api/contact", json=contact_body(1), headers=headers)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert "Idempotent-Replayed" not in first.headers
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert run(database.db.contacts.count_documents, {}) == 1
+
+
+def test_key_reused_with_a_different_body_is_rejected(client, run):
+    headers = {"Idempotency-Key": "key-2"}
+    client.post("/api/contact", json=contact_body(1), headers=headers)
+    response = client.post("/api/contact", json=contact_body(2), headers=headers)
+
+    assert response.status_code == 422
+    assert "Idempotency-Key" in response.json()["detail"]
+    assert run(database.db.contacts.count_documents, {}) == 1
+
+
+def test_keys_are_scoped_per_route(client):
+    headers = {"Idempotency-Key": "shared-key"}
+    contact = client.post("/api/contact", json=contact_body(1), headers=headers)
+    status = client.post("/api/status", json={"client_name": "a"}, headers=headers)
+    assert status.status_code == 200
+    assert status.json()["id"] != contact.json()["id"]
+
+
+def test_requests_without_a_key_are_not_deduplicated(client, run):
+    client.post("/api/status", json={"client_name": "a"})
+    client.post("/api/status", json={"client_name": "a"})
+    assert run(database.db.status_checks.count_documents, {}) == 2
@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from services.idempotency import IdempotencyKeyInProgress, IdempotencyKeyMismatch, IdempotencyStore
+
+
+@pytest.fixture
+def collection():
+    return AsyncMongoMockClient()["portfolio_test"].idempotency_keys
+
+
+def worker(collection, **kwargs) -> IdempotencyStore:
+    """A store as one worker process has it: its own LRU, the shared collection"""
+    return IdempotencyStore(get_collection=lambda: collection, **kwargs)
+
+
+def test_claim_stores_the_response(collection):
+    async def scenario():
+        result = await worker(collection).run("contact", "k", "f", lambda: asyncio.sleep(0, {"id": "1"}))
+        return result, await collection.find_one({"_id": "contact:k"})
+
+    result, stored = asyncio.run(scenario())
+    assert result == ({"id": "1"}, False)
+    assert stored["response"] == {"id": "1"}
+    assert stored["fingerprint"] == "f"
+
+
+def test_other_worker_waits_for_the_claim_and_replays(collection):
+    calls = []
+
+    async def produce():
+        calls.append(1)
+        await asyncio.sleep(0.2)
+        return {"id": "1"}
+
+    async def scenario():
+        first = asyncio.create_task(worker(collection).run("contact", "k", "f", produce))
+        await asyncio.sleep(0.05)
+        second = await worker(collection).run("contact", "k", "f", produce)
+        return await first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == ({"id": "1"}, False)
+    assert second == ({"id": "1"}, True)
+    assert len(calls) == 1
+
+
+def test_other_worker_rejects_a_different_body(collection):
+    async def scenario():
+        await worker(collection).run("contact", "k", "f", lambda: asyncio.sleep(0, {"id": "1"}))
+        await worker(collection).run("contact", "k", "other", lambda: asyncio.sleep(0, {"id": "2"}))
+
+    with pytest.raises(IdempotencyKeyMismatch):
+        asyncio.run(scenario())
+
+
+def test_claim_still_in_progress_times_out(collection):
+    async def scenario():
+        gate = asyncio.Event()
+        first = asyncio.create_task(worker(collection).run("contact", "k", "f", gate.wait))
+        await asyncio.sleep(0.01)
+        try:
+            await worker(collection, wait_timeout=0.1).run("contact", "k", "f", gate.wait)
+        finally:
+            gate.set()
+            await first
+
+    with pytest.raises(IdempotencyKeyInProgress):
+        asyncio.run(scenario())
+
+
+def test_claim_is_released_when_the_request_fails(collection):
+    async def fail():
+        raise RuntimeError("database down")
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await worker(collection).run("contact", "k", "f", fail)
+        left = await collection.count_documents({})
+        # A retry on another worker runs the request instead of waiting on the claim
+        retry = await worker(collection).run("contact", "k", "f", lambda: asyncio.sleep(0, {"id": "1"}))
+        return left, retry
+
+    left, retry = asyncio.run(scenario())
+    assert left == 0
+    assert retry == ({"id": "1"}, False)
+
+
+def test_claim_is_released_when_cancelled_while_storing(collection):
+    store = worker(collection)
+
+    async def hang(key, response):
+        await asyncio.sleep(10)
+
+    store._complete = hang
+
+    async def scenario():
+        task = asyncio.create_task(store.run("contact", "k", "f", lambda: asyncio.sleep(0, {"id": "1"})))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return await collection.count_documents({})
+
+    assert asyncio.run(scenario()) == 0
+    # The response was produced, so this worker still replays it
+    assert "contact:k" in store._entries
+
+
+def test_lru_never_evicts_a_request_in_flight():
+    store = IdempotencyStore(max_entries=2)
+
+    async def scenario():
+        gate = asyncio.Event()
+
+        async def slow():
+            await gate.wait()
+            return {"id": "slow"}
+
+        pending = asyncio.create_task(store.run("contact", "slow", "f", slow))
+        await asyncio.sleep(0)
+        for i in range(5):
+            await store.run("contact", f"k{i}", "f", lambda: asyncio.sleep(0, {"id": str(i)}))
+        kept = "contact:slow" in store._entries
+        gate.set()
+        await pending
+        return kept
+
+    assert asyncio.run(scenario())
+    assert len(store) == 2
@@ -0,0 +1,47 @@
+"""
+Startup cost of a worker: `import server` in a fresh interpreter, as
+benchmarks/bench_import_time.py measures it.
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+# Same budget as benchmarks/bench_import_time.py
+BUDGET_MS = 900
+RUNS = 3
+# Only loaded once the first database call needs them
+LAZY_MODULES = ("motor", "pymongo", "bson")
+
+
+def import_server() -> dict:
+    """Cumulative microseconds per module imported by `import server`"""
+    env = {**os.environ, "LAZY_STARTUP": "true"}
+    env.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    assert result.returncode == 0, result.stderr
+    modules = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "cumulative" not in line:
+            _, cumulative_us, name = line.split("|")
+            modules[name.strip()] = int(cumulative_us)
+    return modules
+
+
+def test_server_import_is_within_budget_and_skips_the_driver():
+    runs = [import_server() for _ in range(RUNS)]
+
+    # The fastest run, the others mostly measure machine noise
+    best_ms = min(modules["server"] for modules in runs) / 1000
+    assert best_ms <= BUDGET_MS, f"import server took {best_ms:.0f}ms, budget {BUDGET_MS}ms"
+
+    loaded = [
+        name for name in runs[0]
+        if any(name == module or name.startswith(module + ".") for module in LAZY_MODULES)
+    ]
+    assert loaded == []
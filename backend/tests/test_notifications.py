@@ -0,0 +1,171 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+import database
+from routes import contact as contact_routes
+from services.notifications import FAILED, PENDING, SENDING, SENT, NotificationDispatcher
+from tests.conftest import contact_body
+
+
+class RecordingTransport:
+    name = "test"
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.batches = []
+
+    async def send(self, batch):
+        if self.fail:
+            raise RuntimeError("transport down")
+        self.batches.append([item["contact_id"] for item in batch])
+        await asyncio.sleep(0)
+
+
+@pytest.fixture
+def db():
+    return AsyncMongoMockClient()["portfolio_test"]
+
+
+def dispatcher(db, transport=None, **kwargs) -> NotificationDispatcher:
+    return NotificationDispatcher(
+        lambda: db.notification_outbox, transport or RecordingTransport(), lambda: db.contacts, **kwargs
+    )
+
+
+def contact(i: int, **extra) -> dict:
+    return {
+        "id": f"contact-{i:04d}",
+        "name": f"Sender {i}",
+        "email": f"sender{i}@example.com",
+        "message": f"Message number {i}",
+        "created_at": datetime.utcnow() - timedelta(minutes=i),
+        "read": False,
+        **extra,
+    }
+
+
+def test_enqueue_writes_the_entry_and_clears_the_flag(db):
+    async def scenario():
+        stored = contact(1, notify_pending=True)
+        await db.contacts.insert_one(dict(stored))
+        await dispatcher(db).enqueue(stored)
+        return await db.notification_outbox.find_one({"_id": stored["id"]}), await db.contacts.find_one({"id": stored["id"]})
+
+    entry, stored = asyncio.run(scenario())
+    assert entry["status"] == PENDING
+    assert entry["attempts"] == 0
+    assert "notify_pending" not in stored
+
+
+def test_direct_mode_leaves_nothing_for_the_sweep(client, run, monkeypatch):
+    notifications = NotificationDispatcher(
+        lambda: database.db.notification_outbox, RecordingTransport(), lambda: database.db.contacts
+    )
+    monkeypatch.setattr(contact_routes, "notification_dispatcher", notifications)
+
+    created = client.post("/api/contact", json=contact_body(1)).json()
+
+    assert run(database.db.notification_outbox.count_documents, {"_id": created["id"]}) == 1
+    assert run(database.db.contacts.count_documents, {"notify_pending": True}) == 0
+    assert run(notifications.sweep) == 0
+
+
+def test_sweep_writes_missing_entries_once(db):
+    async def scenario():
+        await db.contacts.insert_many([contact(i, notify_pending=True) for i in range(5)])
+        await db.contacts.insert_one(contact(5))
+        # The request handler wrote this one before it crashed
+        notifications = dispatcher(db, sweep_batch=2)
+        await notifications.get_collection().insert_one(notifications._entry(contact(0), datetime.utcnow()))
+        swept = await notifications.sweep()
+        return (
+            swept,
+            await notifications.sweep(),
+            sorted(entry["_id"] for entry in await db.notification_outbox.find().to_list(None)),
+            await db.contacts.count_documents({"notify_pending": True}),
+        )
+
+    swept, swept_again, entries, flagged = asyncio.run(scenario())
+    assert swept == 5
+    assert swept_again == 0
+    assert entries == [f"contact-{i:04d}" for i in range(5)]
+    assert flagged == 0
+
+
+def test_each_entry_is_delivered_once_across_dispatchers(db):
+    first = RecordingTransport()
+    second = RecordingTransport()
+
+    async def scenario():
+        writer = dispatcher(db)
+        for i in range(6):
+            await writer.enqueue(contact(i))
+        workers = [dispatcher(db, first), dispatcher(db, second)]
+
+        async def drain(notifications):
+            while await notifications.dispatch_once():
+                pass
+
+        await asyncio.gather(*(drain(notifications) for notifications in workers))
+        return await db.notification_outbox.distinct("status")
+
+    statuses = asyncio.run(scenario())
+    delivered = [contact_id for batch in first.batches + second.batches for contact_id in batch]
+    assert sorted(delivered) == [f"contact-{i:04d}" for i in range(6)]
+    assert statuses == [SENT]
+
+
+def test_stale_claim_is_taken_over(db):
+    transport = RecordingTransport()
+
+    async def scenario():
+        notifications = dispatcher(db, transport)
+        now = datetime.utcnow()
+        stale = {**notifications._entry(contact(1), now), "status": SENDING, "claim": "dead", "locked_until": now - timedelta(seconds=1)}
+        held = {**notifications._entry(contact(2), now), "status": SENDING, "claim": "alive", "locked_until": now + timedelta(seconds=60)}
+        await db.notification_outbox.insert_many([stale, held])
+        while await notifications.dispatch_once():
+            pass
+        return await db.notification_outbox.find_one({"_id": "contact-0001"}), await db.notification_outbox.find_one({"_id": "contact-0002"})
+
+    stale, held = asyncio.run(scenario())
+    assert transport.batches == [["contact-0001"]]
+    assert stale["status"] == SENT
+    assert "claim" not in stale
+    assert held["status"] == SENDING
+
+
+def test_failed_delivery_backs_off(db):
+    async def scenario():
+        notifications = dispatcher(db, RecordingTransport(fail=True), retry_delay=60, max_retry_delay=600)
+        await notifications.enqueue(contact(1))
+        before = datetime.utcnow()
+        assert await notifications.dispatch_once()
+        entry = await db.notification_outbox.find_one({"_id": "contact-0001"})
+        # Not due again until the backoff has passed
+        return before, entry, await notifications.dispatch_once()
+
+    before, entry, dispatched = asyncio.run(scenario())
+    assert entry["status"] == PENDING
+    assert entry["attempts"] == 1
+    assert entry["last_error"] == "transport down"
+    assert "claim" not in entry
+    assert before + timedelta(seconds=29) <= entry["next_attempt_at"] <= before + timedelta(seconds=61)
+    assert dispatched is False
+
+
+def test_gives_up_after_max_attempts(db):
+    async def scenario():
+        notifications = dispatcher(db, RecordingTransport(fail=True), max_attempts=3, retry_delay=0)
+        await notifications.enqueue(contact(1))
+        for _ in range(3):
+            assert await notifications.dispatch_once()
+        return await db.notification_outbox.find_one({"_id": "contact-0001"}), await notifications.dispatch_once()
+
+    entry, dispatched = asyncio.run(scenario())
+    assert entry["status"] == FAILED
+    assert entry["attempts"] == 3
+    assert dispatched is False
@@ -0,0 +1,36 @@
+from services.rate_limit import DEFAULT_ROUTE_LIMITS, SlidingWindowCounterStore, TokenBucketStore
+from tests.conftest import contact_body
+
+
+def test_contact_over_limit_gets_429_with_retry_after(client):
+    limit = DEFAULT_ROUTE_LIMITS["contact"].limit
+    for i in range(limit):
+        assert client.post("/api/contact", json=contact_body(i)).status_code == 200
+
+    response = client.post("/api/contact", json=contact_body(limit))
+    assert response.status_code == 429
+    retry_after = int(response.headers["Retry-After"])
+    assert 1 <= retry_after <= DEFAULT_ROUTE_LIMITS["contact"].window
+
+
+def test_retry_after_is_when_the_next_hit_is_allowed():
+    for store_type in (SlidingWindowCounterStore, TokenBucketStore):
+        store = store_type(limit=5, window=100)
+        now = 1030.0
+        for _ in range(5):
+            assert store.hit("ip", now)
+            now += 1
+        assert not store.hit("ip", now)
+
+        retry_after = store.retry_after("ip", now)
+        assert retry_after > 0
+        assert not store.hit("ip", now + retry_after - 0.01)
+        assert store.hit("ip", now + retry_after + 0.01)
+
+
+def test_store_memory_stays_bounded():
+    store = SlidingWindowCounterStore(limit=5, window=100, max_entries=1000)
+    for i in range(10_000):
+        store.hit(f"10.0.{i >> 8}.{i & 255}", now=1000.0)
+    assert len(store) == 1000
+    assert store.sweep(now=1300.0) == 1000
@@ -0,0 +1,126 @@
+import asyncio
+import fcntl
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from multiprocessing import shared_memory
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from services.rate_limit import RateLimiter, RouteLimit, SlidingWindowCounterStore
+from services.rate_limit_shared import MongoCounterTable, SharedMemoryCounterTable
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LIMIT, WINDOW = 5, 3600
+# Part way into the current window; a real clock, as Mongo expires counters by it
+NOW = time.time() // WINDOW * WINDOW + 600.0
+
+
+@pytest.fixture
+def segment_name():
+    name = f"portfolio_rate_limit_test_{uuid.uuid4().hex[:12]}"
+    yield name
+    try:
+        shared_memory.SharedMemory(name=name).unlink()
+    except FileNotFoundError:
+        pass
+    lock_path = os.path.join(tempfile.gettempdir(), f"{name}.lock")
+    if os.path.exists(lock_path):
+        os.remove(lock_path)
+
+
+def local_retry_after(hits: int, now: float) -> float:
+    store = SlidingWindowCounterStore(LIMIT, WINDOW)
+    for _ in range(hits):
+        store.hit("key", now)
+    return store.retry_after("key", now)
+
+
+def test_workers_share_one_counter(segment_name):
+    first = SharedMemoryCounterTable(name=segment_name, slots=64)
+    second = SharedMemoryCounterTable(name=segment_name, slots=64)
+    try:
+        results = [table.hit_sync("contact:ip", LIMIT, WINDOW, NOW) for table in (first, second) * 3]
+        assert [allowed for allowed, _ in results] == [True] * LIMIT + [False]
+        assert results[-1][1] == pytest.approx(local_retry_after(LIMIT + 1, NOW))
+    finally:
+        first.close()
+        second.close()
+
+
+def test_segment_outlives_the_worker_that_created_it(segment_name):
+    script = (
+        "from services.rate_limit_shared import SharedMemoryCounterTable\n"
+        f"table = SharedMemoryCounterTable(name={segment_name!r}, slots=64)\n"
+        f"for _ in range({LIMIT}): table.hit_sync('contact:ip', {LIMIT}, {WINDOW}, {NOW})\n"
+        "table.close()\n"
+    )
+    subprocess.run([sys.executable, "-c", script], cwd=BACKEND_DIR, check=True)
+
+    table = SharedMemoryCounterTable(name=segment_name, slots=64)
+    try:
+        assert table.hit_sync("contact:ip", LIMIT, WINDOW, NOW)[0] is False
+    finally:
+        table.close()
+
+
+def test_hit_waits_for_the_lock_without_blocking_the_loop(segment_name):
+    table = SharedMemoryCounterTable(name=segment_name, slots=64)
+    other_worker = open(os.path.join(tempfile.gettempdir(), f"{segment_name}.lock"), "a+")
+
+    async def scenario():
+        fcntl.flock(other_worker, fcntl.LOCK_EX)
+        hit = asyncio.create_task(table.hit("contact:ip", LIMIT, WINDOW, NOW))
+        # The loop keeps running other tasks while the lock is held
+        await asyncio.sleep(0.05)
+        assert not hit.done()
+        fcntl.flock(other_worker, fcntl.LOCK_UN)
+        return await asyncio.wait_for(hit, 1)
+
+    try:
+        assert asyncio.run(scenario()) == (True, 0.0)
+    finally:
+        other_worker.close()
+        table.close()
+
+
+def test_mongo_counter_table():
+    table = MongoCounterTable(AsyncMongoMockClient()["portfolio_test"].rate_limits)
+    retry_after = local_retry_after(LIMIT + 1, NOW)
+
+    async def scenario():
+        results = [await table.hit("contact:ip", LIMIT, WINDOW, NOW) for _ in range(LIMIT + 1)]
+        just_before = await table.hit("contact:ip", LIMIT, WINDOW, NOW + retry_after - 1)
+        just_after = await table.hit("contact:ip", LIMIT, WINDOW, NOW + retry_after + 1)
+        return results, just_before, just_after
+
+    results, just_before, just_after = asyncio.run(scenario())
+    assert [allowed for allowed, _ in results] == [True] * LIMIT + [False]
+    assert results[-1][1] == pytest.approx(retry_after)
+    assert just_before == (False, pytest.approx(1))
+    assert just_after == (True, 0.0)
+
+
+def test_shared_retry_after_follows_the_window_not_the_cache(segment_name, monkeypatch):
+    monkeypatch.setenv("RATE_LIMIT_SHM_NAME", segment_name)
+    monkeypatch.setenv("RATE_LIMIT_SHM_SLOTS", "64")
+    monkeypatch.setenv("RATE_LIMIT_REJECT_CACHE_TTL", "5")
+    limiter = RateLimiter(route_limits={"contact": RouteLimit(LIMIT, WINDOW)}, backend="shared_memory")
+
+    async def scenario():
+        allowed = [await limiter.check("contact", "ip", NOW) for _ in range(LIMIT + 1)]
+        retry_after = limiter.retry_after("contact", "ip", NOW)
+        # Past the rejection cache, the table still says no
+        still_limited = await limiter.check("contact", "ip", NOW + 10)
+        await limiter.stop_sweeper()
+        return allowed, retry_after, still_limited
+
+    allowed, retry_after, still_limited = asyncio.run(scenario())
+    assert allowed == [True] * LIMIT + [False]
+    assert retry_after == pytest.approx(local_retry_after(LIMIT + 1, NOW), abs=1)
+    assert retry_after > 5
+    assert still_limited is False
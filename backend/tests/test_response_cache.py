@@ -0,0 +1,66 @@
+import asyncio
+
+from fastapi import Response
+from starlette.requests import Request
+
+from services.response_cache import ResponseCache
+
+
+def test_listing_is_served_from_cache_with_etag(client):
+    client.post("/api/status", json={"client_name": "a"})
+    first = client.get("/api/status")
+    etag = first.headers["ETag"]
+
+    assert client.get("/api/status").content == first.content
+    assert client.get("/api/status", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_write_invalidates_cached_listing(client):
+    client.post("/api/status", json={"client_name": "a"})
+    before = client.get("/api/status")
+
+    client.post("/api/status", json={"client_name": "b"})
+    after = client.get("/api/status", headers={"If-None-Match": before.headers["ETag"]})
+    assert after.status_code == 200
+    assert [row["client_name"] for row in after.json()] == ["b", "a"]
+
+
+def test_contact_update_invalidates_cached_listing(client, seed_contacts):
+    seed_contacts(2)
+    assert len(client.get("/api/admin/contacts", params={"unread_only": True}).json()) == 2
+
+    client.post("/api/admin/contacts/bulk", json={"action": "mark_read", "ids": ["contact-0000"]})
+    unread = client.get("/api/admin/contacts", params={"unread_only": True}).json()
+    assert [contact["id"] for contact in unread] == ["contact-0001"]
+
+
+def test_response_produced_across_an_invalidation_is_not_cached():
+    cache = ResponseCache()
+    request = Request({"type": "http", "method": "GET", "path": "/api/status", "query_string": b"", "headers": []})
+    rows = ["old"]
+
+    async def produce():
+        body = ",".join(rows).encode()
+        # A write lands while the listing is being read
+        rows.append("new")
+        cache.invalidate("status_checks")
+        return Response(content=body)
+
+    async def scenario():
+        first = await cache.respond(request, "status_checks", produce)
+        second = await cache.respond(request, "status_checks", produce)
+        return first.body, second.body
+
+    first, second = asyncio.run(scenario())
+    assert first == b"old"
+    assert second == b"old,new"
+
+
+def test_cache_key_keeps_encoded_query_values_apart():
+    def request(query_string: bytes) -> Request:
+        return Request({"type": "http", "method": "GET", "path": "/api/admin/contacts/search",
+                        "query_string": query_string, "headers": []})
+
+    assert ResponseCache.make_key(request(b"q=a%26b%3D1")) != ResponseCache.make_key(request(b"q=a&b=1"))
+    # Parameter order still doesn't matter
+    assert ResponseCache.make_key(request(b"a=1&b=2")) == ResponseCache.make_key(request(b"b=2&a=1"))
@@ -0,0 +1,139 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+import database
+from services.retention import RetentionPolicy, RetentionRunInProgress, rollup_update
+
+
+@pytest.fixture
+def db(monkeypatch):
+    mock_db = AsyncMongoMockClient()["portfolio_test"]
+    monkeypatch.setattr(database, "db", mock_db)
+    return mock_db
+
+
+@pytest.fixture
+def no_collection_stats(monkeypatch):
+    """mongomock has no collStats command"""
+    async def collection_sizes(self, name):
+        return {"count": 0, "size": 0, "storage_size": 0, "index_size": 0}
+    monkeypatch.setattr(RetentionPolicy, "collection_sizes", collection_sizes)
+
+
+def bucket(first_seen: datetime, last_seen: datetime, count: int) -> dict:
+    return {"first_seen": first_seen, "last_seen": last_seen, "count": count}
+
+
+def test_rollup_update_upserts_and_reruns_idempotently(db):
+    hour = datetime(2026, 5, 1, 10)
+    key = {"client_name": "a", "hour": hour}
+
+    async def upsert(update):
+        await db.status_check_rollups.update_one(key, update, upsert=True)
+        return await db.status_check_rollups.find_one(key, {"_id": 0})
+
+    async def scenario():
+        created = await upsert(rollup_update(bucket(hour + timedelta(minutes=1), hour + timedelta(minutes=20), 5)))
+        # The same raw rows again, e.g. a run that died before deleting them
+        rerun = await upsert(rollup_update(bucket(hour + timedelta(minutes=1), hour + timedelta(minutes=20), 5)))
+        # The rest of the hour, after a cutoff that wasn't on the hour
+        later = await upsert(rollup_update(bucket(hour + timedelta(minutes=30), hour + timedelta(minutes=50), 3)))
+        return created, rerun, later, await db.status_check_rollups.count_documents({})
+
+    created, rerun, later, rollups = asyncio.run(scenario())
+    assert created == {
+        "client_name": "a",
+        "hour": hour,
+        "earlier_count": 0,
+        "first_seen": hour + timedelta(minutes=1),
+        "last_seen": hour + timedelta(minutes=20),
+        "count": 5,
+    }
+    assert rerun == created
+    assert later["count"] == 8
+    assert later["earlier_count"] == 5
+    assert later["first_seen"] == hour + timedelta(minutes=1)
+    assert later["last_seen"] == hour + timedelta(minutes=50)
+    assert rollups == 1
+
+
+def test_rollup_folds_old_status_checks_into_hourly_counts(db):
+    now = datetime(2026, 5, 2, 12, 30)
+    hour = datetime(2026, 5, 1, 10)
+    checks = [
+        {"id": f"{name}-{minute}", "client_name": name, "timestamp": hour + timedelta(minutes=minute)}
+        for name, minute in (("a", 5), ("a", 50), ("b", 15), ("a", 65))
+    ]
+    recent = {"id": "recent", "client_name": "a", "timestamp": now - timedelta(minutes=5)}
+
+    async def scenario():
+        await db.status_checks.insert_many(checks + [recent])
+        report = await RetentionPolicy(status_rollup_hours=1).rollup_status_checks(now)
+        rollups = await db.status_check_rollups.find({}, {"_id": 0, "client_name": 1, "hour": 1, "count": 1}) \
+            .sort([("hour", 1), ("client_name", 1)]).to_list(None)
+        return report, rollups, await db.status_checks.distinct("id")
+
+    report, rollups, remaining = asyncio.run(scenario())
+    assert report == {"cutoff": datetime(2026, 5, 2, 11), "compacted": 4, "buckets": 3}
+    assert rollups == [
+        {"client_name": "a", "hour": hour, "count": 2},
+        {"client_name": "b", "hour": hour, "count": 1},
+        {"client_name": "a", "hour": hour + timedelta(hours=1), "count": 1},
+    ]
+    assert remaining == ["recent"]
+
+
+def test_second_worker_is_refused_while_the_lease_is_held(db, no_collection_stats):
+    started = asyncio.Event()
+    finish = asyncio.Event()
+
+    async def slow_run():
+        started.set()
+        await finish.wait()
+        return {"ran": True}
+
+    async def scenario():
+        first, second = RetentionPolicy(), RetentionPolicy()
+        first._run = slow_run
+        running = asyncio.create_task(first.run())
+        await started.wait()
+        with pytest.raises(RetentionRunInProgress):
+            await second.run()
+        # The same worker doesn't queue a second run behind the first either
+        with pytest.raises(RetentionRunInProgress):
+            await first.run()
+        finish.set()
+        ran = await running
+        # Released: the next run takes the lease
+        return ran, await second.run(), await db.retention_leases.count_documents({})
+
+    ran, after, leases = asyncio.run(scenario())
+    assert ran == {"ran": True}
+    assert "collections" in after
+    assert leases == 0
+
+
+def test_expired_lease_is_taken_over(db, no_collection_stats):
+    async def scenario():
+        await db.retention_leases.insert_one({"_id": "retention", "token": "dead", "locked_until": datetime.utcnow() - timedelta(seconds=1)})
+        return await RetentionPolicy().run()
+
+    assert "collections" in asyncio.run(scenario())
+
+
+def test_concurrent_run_gets_409(client, run, no_collection_stats):
+    async def hold_lease():
+        await database.db.retention_leases.insert_one({
+            "_id": "retention", "token": "other-worker", "locked_until": datetime.utcnow() + timedelta(minutes=5),
+        })
+
+    run(hold_lease)
+    response = client.post("/api/admin/retention/run")
+    assert response.status_code == 409
+    assert response.json()["detail"] == "The retention policy is already being applied"
+
+    run(database.db.retention_leases.delete_many, {})
+    assert client.post("/api/admin/retention/run").status_code == 200
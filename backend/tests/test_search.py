@@ -0,0 +1,141 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from routes import contact as contact_routes
+from services.search import ContactSearchIndex
+from services.storage import storage
+from tests.conftest import contact_body
+
+NOW = datetime(2026, 5, 1, 12)
+
+
+class ListRepository:
+    """Contacts in a list, iterated like a ContactRepository"""
+
+    def __init__(self, documents):
+        self.documents = list(documents)
+
+    async def iterate(self, projection, batch_size):
+        for document in list(self.documents):
+            await asyncio.sleep(0)
+            yield document
+
+
+def document(i: int, name: str = None, message: str = "Hello there") -> dict:
+    return {
+        "id": f"contact-{i:04d}",
+        "name": name or f"Person {i}",
+        "email": f"person{i}@example.com",
+        "message": message,
+        "created_at": NOW - timedelta(minutes=i),
+    }
+
+
+def ids(hits) -> list:
+    return [contact_id for _, _, contact_id in hits]
+
+
+def test_added_documents_are_found_by_any_term():
+    index = ContactSearchIndex(ListRepository([]))
+    index.add(document(1, name="Ada Lovelace", message="About the analytical engine"))
+    index.add(document(2, message="Ada asked me to reach out"))
+    index.add(document(3, message="Nothing relevant"))
+
+    # Name weighs more than message text
+    assert ids(index.search("ada", 10)) == ["contact-0001", "contact-0002"]
+    # Equal scores: newest first
+    assert ids(index.search("engine reach", 10)) == ["contact-0001", "contact-0002"]
+    assert index.search("person3@example.com", 10)[0][2] == "contact-0003"
+    assert index.search("missing", 10) == []
+
+
+def test_re_adding_replaces_the_old_terms():
+    index = ContactSearchIndex(ListRepository([]))
+    index.add(document(1, message="first draft"))
+    index.add(document(1, message="second draft"))
+    assert ids(index.search("first", 10)) == []
+    assert ids(index.search("second", 10)) == ["contact-0001"]
+    assert len(index) == 1
+
+
+def test_cursor_pages_follow_the_search_order():
+    index = ContactSearchIndex(ListRepository([]))
+    for i in range(7):
+        index.add(document(i, message="project question"))
+
+    seen, after = [], None
+    while True:
+        hits = index.search("project", 3, after)
+        seen.extend(ids(hits))
+        if len(hits) < 3:
+            break
+        score, created_at, contact_id = hits[-1]
+        after = {"score": score, "created_at": created_at, "id": contact_id}
+    # Equal scores: newest first, like the listing
+    assert seen == [f"contact-{i:04d}" for i in range(7)]
+
+
+def test_refresh_picks_up_other_workers_changes():
+    repository = ListRepository([document(1, message="kept"), document(2, message="deleted elsewhere")])
+    index = ContactSearchIndex(repository)
+
+    async def scenario():
+        await index.start()
+        # Another worker inserts one contact and deletes another
+        repository.documents.append(document(3, message="inserted elsewhere"))
+        del repository.documents[1]
+        before = ids(index.search("elsewhere", 10))
+        index.invalidate()
+        await index._rebuild_task
+        return before, ids(index.search("elsewhere", 10))
+
+    before, after = asyncio.run(scenario())
+    assert before == ["contact-0002"]
+    assert after == ["contact-0003"]
+    assert len(index) == 2
+
+
+def test_changes_during_a_rebuild_are_kept():
+    repository = ListRepository([document(i) for i in range(5)])
+    index = ContactSearchIndex(repository, batch_size=1)
+
+    async def scenario():
+        rebuild = asyncio.create_task(index.rebuild())
+        await asyncio.sleep(0)
+        # Made by this worker while the rebuild is reading the collection
+        index.add(document(9, message="brand new"))
+        index.remove(["contact-0004"])
+        await rebuild
+
+    asyncio.run(scenario())
+    assert ids(index.search("new", 10)) == ["contact-0009"]
+    assert "contact-0004" not in ids(index.search("hello", 10))
+    assert len(index) == 5
+
+
+@pytest.mark.parametrize("client", ["mongo", "sqlite"], indirect=True)
+def test_search_route_with_the_memory_index(client, run, seed_contacts, monkeypatch):
+    index = ContactSearchIndex(storage.contacts)
+    monkeypatch.setattr(contact_routes, "contact_search", index)
+    seed_contacts(3)
+    run(index.rebuild)
+
+    def search(q: str) -> list:
+        return [hit["id"] for hit in client.get("/api/admin/contacts/search", params={"q": q}).json()]
+
+    assert search("person1") == ["contact-0001"]
+
+    # Indexed as soon as it is stored
+    created = client.post("/api/contact", json={**contact_body(7), "message": "A question about zeppelins"}).json()
+    assert search("zeppelins") == [created["id"]]
+
+    # Deleted in the database behind this worker's back: still indexed, but
+    # hits that no longer exist are dropped, and the next refresh forgets them
+    run(storage.contacts.delete_many, ["contact-0001"])
+    assert search("person1") == []
+    assert "contact-0001" in index._terms
+    run(index.rebuild)
+    assert "contact-0001" not in index._terms
+    assert len(index) == 3
@@ -0,0 +1,88 @@
+import pytest
+
+import database
+import routes.contact
+from services.rate_limit import RouteLimit
+from services.spam_filter import (
+    DUPLICATE, EMAIL_THROTTLED, HONEYPOT, NEAR_DUPLICATE, TOO_MANY_LINKS, SpamFilter
+)
+from tests.conftest import contact_body
+
+# 31 distinct words, each three times: every SimHash bit vote is an odd
+# multiple of 3, so one extra word can't flip any bit of it
+WORDS = [f"word{i}" for i in range(31)]
+MESSAGE = " ".join(WORDS * 3)
+
+
+def accept(spam_filter: SpamFilter, message: str, contact_id: str, email: str = "a@example.com", now: float = 1000.0):
+    verdict = spam_filter.check(email, message, now=now)
+    assert verdict.accepted
+    spam_filter.record(verdict.fingerprint, contact_id, now=now)
+
+
+def test_honeypot_and_links():
+    spam_filter = SpamFilter(max_links=2, email_limit=None)
+    assert spam_filter.check("a@example.com", "hello", honeypot="http://bot").reason == HONEYPOT
+    assert spam_filter.check("a@example.com", "see http://a and www.b").accepted
+    assert spam_filter.check("a@example.com", "http://a https://b www.c").reason == TOO_MANY_LINKS
+
+
+def test_duplicates_carry_the_original_id():
+    spam_filter = SpamFilter(email_limit=None)
+    accept(spam_filter, MESSAGE, "first")
+
+    # Case and spacing don't matter for an exact duplicate
+    exact = spam_filter.check("b@example.com", "  " + MESSAGE.upper(), now=1001.0)
+    assert (exact.reason, exact.original_id) == (DUPLICATE, "first")
+
+    near = spam_filter.check("c@example.com", MESSAGE + " extra", now=1002.0)
+    assert (near.reason, near.original_id) == (NEAR_DUPLICATE, "first")
+
+
+def test_duplicates_expire_with_the_window():
+    spam_filter = SpamFilter(window=60, email_limit=None)
+    accept(spam_filter, MESSAGE, "first", now=1000.0)
+    assert spam_filter.check("a@example.com", MESSAGE, now=1030.0).reason == DUPLICATE
+    # The repeat at 1030 kept it in the window until 1090
+    assert spam_filter.check("a@example.com", MESSAGE, now=1080.0).reason == DUPLICATE
+    assert spam_filter.check("a@example.com", MESSAGE, now=1200.0).accepted
+    assert len(spam_filter) == 0
+
+
+def test_fingerprints_stay_bounded():
+    spam_filter = SpamFilter(max_entries=10, email_limit=None)
+    for i in range(50):
+        accept(spam_filter, " ".join(f"m{i}w{j}" for j in range(10)), f"id-{i}")
+    assert len(spam_filter) == 10
+
+
+def test_email_throttle():
+    spam_filter = SpamFilter(email_limit=RouteLimit(limit=2, window=3600))
+    for i in range(2):
+        assert spam_filter.check("A@example.com", f"message {i}", now=1000.0 + i).accepted
+    assert spam_filter.check("a@EXAMPLE.com", "message 2", now=1002.0).reason == EMAIL_THROTTLED
+    assert 1 <= spam_filter.retry_after("a@example.com", now=1002.0) <= 3600
+    assert spam_filter.check("b@example.com", "message 3", now=1003.0).accepted
+
+
+@pytest.fixture
+def spam_filter(monkeypatch):
+    spam_filter = SpamFilter(email_limit=RouteLimit(limit=2, window=3600))
+    monkeypatch.setattr(routes.contact, "spam_filter", spam_filter)
+    return spam_filter
+
+
+def test_throttled_email_gets_429_with_retry_after(client, spam_filter):
+    for i in range(2):
+        assert client.post("/api/contact", json={**contact_body(i), "email": "same@example.com"}).status_code == 200
+    response = client.post("/api/contact", json={**contact_body(2), "email": "same@example.com"})
+    assert response.status_code == 429
+    assert 1 <= int(response.headers["Retry-After"]) <= 3600
+
+
+def test_duplicate_submission_answers_with_the_stored_id(client, run, spam_filter):
+    first = client.post("/api/contact", json={**contact_body(1), "message": MESSAGE})
+    again = client.post("/api/contact", json={**contact_body(2), "message": MESSAGE})
+    assert again.status_code == 200
+    assert again.json()["id"] == first.json()["id"]
+    assert run(database.db.contacts.count_documents, {}) == 1
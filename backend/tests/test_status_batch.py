@@ -0,0 +1,50 @@
+import json
+
+import routes.status
+
+NDJSON = {"Content-Type": "application/x-ndjson"}
+
+
+def stored_names(client) -> list:
+    return sorted(row["client_name"] for row in client.get("/api/status").json())
+
+
+def test_ndjson_batch_stores_valid_lines_and_reports_bad_ones(client):
+    body = "\n".join([
+        json.dumps({"client_name": "a"}),
+        "{not json",
+        json.dumps({"client_name": "b"}),
+        json.dumps({"name": "missing client_name"}),
+        "",
+        json.dumps({"client_name": "c"}),
+    ])
+    response = client.post("/api/status/batch", content=body, headers=NDJSON)
+    assert response.status_code == 200
+    result = response.json()
+    assert result["inserted"] == 3
+    # Blank lines are skipped, a malformed line doesn't shift the indexes after it
+    assert [error["index"] for error in result["errors"]] == [1, 3]
+    assert result["errors"][0]["error"] == "Invalid JSON"
+    assert stored_names(client) == ["a", "b", "c"]
+
+
+def test_json_array_batch_with_invalid_items(client):
+    response = client.post("/api/status/batch", json=[{"client_name": "a"}, {"client_name": 5}, {}])
+    assert response.json()["inserted"] == 1
+    assert [error["index"] for error in response.json()["errors"]] == [1, 2]
+
+
+def test_batch_that_is_not_a_list_is_rejected(client):
+    assert client.post("/api/status/batch", json={"client_name": "a"}).status_code == 400
+    assert client.post("/api/status/batch", content=b"{not json").status_code == 400
+
+
+def test_batch_limits_are_checked_before_validation(client, monkeypatch):
+    monkeypatch.setattr(routes.status, "STATUS_BATCH_MAX_ITEMS", 2)
+    lines = "\n".join(["{not json"] * 3)
+    assert client.post("/api/status/batch", content=lines, headers=NDJSON).status_code == 413
+    assert client.post("/api/status/batch", json=[{}, {}, {}]).status_code == 413
+
+    monkeypatch.setattr(routes.status, "STATUS_BATCH_MAX_BYTES", 10)
+    assert client.post("/api/status/batch", json=[{"client_name": "a"}]).status_code == 413
+    assert stored_names(client) == []
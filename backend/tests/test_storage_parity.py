@@ -0,0 +1,125 @@
+"""
+The contact and status routes on both storage backends: every test runs
+once on Mongo (mongomock) and once on an SQLite file, and must see the
+same responses.
+"""
+
+import csv
+import io
+import json
+
+import pytest
+
+from routes.contact import contact_counters
+from tests.conftest import contact_body
+
+pytestmark = pytest.mark.parametrize("client", ["mongo", "sqlite"], indirect=True)
+
+
+def listed_ids(client, **params) -> list:
+    return [contact["id"] for contact in client.get("/api/admin/contacts", params=params).json()]
+
+
+def test_submitted_contact_is_listed(client):
+    created = client.post("/api/contact", json=contact_body(1))
+    assert created.status_code == 200
+
+    listed = client.get("/api/admin/contacts").json()
+    assert [contact["id"] for contact in listed] == [created.json()["id"]]
+    assert listed[0]["email"] == "person1@example.com"
+    assert listed[0]["read"] is False
+
+
+def test_cursor_pages_and_skip_agree(client, seed_contacts):
+    seeded = seed_contacts(7)
+
+    ids, after = [], None
+    while True:
+        response = client.get("/api/admin/contacts", params={"limit": 3, **({"after": after} if after else {})})
+        ids.extend(contact["id"] for contact in response.json())
+        after = response.headers.get("X-Next-Cursor")
+        if after is None:
+            break
+
+    assert ids == [document["id"] for document in seeded]
+    assert listed_ids(client, limit=3, skip=3) == ids[3:6]
+
+
+def test_projection_trims_the_rows(client, seed_contacts):
+    seed_contacts(2)
+    rows = client.get("/api/admin/contacts", params={"summary": True}).json()
+    assert all(row.get("message") is None and row.get("user_agent") is None for row in rows)
+    assert [row["name"] for row in rows] == ["Person 0", "Person 1"]
+
+
+def test_mark_read_and_unread_filter(client, seed_contacts):
+    seed_contacts(3)
+    assert client.patch("/api/admin/contacts/contact-0001/read").status_code == 200
+    assert client.patch("/api/admin/contacts/missing/read").status_code == 404
+    assert listed_ids(client, unread_only=True) == ["contact-0000", "contact-0002"]
+
+
+def test_bulk_counts_match(client, seed_contacts):
+    seed_contacts(4)
+    client.post("/api/admin/contacts/bulk", json={"action": "mark_read", "ids": ["contact-0000"]})
+    response = client.post("/api/admin/contacts/bulk", json={
+        "action": "mark_read", "ids": ["contact-0000", "contact-0001", "missing"],
+    })
+    assert response.json() == {"success": True, "matched": 2, "modified": 1}
+
+    response = client.post("/api/admin/contacts/bulk", json={"action": "mark_unread", "ids": ["contact-0000"]})
+    assert response.json()["modified"] == 1
+    assert listed_ids(client, unread_only=True) == ["contact-0000", "contact-0002", "contact-0003"]
+
+
+def test_bulk_delete_by_filter(client, seed_contacts):
+    seeded = seed_contacts(5)
+    response = client.post("/api/admin/contacts/bulk", json={
+        "action": "delete", "before": seeded[2]["created_at"].isoformat(),
+    })
+    assert response.json()["matched"] == 2
+    assert listed_ids(client) == ["contact-0000", "contact-0001", "contact-0002"]
+
+
+def test_counts(client, run, seed_contacts):
+    seed_contacts(4)
+    client.post("/api/admin/contacts/bulk", json={"action": "mark_read", "ids": ["contact-0000", "contact-0003"]})
+    run(contact_counters.reconcile)
+    stats = client.get("/api/admin/contacts/stats").json()
+    assert (stats["total"], stats["read"], stats["unread"]) == (4, 2, 2)
+
+
+def test_export_streams_the_same_rows(client, seed_contacts):
+    seeded = seed_contacts(5)
+    ndjson = client.get("/api/admin/contacts/export", params={"batch_size": 2})
+    rows = [json.loads(line) for line in ndjson.text.splitlines()]
+    assert [row["id"] for row in rows] == [document["id"] for document in seeded]
+
+    since = seeded[3]["created_at"].isoformat()
+    exported = client.get("/api/admin/contacts/export", params={"format": "csv", "since": since})
+    assert [row["id"] for row in csv.DictReader(io.StringIO(exported.text))] == [
+        "contact-0000", "contact-0001", "contact-0002", "contact-0003",
+    ]
+
+
+def test_search(client, seed_contacts, request):
+    if request.node.callspec.params["client"] == "mongo":
+        pytest.skip("mongomock has no $text index")
+    seed_contacts(3)
+    hits = client.get("/api/admin/contacts/search", params={"q": "person1"}).json()
+    assert [hit["id"] for hit in hits] == ["contact-0001"]
+    assert hits[0]["score"] > 0
+
+
+def test_status_checks(client):
+    assert client.post("/api/status", json={"client_name": "a"}).status_code == 200
+    batch = client.post("/api/status/batch", json=[{"client_name": "b"}, {"client_name": "a"}, {}])
+    assert batch.json()["inserted"] == 2
+
+    assert sorted(row["client_name"] for row in client.get("/api/status").json()) == ["a", "a", "b"]
+    assert len(client.get("/api/status", params={"client_name": "a"}).json()) == 2
+
+    first = client.get("/api/status", params={"limit": 2})
+    rest = client.get("/api/status", params={"limit": 2, "after": first.headers["X-Next-Cursor"]})
+    streamed = client.get("/api/status", params={"format": "ndjson"}).text.splitlines()
+    assert [row["id"] for row in first.json() + rest.json()] == [json.loads(line)["id"] for line in streamed]
@@ -0,0 +1,153 @@
+import asyncio
+import glob
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from pymongo.errors import BulkWriteError
+
+import services.write_behind
+from services.write_behind import DUPLICATE_KEY_ERROR, WriteBehindQueue
+
+
+class StallingCollection:
+    """Writes batches, then hangs once `stall` is set: a worker killed mid-flush"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.stall = False
+
+    async def insert_many(self, documents, ordered=True):
+        await self.collection.insert_many(documents, ordered=ordered)
+        if self.stall:
+            await asyncio.Event().wait()
+
+
+@pytest.fixture
+def collection():
+    return AsyncMongoMockClient()["portfolio_test"].contacts
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return str(tmp_path / "contacts.journal")
+
+
+def segments(journal: str) -> dict:
+    """Journal segment file -> number of lines in it"""
+    counts = {}
+    for path in glob.glob(journal + ".*"):
+        with open(path) as segment:
+            counts[path.rsplit(".", 1)[1]] = sum(1 for line in segment if line.strip())
+    return counts
+
+
+async def crash(queue: WriteBehindQueue):
+    """Stop a queue the way a killed worker does: nothing drained, files as written"""
+    for task in (queue._task, queue._sync_task, queue._replay_task):
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    for segment in [queue._journal] + queue._retired:
+        segment.close()
+
+
+async def settle(queue: WriteBehindQueue):
+    for _ in range(200):
+        if len(queue) == 0:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"{len(queue)} documents still buffered")
+
+
+def test_crash_mid_segment_replays_without_loss_or_duplicates(collection, journal):
+    stalling = StallingCollection(collection)
+
+    async def scenario():
+        # Only full batches are flushed, so segments rotate at known points
+        first = WriteBehindQueue(lambda: stalling, batch_size=5, flush_interval=60, journal_path=journal)
+        await first.start()
+        for i in range(5):
+            await first.enqueue({"name": f"contact {i}"})
+        await settle(first)
+        # The flushed batch's segment is gone, a new one is open
+        assert segments(journal) == {"1": 0}
+
+        # The next batch reaches Mongo but the worker dies before it is marked
+        # flushed, with more documents journaled behind it in the same segment
+        stalling.stall = True
+        for i in range(5, 13):
+            await first.enqueue({"name": f"contact {i}"})
+        await asyncio.sleep(0.05)
+        await crash(first)
+        assert segments(journal) == {"1": 8}
+        with open(journal + ".1", "a") as segment:
+            segment.write('{"name": "torn wri')
+
+        second = WriteBehindQueue(lambda: collection, batch_size=5, flush_interval=0.01, journal_path=journal)
+        await second.start()
+        await settle(second)
+        await second.drain()
+        return await collection.find({}, {"_id": 0, "name": 1}).to_list(None)
+
+    stored = asyncio.run(scenario())
+    assert sorted(document["name"] for document in stored) == sorted(f"contact {i}" for i in range(13))
+    assert segments(journal) == {}
+
+
+def test_drain_writes_everything_buffered(collection, journal):
+    async def scenario():
+        queue = WriteBehindQueue(lambda: collection, batch_size=100, flush_interval=60, journal_path=journal)
+        await queue.start()
+        for i in range(7):
+            await queue.enqueue({"name": f"contact {i}"})
+        assert await collection.count_documents({}) == 0
+        await queue.drain()
+        return await collection.count_documents({})
+
+    assert asyncio.run(scenario()) == 7
+    assert segments(journal) == {}
+
+
+def test_failed_fsync_still_accepts_the_document(collection, journal, monkeypatch):
+    sync_files = services.write_behind.sync_files
+    failures = [OSError("disk gone")]
+
+    def failing_sync(files, retired):
+        if files and failures:
+            raise failures.pop()
+        sync_files(files, retired)
+
+    monkeypatch.setattr(services.write_behind, "sync_files", failing_sync)
+
+    async def scenario():
+        queue = WriteBehindQueue(lambda: collection, batch_size=100, flush_interval=60, journal_path=journal)
+        await queue.start()
+        await queue.enqueue({"name": "contact"})
+        await queue.drain()
+        return await collection.count_documents({})
+
+    assert asyncio.run(scenario()) == 1
+    assert failures == []
+
+
+class FailingCollection:
+    def __init__(self, details: dict):
+        self.details = details
+
+    async def insert_many(self, documents, ordered=True):
+        raise BulkWriteError(self.details)
+
+
+@pytest.mark.parametrize("details, flushed", [
+    ({"writeErrors": [{"index": 0, "code": DUPLICATE_KEY_ERROR}], "writeConcernErrors": []}, True),
+    ({"writeErrors": [], "writeConcernErrors": [{"code": 64, "errmsg": "waiting for replication timed out"}]}, False),
+    ({"writeErrors": [{"index": 0, "code": DUPLICATE_KEY_ERROR}],
+      "writeConcernErrors": [{"code": 64, "errmsg": "waiting for replication timed out"}]}, False),
+    ({"writeErrors": [{"index": 0, "code": 121}], "writeConcernErrors": []}, False),
+])
+def test_only_duplicate_key_errors_count_as_flushed(details, flushed):
+    queue = WriteBehindQueue(lambda: FailingCollection(details), retry_delay=0)
+    assert asyncio.run(queue._flush([{"_id": 1}], max_attempts=2)) is flushed
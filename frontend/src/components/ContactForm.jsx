@@ -52,6 +52,18 @@ const ContactForm = () => {
           />
           {errors.message && <span className="error-message">{errors.message}</span>}
         </div>
+
+        {/* Honeypot: hidden from people, bots that fill it in are dropped by the API */}
+        <input
+          type="text"
+          name="website"
+          tabIndex={-1}
+          autoComplete="off"
+          aria-hidden="true"
+          style={{ position: 'absolute', left: '-10000px', width: '1px', height: '1px', overflow: 'hidden' }}
+          value={formData.website}
+          onChange={(e) => handleInputChange('website', e.target.value)}
+        />
         
         <button 
           type="submit" 
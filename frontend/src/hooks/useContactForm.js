@@ -6,7 +6,8 @@ export const useContactForm = () => {
   const [formData, setFormData] = useState({
     name: '',
     email: '',
-    message: ''
+    message: '',
+    website: ''
   });
   
   const [isSubmitting, setIsSubmitting] = useState(false);
@@ -92,7 +93,8 @@ export const useContactForm = () => {
         setFormData({
           name: '',
           email: '',
-          message: ''
+          message: '',
+          website: ''
         });
         setErrors({});
       } else {
@@ -123,7 +125,8 @@ export const useContactForm = () => {
     setFormData({
       name: '',
       email: '',
-      message: ''
+      message: '',
+      website: ''
     });
     setErrors({});
     setIsSubmitting(false);